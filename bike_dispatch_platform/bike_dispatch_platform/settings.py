@@ -2,6 +2,8 @@ import os
 from pathlib import Path
 from datetime import timedelta
 
+from django.core.exceptions import ImproperlyConfigured
+
 # 项目根目录（自动识别，避免硬编码）
 BASE_DIR = Path(__file__).resolve().parent.parent
 
@@ -59,13 +61,49 @@ TEMPLATES = [
 
 WSGI_APPLICATION = 'bike_dispatch_platform.wsgi.application'
 
-# 数据仓库配置（任务书"结构化数据仓库"要求，开发用SQLite，生产可迁MySQL）
-DATABASES = {
-    'default': {
+# 数据仓库配置（任务书"结构化数据仓库"要求），按部署方式选择数据库配置档（环境变量 BIKE_DB_PROFILE）：
+# - 'sqlite'（默认）：SQLite 默认日志模式，每个请求新建连接（写入时阻塞读取），不改动仓库中跟踪的数据库文件
+# - 'sqlite-wal'：单机部署，WAL 模式（读写互不阻塞）+ busy_timeout 等锁 + 持久连接；
+#   需显式开启，WAL 会改写数据库文件头并生成 -wal/-shm 附属文件（已在 .gitignore 中忽略）
+# - 'postgresql'：多节点部署，持久连接 + 连接健康检查；前置 PgBouncer 连接池时设置 BIKE_DB_PGBOUNCER=1（驱动 psycopg 见 requirements.txt）
+DATABASE_PROFILE = os.environ.get('BIKE_DB_PROFILE', 'sqlite')
+DATABASE_CONN_MAX_AGE = 600  # 持久连接最长保持秒数
+SQLITE_BUSY_TIMEOUT = 20  # 秒，写锁被占用时等待而不是立即报 database is locked
+DATABASE_PROFILES = {
+    'sqlite': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'bike_dispatch_db.db',  # 共享单车调度专用数据库
-    }
+    },
+    'sqlite-wal': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': BASE_DIR / 'bike_dispatch_db.db',
+        'CONN_MAX_AGE': DATABASE_CONN_MAX_AGE,
+        'CONN_HEALTH_CHECKS': True,
+        'OPTIONS': {'timeout': SQLITE_BUSY_TIMEOUT},
+    },
+    'postgresql': {
+        'ENGINE': 'django.db.backends.postgresql',
+        'NAME': os.environ.get('BIKE_DB_NAME', 'bike_dispatch'),
+        'USER': os.environ.get('BIKE_DB_USER', 'postgres'),
+        'PASSWORD': os.environ.get('BIKE_DB_PASSWORD', ''),
+        'HOST': os.environ.get('BIKE_DB_HOST', 'localhost'),
+        'PORT': os.environ.get('BIKE_DB_PORT', '5432'),
+        'CONN_MAX_AGE': DATABASE_CONN_MAX_AGE,
+        'CONN_HEALTH_CHECKS': True,
+        # PgBouncer 事务级连接池不支持服务端游标（QuerySet.iterator() 会用到）
+        'DISABLE_SERVER_SIDE_CURSORS': os.environ.get('BIKE_DB_PGBOUNCER') == '1',
+        'OPTIONS': {'connect_timeout': 5},
+    },
 }
+if DATABASE_PROFILE not in DATABASE_PROFILES:
+    raise ImproperlyConfigured(f"BIKE_DB_PROFILE={DATABASE_PROFILE!r} 无效，可选：{', '.join(DATABASE_PROFILES)}")
+DATABASES = {'default': DATABASE_PROFILES[DATABASE_PROFILE]}
+# SQLite 每个新连接执行的 PRAGMA（system_support 应用启动时注册），WAL 模式下 synchronous=NORMAL 仍保证不损坏数据
+SQLITE_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'busy_timeout': SQLITE_BUSY_TIMEOUT * 1000,
+} if DATABASE_PROFILE == 'sqlite-wal' else {}
 
 # 密码验证与多角色权限配置
 AUTH_PASSWORD_VALIDATORS = [
@@ -94,6 +132,66 @@ STATICFILES_DIRS = [
 MEDIA_URL = 'media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')  # 存储上传的Excel/CSV数据集
 
+# 预测模型配置（demand_prediction 模型服务，首次预测时懒加载，进程内共享一份）
+LSTM_MODEL_PATH = os.path.join(BASE_DIR, '../models/bike_lstm_model.h5')
+BP_MODEL_PATH = os.path.join(BASE_DIR, '../models/bike_bp_model_radical.h5')
+SCALER_X_PATH = os.path.join(BASE_DIR, '../utils/scaler_x.pkl')
+SCALER_Y_PATH = os.path.join(BASE_DIR, '../utils/scaler_y.pkl')
+PREDICTION_WARMUP = True   # 加载后用全零批次预热，计算图追踪不占用请求时间
+PREDICTION_PRELOAD = False  # True：WSGI 进程启动时后台预加载模型
+PREDICTION_FAST_PATH = True  # 用编译好的 tf.function 直接前向计算，代替 model.predict
+# 推理后端：'keras'（.h5，需完整TensorFlow）、'tflite'（先执行 models/export_tflite.py 导出，需另行安装 tflite-runtime，仅 Linux，见 README）
+# 或 'numpy'（纯NumPy前向计算，直接读 .h5 权重，只需 h5py）
+PREDICTION_BACKEND = 'keras'
+PREDICTION_TFLITE_THREADS = None  # TFLite 解释器线程数，None 为默认
+PREDICTION_BATCHING = True  # 并发预测请求合并为一次批量前向计算
+PREDICTION_MAX_BATCH = 64   # 单批最多合并的请求数
+PREDICTION_MAX_WAIT_MS = 5  # 凑批最长等待时间（毫秒）
+PREDICTION_CACHE = True  # 相同输入特征的单次预测结果缓存（LRU），模型文件更新后自动失效
+PREDICTION_CACHE_SIZE = 1024  # 进程内缓存条目上限
+PREDICTION_CACHE_ALIAS = None  # 同时写入的 Django 缓存别名（多进程共享），None 为仅进程内
+PREDICTION_CACHE_TIMEOUT = 3600  # 写入 Django 缓存的秒数
+PREDICTION_CACHE_CHECK_SECONDS = 5  # 检查模型文件是否更新的间隔（秒）
+FORECAST_DEFAULT_DAYS = 7  # 批量预测接口默认预测天数
+FORECAST_MAX_DAYS = 31  # 单次请求最多预测天数
+FORECAST_REGION_SHARE = None  # 各区域占全市需求的比例，如 {'region1': 0.4, ...}；None 为平均分配
+FORECAST_HOLIDAYS = []  # 预测范围内的节假日（'YYYY-MM-DD'），影响 holiday/workingday 特征
+# LSTM 多日预测方式：'window' 每个目标小时单独取 24 小时窗口批量计算；
+# 'stateful' 保留隐藏/细胞状态逐小时递推（纯 NumPy 引擎，每小时每层一次单元计算）
+FORECAST_LSTM_MODE = 'window'
+FORECAST_STATE_REFRESH = 6  # 有状态递推时每隔几小时按完整窗口重新读入（None 为不重读，最快但误差随步数增大）
+
+# 预测结果预计算（materialize_forecasts 命令，demand_predict 收到整数温度时优先读表）
+FORECAST_MATERIALIZE = True
+FORECAST_MATERIALIZE_DAYS = 2  # 从明天起预计算的天数
+FORECAST_MATERIALIZE_WEATHERS = ['sunny', 'cloudy', 'rainy']
+FORECAST_MATERIALIZE_TEMPERATURES = list(range(-5, 41))  # 预计算的整数温度（℃）
+FORECAST_MATERIALIZE_INTERVAL = 6 * 3600  # 常驻运行时的建议刷新间隔（秒）
+
+# 数据导入配置（data_process 上传文件分块流式读取，骑行数据分块批量入库，每块一个事务）
+DATA_INGEST_CHUNK_ROWS = 50000  # 每次读入并清洗的行数
+DATA_INGEST_BATCH_SIZE = 2000
+DATA_INGEST_ASYNC = True  # True：上传文件保存到 MEDIA_ROOT 后由后台进程池导入，页面轮询进度
+DATA_INGEST_WORKERS = 2  # 导入进程数（多文件/多工作表并行）
+
+# 数据列表分页（按 id 游标翻页，页面可用 ?size= 调整，不超过上限）
+DATA_LIST_PAGE_SIZE = 50
+DATA_LIST_MAX_PAGE_SIZE = 500
+
+# 缓存配置：图表缓存使用文件缓存，Web 进程与后台导入进程共享数据版本号（入库后缓存失效）
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'charts': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': os.path.join(BASE_DIR, 'cache', 'charts'),
+        'OPTIONS': {'MAX_ENTRIES': 1000},
+    },
+}
+CHART_CACHE_ALIAS = 'charts'
+CHART_CACHE_TIMEOUT = 600  # 图表缓存秒数（数据未变化时到期后重新渲染）
+
 # 会话配置（支持多用户并发访问，任务书技术要求）
 SESSION_COOKIE_AGE = 28800
 SESSION_SAVE_EVERY_REQUEST = True
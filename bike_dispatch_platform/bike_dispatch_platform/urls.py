@@ -9,6 +9,8 @@ urlpatterns = [
     
     path('admin/', admin.site.urls),
     path('data/', include('data_process.urls')),
+    path('prediction/', include('demand_prediction.urls')),
+    path('operation/', include('operation_management.urls')),
     path('accounts/login/', auth_views.LoginView.as_view(template_name='login.html'), name='login'),
     path('accounts/logout/', auth_views.LogoutView.as_view(next_page='/data/upload/'), name='logout'),
 ]
\ No newline at end of file
@@ -14,3 +14,10 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'bike_dispatch_platform.settings')
 
 application = get_wsgi_application()
+
+# Web 进程启动时后台预加载预测模型（manage.py 命令不经过这里，不受影响）
+from django.conf import settings  # noqa: E402
+
+if settings.PREDICTION_PRELOAD:
+    from demand_prediction.model_server import get_model_server
+    get_model_server().preload_async()
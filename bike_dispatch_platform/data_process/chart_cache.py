@@ -0,0 +1,73 @@
+"""
+图表缓存：热力图等 pyecharts 图表渲染后的 HTML 按“数据版本号”缓存
+缓存键为 chart:<名称>:v<版本号>，骑行数据入库事务提交后版本号递增，旧缓存不再命中（到期后自动清理），
+无新数据时重复访问直接返回缓存的 HTML，不再重新查询与 render_embed()。
+HTML 存于 Django 缓存框架的 CHART_CACHE_ALIAS（默认文件缓存：Web 进程与导入进程共享，无需外部服务）；
+版本号存于数据库（ChartDataVersion 单行表），多个进程并发入库时也能原子递增。
+"""
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+
+from .models import ChartDataVersion
+
+_stats = {"hits": 0, "misses": 0, "build_seconds": 0.0}
+_stats_lock = threading.Lock()
+
+
+def get_cache():
+    return caches[settings.CHART_CACHE_ALIAS]
+
+
+def data_version():
+    """当前数据版本号（首次使用时以当前毫秒时间戳初始化）"""
+    return ChartDataVersion.current()
+
+
+def bump_data_version():
+    """数据版本号加一，所有图表缓存随之失效"""
+    return ChartDataVersion.bump()
+
+
+def invalidate_on_commit():
+    """在当前事务提交后使图表缓存失效（入库回滚时不失效）"""
+    transaction.on_commit(bump_data_version)
+
+
+def cached_chart(name, build, timeout=None):
+    """
+    返回名为 name 的图表 HTML：当前数据版本已有缓存则直接返回，否则调用 build() 渲染后写入缓存
+    timeout 为缓存秒数，默认 CHART_CACHE_TIMEOUT
+    """
+    cache = get_cache()
+    key = f"chart:{name}:v{data_version()}"
+    html = cache.get(key)
+    if html is not None:
+        with _stats_lock:
+            _stats["hits"] += 1
+        return html
+
+    t0 = time.perf_counter()
+    html = build()
+    cache.set(key, html, settings.CHART_CACHE_TIMEOUT if timeout is None else timeout)
+    with _stats_lock:
+        _stats["misses"] += 1
+        _stats["build_seconds"] += time.perf_counter() - t0
+    return html
+
+
+def cache_stats():
+    """本进程的命中统计：命中/未命中次数、命中率、平均渲染耗时（毫秒）与当前数据版本号"""
+    with _stats_lock:
+        stats = dict(_stats)
+    lookups = stats["hits"] + stats["misses"]
+    return {
+        "hits": stats["hits"],
+        "misses": stats["misses"],
+        "hit_rate": round(stats["hits"] / lookups, 4) if lookups else 0.0,
+        "avg_build_ms": round(stats["build_seconds"] / stats["misses"] * 1000, 2) if stats["misses"] else 0.0,
+        "data_version": data_version(),
+    }
@@ -0,0 +1,299 @@
+"""
+骑行数据批量入库
+清洗后的 DataFrame 先按列做类型转换与默认值填充（向量化，不再逐行 iterrows），
+再按 DATA_INGEST_BATCH_SIZE 分块 bulk_create，每块一个事务，内存中只保留当前块的模型对象；
+同一事务内把本块累加到小时需求汇总表（rollup.add_rides_to_rollup）。
+大文件由 readers.iter_upload_chunks 分块读取，ingest_ride_chunks 逐块清洗、跨块去重后入库；
+天气数据由 ingest_weather_chunks 逐块解析，文件内按（区域, 日期）去重后批量入库（已存在的跳过）或覆盖更新。
+"""
+import time
+from datetime import date
+
+import numpy as np
+import pandas as pd
+from django.conf import settings
+from django.db import connection, transaction
+from django.utils import timezone
+
+from .chart_cache import invalidate_on_commit
+from .models import BikeRideData, RideDataCount, WeatherData
+from .rollup import add_rides_to_rollup
+from .utils import data_cleaning
+
+# 入库字段及缺失时的默认值（weather 是外键，不从文件赋值，后续按区域+日期关联）
+RIDE_DEFAULTS = {
+    'start_point': '',
+    'end_point': '',
+    'duration': 0.0,
+    'distance': 0.0,
+}
+RIDE_COLUMNS = ['start_point', 'end_point', 'ride_datetime', 'duration', 'distance']
+DEDUP_COLUMNS = ['start_point', 'end_point', 'ride_datetime']  # 与 data_cleaning 的去重字段一致
+
+
+def build_ride_frame(df):
+    """
+    按列转换为入库格式：字符串去空格、时间解析（无时区的按 TIME_ZONE 本地时间处理）、
+    数值强制转换并填默认值，丢弃骑行时间为空的行（必选字段）
+    """
+    frame = pd.DataFrame(index=df.index)
+    for col in ('start_point', 'end_point'):
+        if col in df.columns:
+            frame[col] = df[col].fillna(RIDE_DEFAULTS[col]).astype(str).str.strip()
+        else:
+            frame[col] = RIDE_DEFAULTS[col]
+    for col in ('duration', 'distance'):
+        if col in df.columns:
+            frame[col] = pd.to_numeric(df[col], errors='coerce').fillna(RIDE_DEFAULTS[col]).astype(float)
+        else:
+            frame[col] = RIDE_DEFAULTS[col]
+
+    if 'ride_datetime' in df.columns:
+        ride_datetime = pd.to_datetime(df['ride_datetime'], errors='coerce')
+    else:
+        ride_datetime = pd.Series(pd.NaT, index=df.index, dtype='datetime64[ns]')
+    if ride_datetime.dt.tz is None:
+        ride_datetime = ride_datetime.dt.tz_localize(timezone.get_default_timezone_name(),
+                                                     ambiguous='NaT', nonexistent='NaT')
+    frame['ride_datetime'] = ride_datetime
+    return frame.loc[frame['ride_datetime'].notna(), RIDE_COLUMNS]
+
+
+def bulk_insert_rides(frame, data_source, upload_user, batch_size=None):
+    """
+    分块写入 BikeRideData（每块一个事务，失败只回滚当前块），返回 (入库条数, 耗时秒)
+    frame 为 build_ride_frame 的输出；用户的数据计数（RideDataCount）与小时需求汇总（HourlyDemand）在同一事务内累加，
+    事务提交后图表缓存失效
+    """
+    batch_size = batch_size or settings.DATA_INGEST_BATCH_SIZE
+    t0 = time.perf_counter()
+    inserted = 0
+    for start in range(0, len(frame), batch_size):
+        chunk = frame.iloc[start:start + batch_size]
+        objs = [
+            BikeRideData(
+                data_source=data_source,
+                start_point=start_point,
+                end_point=end_point,
+                ride_datetime=ride_datetime.to_pydatetime(),
+                duration=duration,
+                distance=distance,
+                status='cleaned',
+                upload_user=upload_user,
+            )
+            for start_point, end_point, ride_datetime, duration, distance in chunk.itertuples(index=False, name=None)
+        ]
+        with transaction.atomic():
+            BikeRideData.objects.bulk_create(objs, batch_size=batch_size)
+            RideDataCount.add(upload_user, len(objs))
+            add_rides_to_rollup(chunk)
+            invalidate_on_commit()
+        inserted += len(objs)
+    return inserted, time.perf_counter() - t0
+
+
+class IngestError(Exception):
+    """分块入库中途失败（此前的块已提交，inserted 为已入库条数）"""
+
+    def __init__(self, stage, error, inserted=0):
+        super().__init__(f"{stage}失败：{error}")
+        self.inserted = inserted
+
+
+class ChunkDeduplicator:
+    """
+    跨块去重：只保存已入库行去重字段的 64 位哈希（有序数组），
+    每行 8 字节，远小于保留原始数据
+    """
+
+    def __init__(self, columns=DEDUP_COLUMNS):
+        self.columns = columns
+        self._seen = np.empty(0, dtype=np.uint64)
+
+    def filter(self, frame):
+        hashes = pd.util.hash_pandas_object(frame[self.columns], index=False).to_numpy()
+        keep = np.ones(len(hashes), dtype=bool)
+        if len(self._seen):
+            # 有序数组二分查找，不像 np.isin 那样每次复制并重排全部已见哈希
+            pos = np.searchsorted(self._seen, hashes).clip(max=len(self._seen) - 1)
+            keep = self._seen[pos] != hashes
+        seen = np.concatenate([self._seen, hashes[keep]])
+        seen.sort()
+        self._seen = seen
+        return frame[keep]
+
+
+def _read_chunks(chunks, counts):
+    """逐块取出 DataFrame，读取异常包装为 IngestError（带上已入库条数）"""
+    chunks = iter(chunks)
+    while True:
+        try:
+            chunk = next(chunks, None)
+        except Exception as e:
+            raise IngestError("文件读取", e, counts["inserted"]) from e
+        if chunk is None:
+            return
+        yield chunk
+
+
+def ingest_ride_chunks(chunks, data_source, upload_user, on_chunk=None):
+    """
+    逐块执行 清洗 → 类型转换 → 跨块去重 → 分块入库，返回 (入库条数, 耗时秒)
+    on_chunk(读取行数, 本块计数) 在每块入库后回调，用于上报导入进度
+    """
+    t0 = time.perf_counter()
+    deduplicator = ChunkDeduplicator()
+    counts = {"inserted": 0}
+    for chunk in _read_chunks(chunks, counts):
+        try:
+            ride_frame = deduplicator.filter(build_ride_frame(data_cleaning(chunk, compact=False)))
+        except Exception as e:
+            raise IngestError("数据清洗", e, counts["inserted"]) from e
+        inserted = bulk_insert_rides(ride_frame, data_source, upload_user)[0]
+        counts["inserted"] += inserted
+        if on_chunk:
+            on_chunk(len(chunk), {"inserted": inserted, "skipped": len(chunk) - inserted})
+    return counts["inserted"], time.perf_counter() - t0
+
+
+# ===================== 天气数据 =====================
+# 字段映射：适配中文表头（含带单位的写法）
+WEATHER_COLUMN_MAP = {
+    "区域": "area",
+    "日期": "date",
+    "温度(℃)": "temperature",
+    "温度": "temperature",
+    "湿度(%)": "humidity",
+    "湿度": "humidity",
+    "风速(m/s)": "wind_speed",
+    "风速": "wind_speed",
+    "降雨量(mm)": "rainfall",
+    "降雨量": "rainfall",
+    "天气类型": "weather_type",
+    "天气": "weather_type"
+}
+REQUIRED_HEADERS = {"区域": "area", "日期": "date", "温度": "temperature"}
+NUMERIC_FIELDS = ["temperature", "humidity", "wind_speed", "rainfall"]
+UPSERT_FIELDS = NUMERIC_FIELDS + ["weather_type"]
+
+
+def missing_weather_headers(columns):
+    """返回缺少的核心表头（兼容带单位的表头，如“温度(℃)”）"""
+    present = {WEATHER_COLUMN_MAP[h] for h in columns if h in WEATHER_COLUMN_MAP}
+    return [h for h, field in REQUIRED_HEADERS.items() if field not in present]
+
+
+def parse_weather_chunk(chunk):
+    """
+    按列解析并校验一个块，返回有效行（字段名已映射为模型字段）：
+    区域为空、日期不是【年-月-日】的行丢弃；数值转换失败填0；天气类型为空填sunny；
+    文件内（区域, 日期）重复只保留第一条
+    """
+    chunk = chunk.rename(columns=WEATHER_COLUMN_MAP)
+    chunk = chunk.loc[:, ~chunk.columns.duplicated()]  # 同时有“温度”和“温度(℃)”时保留靠前的一列
+    frame = pd.DataFrame(index=chunk.index)
+
+    frame["area"] = chunk["area"].fillna("").astype(str).str.strip()
+    raw_dates = chunk["date"]
+    if pd.api.types.is_datetime64_any_dtype(raw_dates):
+        dates = raw_dates
+    else:
+        # 文本严格按【年-月-日】解析；Excel 日期单元格读出来已是日期对象，直接使用
+        dates = pd.to_datetime(raw_dates.astype(str).str.strip(), format="%Y-%m-%d", errors="coerce")
+        native = raw_dates.map(lambda v: isinstance(v, date))
+        if native.any():
+            dates = dates.mask(native, pd.to_datetime(raw_dates.where(native), errors="coerce"))
+    frame["date"] = dates.dt.normalize()
+    for field in NUMERIC_FIELDS:
+        values = chunk[field] if field in chunk.columns else pd.Series(0.0, index=chunk.index)
+        frame[field] = pd.to_numeric(values, errors="coerce").fillna(0.0).astype(float)
+    weather_type = chunk["weather_type"] if "weather_type" in chunk.columns else pd.Series("", index=chunk.index)
+    weather_type = weather_type.fillna("").astype(str).str.strip()
+    frame["weather_type"] = weather_type.mask(weather_type == "", "sunny")
+
+    valid = (frame["area"] != "") & frame["date"].notna()
+    frame = frame[valid].drop_duplicates(subset=["area", "date"], keep="first")
+    frame["date"] = frame["date"].dt.date
+    return frame
+
+
+def _insert_new_weather(frame):
+    """
+    INSERT ... ON CONFLICT (area, date) DO NOTHING 分批写入（每批一条多行语句），
+    返回实际写入的行数：已存在或被并发导入抢先写入的（区域, 日期）由数据库跳过，不计入
+    """
+    table = connection.ops.quote_name(WeatherData._meta.db_table)
+    columns = ["area", "date"] + UPSERT_FIELDS
+    params = [
+        (area, connection.ops.adapt_datefield_value(day), *map(float, numbers), weather_type)
+        for area, day, *numbers, weather_type in frame[columns].itertuples(index=False, name=None)
+    ]
+    batch_size = min(settings.DATA_INGEST_BATCH_SIZE, connection.ops.bulk_batch_size(columns, params))
+    row_sql = "(" + ", ".join(["%s"] * len(columns)) + ")"
+    inserted = 0
+    with connection.cursor() as cursor:
+        for start in range(0, len(params), batch_size):
+            batch = params[start:start + batch_size]
+            cursor.execute(
+                f"INSERT INTO {table} ({', '.join(columns)}) VALUES {', '.join([row_sql] * len(batch))} "
+                f"ON CONFLICT (area, date) DO NOTHING",
+                [value for row in batch for value in row],
+            )
+            inserted += cursor.rowcount
+    return inserted
+
+
+def save_weather_chunk(frame, overwrite):
+    """
+    overwrite=False 时只写入不存在的（区域, 日期），新增条数取数据库实际写入的行数，其余计为跳过；
+    overwrite=True 时一次查询取出本块日期范围内已存在的键，再一次 bulk_create 按 unique_together 覆盖更新
+    """
+    if frame.empty:
+        return {}
+    if not overwrite:
+        with transaction.atomic():
+            inserted = _insert_new_weather(frame)
+        return {"inserted": inserted, "skipped": len(frame) - inserted}
+    existing = set(
+        WeatherData.objects.filter(date__range=(frame["date"].min(), frame["date"].max()))
+        .values_list("area", "date")
+    )
+    updated = sum(key in existing for key in zip(frame["area"], frame["date"]))
+    objs = [WeatherData(**record) for record in frame.to_dict(orient="records")]
+    with transaction.atomic():
+        WeatherData.objects.bulk_create(
+            objs, batch_size=settings.DATA_INGEST_BATCH_SIZE, update_conflicts=True,
+            unique_fields=["area", "date"], update_fields=UPSERT_FIELDS
+        )
+    return {"inserted": len(objs) - updated, "updated": updated}
+
+
+def ingest_weather_chunks(chunks, overwrite=False, on_chunk=None):
+    """
+    逐块执行 表头校验 → 向量化解析 → 预取已有键去重 → 批量入库/覆盖更新
+    返回 {"inserted", "updated", "skipped", "seconds"}；on_chunk(读取行数, 本块计数) 每块入库后回调
+    """
+    t0 = time.perf_counter()
+    summary = {"inserted": 0, "updated": 0, "skipped": 0}
+    deduplicator = ChunkDeduplicator(["area", "date"])  # 文件内（区域, 日期）跨块重复同样只保留第一条
+    checked = False
+    for chunk in _read_chunks(chunks, summary):
+        if not checked:
+            if chunk.empty:
+                raise IngestError("文件读取", "文件中无任何数据")
+            missing_headers = missing_weather_headers(chunk.columns)
+            if missing_headers:
+                raise IngestError("表头校验", f"缺少必要表头：{', '.join(missing_headers)}，请检查为【区域、日期、温度】")
+            checked = True
+        frame = deduplicator.filter(parse_weather_chunk(chunk))
+        counts = {"skipped": len(chunk) - len(frame)}  # 区域/日期无效、文件内重复的行
+        for key, count in save_weather_chunk(frame, overwrite).items():
+            counts[key] = counts.get(key, 0) + count
+        for key, count in counts.items():
+            summary[key] += count
+        if on_chunk:
+            on_chunk(len(chunk), counts)
+    if not checked:
+        raise IngestError("文件读取", "文件中无任何数据")
+    summary["seconds"] = time.perf_counter() - t0
+    return summary
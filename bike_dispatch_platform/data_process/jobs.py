@@ -0,0 +1,195 @@
+"""
+数据导入任务（后台进程池，无需外部消息队列）
+上传的文件先保存到 MEDIA_ROOT/ingest/，每个文件的每个工作表拆成一个 IngestTask，
+提交到本进程内的 ProcessPoolExecutor 并行读取、清洗、入库；进度与计数写回数据库，上传页面轮询查询。
+工作进程以 spawn 方式启动（不继承 Web 进程中的线程和模型），启动时自行初始化 Django。
+注意：本模块在工作进程初始化 Django 之前就会被导入，模型只能在函数内导入。
+"""
+import multiprocessing
+import os
+import threading
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from django.conf import settings
+
+INGEST_UPLOAD_DIR = "ingest"  # 相对 MEDIA_ROOT
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def _init_worker(settings_module):
+    """工作进程初始化：加载 Django 配置与应用"""
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", settings_module)
+    import django
+    django.setup()
+
+
+def get_executor():
+    """进程内共享的导入进程池（首次提交任务时创建）"""
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ProcessPoolExecutor(
+                    max_workers=settings.DATA_INGEST_WORKERS,
+                    mp_context=multiprocessing.get_context("spawn"),
+                    initializer=_init_worker,
+                    initargs=(os.environ.get("DJANGO_SETTINGS_MODULE", "bike_dispatch_platform.settings"),),
+                )
+    return _executor
+
+
+def create_ingest_job(files, kind, data_source, upload_user, overwrite=False):
+    """保存上传文件并创建导入任务（每个文件的每个工作表一个子任务），返回 IngestJob"""
+    from django.core.files.storage import default_storage
+
+    from .models import IngestJob, IngestTask
+    from .readers import list_sheets
+
+    job = IngestJob.objects.create(kind=kind, data_source=data_source, overwrite=overwrite, upload_user=upload_user)
+    tasks = []
+    for file in files:
+        file_path = default_storage.save(f"{INGEST_UPLOAD_DIR}/{uuid.uuid4().hex}_{os.path.basename(file.name)}", file)
+        with default_storage.open(file_path, "rb") as saved:
+            sheets = list_sheets(saved)
+        tasks.extend(
+            IngestTask(job=job, file_path=file_path, file_name=file.name, sheet=sheet or "")
+            for sheet in sheets
+        )
+    IngestTask.objects.bulk_create(tasks)
+    return job
+
+
+def _mark_failed_if_crashed(task_id):
+    """工作进程异常退出（run_task 来不及记录状态）时，把子任务标记为失败"""
+    def callback(future):
+        error = future.exception()
+        if error is not None:
+            from django.utils import timezone
+
+            from .models import IngestTask
+            IngestTask.objects.filter(pk=task_id, status__in=("pending", "running")).update(
+                status="failed", error=f"导入进程异常退出：{error!r}", finish_time=timezone.now()
+            )
+    return callback
+
+
+def submit_job(job):
+    """把任务的全部子任务提交到进程池（进程池异常退出时重建一次）"""
+    global _executor
+    task_ids = list(job.tasks.values_list("id", flat=True))
+    for task_id in task_ids:
+        try:
+            future = get_executor().submit(run_task, task_id)
+        except BrokenProcessPool:
+            with _executor_lock:
+                _executor = None
+            future = get_executor().submit(run_task, task_id)
+        future.add_done_callback(_mark_failed_if_crashed(task_id))
+
+
+def _row_total(file, sheet):
+    """Excel 工作表的数据行数（只读模式下读取表格尺寸，不遍历单元格）；CSV 按字节计算进度，返回 None"""
+    if not file.name.lower().endswith(".xlsx"):
+        return None
+    from openpyxl import load_workbook
+
+    workbook = load_workbook(file, read_only=True)
+    try:
+        worksheet = workbook[sheet] if sheet else workbook.worksheets[0]
+        return max((worksheet.max_row or 1) - 1, 1)
+    finally:
+        workbook.close()
+        file.seek(0)
+
+
+def run_task(task_id):
+    """工作进程中执行一个子任务：分块读取 → 清洗/解析 → 入库，每块更新一次进度与计数"""
+    from django.db import close_old_connections
+    from django.db.models import F
+    from django.utils import timezone
+
+    from .ingest import ingest_ride_chunks, ingest_weather_chunks
+    from .models import IngestTask
+    from .readers import iter_upload_chunks
+
+    close_old_connections()
+    task = IngestTask.objects.select_related("job", "job__upload_user").get(pk=task_id)
+    job = task.job
+    tasks = IngestTask.objects.filter(pk=task_id)
+    tasks.update(status="running", start_time=timezone.now())
+    path = os.path.join(settings.MEDIA_ROOT, task.file_path)
+    try:
+        with open(path, "rb") as file:
+            size = os.path.getsize(path) or 1
+            row_total = _row_total(file, task.sheet)
+            rows_read = 0
+
+            def report(rows, counts):
+                nonlocal rows_read
+                rows_read += rows
+                progress = rows_read / row_total if row_total else file.tell() / size
+                tasks.update(
+                    progress=min(progress, 1.0),
+                    rows_read=F("rows_read") + rows,
+                    **{key: F(key) + value for key, value in counts.items()}
+                )
+
+            chunks = iter_upload_chunks(file, sheet=task.sheet or None)
+            if job.kind == "weather":
+                ingest_weather_chunks(chunks, overwrite=job.overwrite, on_chunk=report)
+            else:
+                ingest_ride_chunks(chunks, job.data_source, job.upload_user, on_chunk=report)
+        tasks.update(status="success", progress=1.0, finish_time=timezone.now())
+    except Exception as e:
+        tasks.update(status="failed", error=str(e), finish_time=timezone.now())
+    finally:
+        close_old_connections()
+    return task_id
+
+
+def job_status(job):
+    """任务整体状态（供上传页面轮询）：状态、进度、各子任务计数与导入速度（行/秒）"""
+    from django.utils import timezone
+
+    tasks = list(job.tasks.order_by("id"))
+    statuses = {task.status for task in tasks}
+    if statuses & {"pending", "running"}:
+        status = "running" if statuses - {"pending"} else "pending"
+    else:
+        status = "failed" if "failed" in statuses else "success"
+
+    starts = [task.start_time for task in tasks if task.start_time]
+    finishes = [task.finish_time for task in tasks if task.finish_time]
+    end = max(finishes) if status in ("success", "failed") and finishes else timezone.now()
+    elapsed = (end - min(starts)).total_seconds() if starts else 0.0
+    rows_read = sum(task.rows_read for task in tasks)
+    return {
+        "id": job.pk,
+        "kind": job.kind,
+        "status": status,
+        "progress": sum(task.progress for task in tasks) / len(tasks) if tasks else 0.0,
+        "rows_read": rows_read,
+        "inserted": sum(task.inserted for task in tasks),
+        "updated": sum(task.updated for task in tasks),
+        "skipped": sum(task.skipped for task in tasks),
+        "elapsed": round(elapsed, 2),
+        "rows_per_second": round(rows_read / elapsed, 1) if elapsed > 0 else 0.0,
+        "tasks": [
+            {
+                "file_name": task.file_name,
+                "sheet": task.sheet,
+                "status": task.status,
+                "progress": task.progress,
+                "rows_read": task.rows_read,
+                "inserted": task.inserted,
+                "updated": task.updated,
+                "skipped": task.skipped,
+                "error": task.error,
+            }
+            for task in tasks
+        ],
+    }
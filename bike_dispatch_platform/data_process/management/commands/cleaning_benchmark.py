@@ -0,0 +1,88 @@
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+from django.core.management.base import BaseCommand
+
+from data_process.utils import CleaningReport, data_cleaning
+
+
+def legacy_data_cleaning(df):
+    """改写前的 data_cleaning（逐步整表复制），仅用于对比"""
+    df = df.drop_duplicates(subset=['start_point', 'end_point', 'ride_datetime'], keep='first')
+    for col in ['duration', 'distance', 'temperature', 'wind_speed']:
+        if col in df.columns:
+            df[col] = df[col].fillna(df[col].mean())
+    df['start_point'] = df['start_point'].fillna('未知起点').astype(str)
+    df['end_point'] = df['end_point'].fillna('未知终点').astype(str)
+    df['weather'] = df['weather'].fillna('sunny').astype(str)
+    if 'ride_datetime' in df.columns:
+        df['ride_datetime'] = pd.to_datetime(df['ride_datetime'], errors='coerce')
+        df = df.dropna(subset=['ride_datetime'])
+    df = df[df['duration'] >= 0]
+    df = df[df['distance'] >= 0]
+    return df
+
+
+class Command(BaseCommand):
+    """骑行数据清洗基准：python manage.py cleaning_benchmark --rows 1000000"""
+    help = '在合成骑行数据上对比改写前后 data_cleaning 的耗时与峰值内存，并输出分步耗时/丢弃行数'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=1000000, help='合成数据行数')
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        df = self.synthetic_rides(options['rows'], options['seed'])
+        self.stdout.write(f'合成数据：{len(df)} 行，{df.memory_usage(deep=True).sum() / 2 ** 20:.1f} MB')
+
+        report = CleaningReport(len(df))
+        results = {
+            '改写前': self.measure(lambda: legacy_data_cleaning(df)),
+            '单次掩码': self.measure(lambda: data_cleaning(df, report=report)),
+        }
+        self.stdout.write(f'{"版本":<8} {"耗时(s)":>8} {"峰值内存(MB)":>12} {"结果内存(MB)":>12} {"结果行数":>10}')
+        for name, (seconds, peak_mb, result) in results.items():
+            self.stdout.write(
+                f'{name:<8} {seconds:>8.2f} {peak_mb:>12.1f} '
+                f'{result.memory_usage(deep=True).sum() / 2 ** 20:>12.1f} {len(result):>10}'
+            )
+        self.stdout.write(str(report))
+
+    @staticmethod
+    def measure(func):
+        """返回 (耗时秒, 峰值新增内存MB, 结果)"""
+        tracemalloc.start()
+        t0 = time.perf_counter()
+        result = func()
+        seconds = time.perf_counter() - t0
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        return seconds, peak / 2 ** 20, result
+
+    @staticmethod
+    def synthetic_rides(rows, seed):
+        """合成骑行数据：约5%重复、5%非法时间、各数值列10%缺失、少量负值"""
+        rng = np.random.default_rng(seed)
+        points = np.array([f'区域{chr(65 + i // 10)}-站点{i % 10}' for i in range(200)], dtype=object)
+        times = pd.Timestamp('2025-01-01') + pd.to_timedelta(rng.integers(0, 365 * 24 * 60, rows), unit='min')
+        ride_datetime = pd.Series(times.strftime('%Y-%m-%d %H:%M:%S'))
+        ride_datetime[rng.random(rows) < 0.05] = 'invalid'
+
+        def with_missing(values):
+            return np.where(rng.random(rows) < 0.1, np.nan, values)
+
+        df = pd.DataFrame({
+            'start_point': rng.choice(points, rows),
+            'end_point': rng.choice(points, rows),
+            'ride_datetime': ride_datetime,
+            'duration': with_missing(rng.normal(15, 8, rows)),
+            'distance': with_missing(rng.normal(3, 1.5, rows)),
+            'weather': rng.choice(np.array(['sunny', 'cloudy', 'rain', None], dtype=object), rows),
+            'temperature': with_missing(rng.normal(20, 6, rows)),
+            'wind_speed': with_missing(rng.gamma(2, 1, rows)),
+        })
+        duplicates = rng.choice(rows, rows // 20, replace=False)
+        df.iloc[duplicates[: len(duplicates) // 2]] = df.iloc[duplicates[len(duplicates) // 2:]].to_numpy()
+        return df
@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+
+from data_process.chart_cache import bump_data_version, get_cache
+
+
+class Command(BaseCommand):
+    """手动使图表缓存失效：python manage.py clear_chart_cache [--all]"""
+    help = '递增数据版本号使全部图表缓存失效；--all 同时清空图表缓存目录'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--all', action='store_true', help='清空图表缓存中的全部条目（数据版本号存于数据库，不受影响）')
+
+    def handle(self, *args, **options):
+        if options['all']:
+            get_cache().clear()
+            self.stdout.write(self.style.SUCCESS('已清空图表缓存'))
+            return
+        self.stdout.write(self.style.SUCCESS(f'图表缓存已失效，当前数据版本号 {bump_data_version()}'))
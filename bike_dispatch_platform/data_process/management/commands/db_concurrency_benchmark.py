@@ -0,0 +1,136 @@
+import threading
+import time
+from datetime import date
+
+import numpy as np
+import pandas as pd
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import OperationalError, close_old_connections, connection
+
+from data_process.ingest import build_ride_frame, bulk_insert_rides
+from data_process.models import BikeRideData, HourlyDemand, RideDataCount
+from demand_prediction.models import PredictionResult
+from system_support.models import User
+
+BENCH_USERNAME = 'db_benchmark'
+BENCH_REGION_PREFIX = '压测区域'  # 压测写入的骑行起点，结束后据此清理小时需求汇总
+
+
+class Command(BaseCommand):
+    """数据库并发压测：BIKE_DB_PROFILE=sqlite-wal python manage.py db_concurrency_benchmark --clients 3 12"""
+    help = ('在当前数据库配置档（settings.DATABASE_PROFILE）下并发执行上传/预测/列表三类操作，'
+            '输出各自吞吐量、p50/p99 延迟与锁等待失败次数（压测数据结束后删除）')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--clients', type=int, nargs='+', default=[3, 12],
+                            help='并发客户端数（按 上传/预测/列表 轮流分配）')
+        parser.add_argument('--seconds', type=float, default=10, help='每轮压测时长')
+        parser.add_argument('--upload-rows', type=int, default=500, help='每次上传的骑行数据行数')
+
+    def handle(self, *args, **options):
+        db = settings.DATABASES['default']
+        self.stdout.write(f'数据库配置档：{settings.DATABASE_PROFILE}（{db["ENGINE"].rsplit(".", 1)[-1]}，'
+                          f'CONN_MAX_AGE={db.get("CONN_MAX_AGE", 0)}）')
+        if connection.vendor == 'sqlite':
+            with connection.cursor() as cursor:
+                cursor.execute('PRAGMA journal_mode')
+                self.stdout.write(f'SQLite journal_mode={cursor.fetchone()[0]}')
+
+        user, _ = User.objects.get_or_create(username=BENCH_USERNAME)
+        try:
+            self.stdout.write(f'{"并发":>4} {"操作":<4} {"次数":>7} {"吞吐(次/s)":>11} {"写入(行/s)":>11} '
+                              f'{"p50(ms)":>9} {"p99(ms)":>9} {"锁失败":>6}')
+            for clients in options['clients']:
+                results = self._run(user, clients, options['seconds'], options['upload_rows'])
+                for kind, (latencies, rows, errors, elapsed) in results.items():
+                    if not len(latencies) and not errors:
+                        continue
+                    p50, p99 = (np.percentile(latencies, 50), np.percentile(latencies, 99)) if len(latencies) else (0, 0)
+                    self.stdout.write(
+                        f'{clients:>4} {kind:<4} {len(latencies):>7} {len(latencies) / elapsed:>11.1f} '
+                        f'{rows / elapsed:>11.1f} {p50:>9.2f} {p99:>9.2f} {errors:>6}'
+                    )
+        finally:
+            self._cleanup(user)
+
+    def _operations(self, user, upload_rows):
+        """三类操作：返回写入行数（列表为 0）"""
+        rng = np.random.default_rng()
+
+        def upload():
+            frame = build_ride_frame(pd.DataFrame({
+                'start_point': [f'{BENCH_REGION_PREFIX}{i}' for i in rng.integers(0, 8, upload_rows)],
+                'end_point': '压测终点',
+                'ride_datetime': pd.Timestamp('2024-01-01') + pd.to_timedelta(
+                    rng.integers(0, 30 * 86400, upload_rows), unit='s'),
+                'duration': rng.random(upload_rows) * 30,
+                'distance': rng.random(upload_rows) * 5,
+            }))
+            return bulk_insert_rides(frame, 'db_benchmark', user)[0]
+
+        def predict():
+            # 与预测视图相同的写入：保存一条预测结果（不含模型计算）
+            PredictionResult.objects.create(region='region1', time_period='morning', predict_date=date.today(),
+                                            demand_count=int(rng.integers(0, 200)), model_used='LSTM',
+                                            accuracy=82.0, user=user)
+            return 1
+
+        def list_page():
+            # 与数据列表视图相同的查询：首页 + 计数
+            list(BikeRideData.objects.filter(upload_user=user).order_by('-id')
+                 .only('id', 'start_point', 'end_point', 'ride_datetime')[:settings.DATA_LIST_PAGE_SIZE])
+            RideDataCount.get_count(user)
+            return 0
+
+        return {'上传': upload, '预测': predict, '列表': list_page}
+
+    def _run(self, user, clients, seconds, upload_rows):
+        """clients 个线程（各自一个数据库连接）按类型轮流分配，持续 seconds 秒，返回各类操作的统计"""
+        operations = self._operations(user, upload_rows)
+        kinds = list(operations)
+        stats = {kind: ([], [0], [0]) for kind in kinds}  # 延迟毫秒、写入行数、锁失败次数
+        lock = threading.Lock()
+        start = threading.Barrier(clients + 1)
+        deadline = [0.0]
+
+        def client(kind):
+            operation = operations[kind]
+            local, rows, errors = [], 0, 0
+            start.wait()
+            try:
+                while time.perf_counter() < deadline[0]:
+                    t0 = time.perf_counter()
+                    try:
+                        rows += operation()
+                        local.append((time.perf_counter() - t0) * 1000)
+                    except OperationalError:  # database is locked 等锁等待超时
+                        errors += 1
+                    if settings.DATABASES['default'].get('CONN_MAX_AGE', 0) == 0:
+                        connection.close()  # 模拟每个请求新建连接
+                    else:
+                        close_old_connections()
+            finally:
+                connection.close()
+                with lock:
+                    stats[kind][0].extend(local)
+                    stats[kind][1][0] += rows
+                    stats[kind][2][0] += errors
+
+        threads = [threading.Thread(target=client, args=(kinds[i % len(kinds)],)) for i in range(clients)]
+        for thread in threads:
+            thread.start()
+        deadline[0] = time.perf_counter() + seconds
+        start.wait()
+        t0 = time.perf_counter()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - t0
+        return {kind: (np.array(latencies), rows[0], errors[0], elapsed)
+                for kind, (latencies, rows, errors) in stats.items()}
+
+    def _cleanup(self, user):
+        """删除压测用户（级联删除骑行数据、预测结果与计数）及压测区域的小时需求汇总"""
+        HourlyDemand.objects.filter(region__startswith=BENCH_REGION_PREFIX).delete()
+        user.delete()
+        self.stdout.write('已清理压测数据')
@@ -0,0 +1,86 @@
+import os
+import time
+
+import numpy as np
+import pandas as pd
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from data_process.ingest import build_ride_frame, bulk_insert_rides
+from data_process.models import BikeRideData
+from data_process.utils import data_cleaning
+from system_support.models import User
+
+SAMPLE_CSV = os.path.join(settings.BASE_DIR, 'data', 'test_data', 'test_ride_data.csv')
+
+
+class _Rollback(Exception):
+    """基准测试结束后回滚写入的数据"""
+
+
+class Command(BaseCommand):
+    """骑行数据入库基准：python manage.py ingestion_benchmark --rows 100000"""
+    help = '把 test_ride_data.csv 放大到指定行数，对比逐行 iterrows 入库与向量化分块入库的吞吐量（写入数据会回滚）'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=100000, help='放大后的行数')
+        parser.add_argument('--batch-size', type=int, default=settings.DATA_INGEST_BATCH_SIZE)
+        parser.add_argument('--skip-legacy', action='store_true', help='不测逐行入库（行数很大时较慢）')
+
+    def handle(self, *args, **options):
+        df = data_cleaning(self.scaled_sample(options["rows"]), compact=False)
+        self.stdout.write(f'样本：{len(df)} 行（由 {os.path.basename(SAMPLE_CSV)} 放大）')
+        if not options['skip_legacy']:
+            self.report('逐行 iterrows', len(df), self.run_rolled_back(self.legacy_insert, df))
+        self.report('向量化分块', len(df),
+                    self.run_rolled_back(self.vectorized_insert, df, options['batch_size']))
+
+    @staticmethod
+    def scaled_sample(rows):
+        """重复样本行，骑行时间按分钟错开，避免被去重"""
+        sample = pd.read_csv(SAMPLE_CSV)
+        df = sample.iloc[np.arange(rows) % len(sample)].reset_index(drop=True)
+        df['ride_datetime'] = pd.to_datetime(df['ride_datetime']) + pd.to_timedelta(np.arange(rows), unit='min')
+        return df
+
+    def report(self, name, rows, elapsed):
+        self.stdout.write(f'{name:<14} 耗时 {elapsed:8.2f} s，{rows / elapsed:10.0f} 行/秒')
+
+    @staticmethod
+    def run_rolled_back(insert, *args):
+        """在事务中执行写入并计时，结束后整体回滚"""
+        elapsed = None
+        try:
+            with transaction.atomic():
+                user = User.objects.create(username='__ingestion_benchmark__')
+                t0 = time.perf_counter()
+                insert(user, *args)
+                elapsed = time.perf_counter() - t0
+                raise _Rollback
+        except _Rollback:
+            pass
+        return elapsed
+
+    @staticmethod
+    def legacy_insert(user, df):
+        """原 data_upload 的逐行转换 + 一次性 bulk_create"""
+        data_list = []
+        for _, row in df.iterrows():
+            item = BikeRideData(
+                data_source='benchmark',
+                start_point=str(row.get('start_point', '')).strip(),
+                end_point=str(row.get('end_point', '')).strip(),
+                ride_datetime=pd.to_datetime(row.get('ride_datetime'), errors='coerce') or None,
+                duration=float(row.get('duration', 0.0)) if pd.notna(row.get('duration')) else 0.0,
+                distance=float(row.get('distance', 0.0)) if pd.notna(row.get('distance')) else 0.0,
+                status='cleaned',
+                upload_user=user
+            )
+            if item.ride_datetime is not None:
+                data_list.append(item)
+        BikeRideData.objects.bulk_create(data_list)
+
+    @staticmethod
+    def vectorized_insert(user, df, batch_size):
+        bulk_insert_rides(build_ride_frame(df), 'benchmark', user, batch_size)
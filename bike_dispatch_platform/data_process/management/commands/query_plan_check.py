@@ -0,0 +1,78 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.db.models import Count
+from django.utils import timezone
+
+from data_process.models import BikeRideData
+
+
+def single_column_indexes(column):
+    """表上只包含该列的索引名（如外键自动创建的索引）"""
+    with connection.cursor() as cursor:
+        constraints = connection.introspection.get_constraints(cursor, BikeRideData._meta.db_table)
+    return [name for name, info in constraints.items() if info['index'] and info['columns'] == [column]]
+
+
+def hot_queries():
+    """热点查询及其可接受的索引：(名称, QuerySet, 索引名元组)"""
+    now = timezone.now()
+    user_indexes = ('ride_user_id_idx',)
+    if connection.vendor == 'sqlite':
+        # SQLite 的索引末尾隐含 rowid（即 id），外键索引 (upload_user_id) 同样满足 id 倒序，无需额外排序
+        user_indexes += tuple(single_column_indexes('upload_user_id'))
+    return [
+        ('数据列表（按用户，id倒序）',
+         BikeRideData.objects.filter(upload_user_id=1).order_by('-id')[:50],
+         user_indexes),
+        ('数据列表翻页（id 游标）',
+         BikeRideData.objects.filter(upload_user_id=1, id__lt=1000000).order_by('-id')[:50],
+         user_indexes),
+        ('需求汇总重建（已清洗，按起点+小时聚合）',
+         BikeRideData.objects.filter(status='cleaned').values('start_point', 'ride_datetime__hour')
+         .annotate(demand=Count('id')),
+         ('ride_status_time_idx',)),
+        ('已清洗数据时间范围',
+         BikeRideData.objects.filter(status='cleaned', ride_datetime__gte=now - timedelta(days=7)),
+         ('ride_status_time_idx',)),
+        ('区域需求（按起点+时间范围）',
+         BikeRideData.objects.filter(start_point='区域A-地铁站', ride_datetime__range=(now - timedelta(days=7), now)),
+         ('ride_start_time_idx',)),
+    ]
+
+
+class Command(BaseCommand):
+    """校验热点查询的执行计划是否使用了预期索引：python manage.py query_plan_check"""
+    help = '对 BikeRideData 热点查询执行 EXPLAIN（SQLite/PostgreSQL），未使用预期索引时以非零状态退出'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--verbose-plan', action='store_true', help='输出完整执行计划')
+
+    def handle(self, *args, **options):
+        vendor = connection.vendor
+        if vendor not in ('sqlite', 'postgresql'):
+            raise CommandError(f'暂不支持的数据库：{vendor}（仅支持 SQLite/PostgreSQL）')
+
+        failures = []
+        for name, queryset, indexes in hot_queries():
+            plan = self.explain(queryset, vendor)
+            used = any(index in plan for index in indexes)
+            self.stdout.write(f'{"✓" if used else "✗"} {name:<24} 预期索引 {" / ".join(indexes)}')
+            if options['verbose_plan'] or not used:
+                self.stdout.write('    ' + plan.replace('\n', '\n    '))
+            if not used:
+                failures.append(name)
+
+        if failures:
+            raise CommandError(f'{len(failures)} 个查询未使用预期索引：{", ".join(failures)}')
+        self.stdout.write(self.style.SUCCESS(f'{vendor}：全部热点查询均使用了预期索引'))
+
+    @staticmethod
+    def explain(queryset, vendor):
+        if vendor == 'postgresql':
+            # 表很小时 PostgreSQL 会选择顺序扫描，关闭后校验的是“索引可用于该查询”
+            with transaction.atomic(), connection.cursor() as cursor:
+                cursor.execute('SET LOCAL enable_seqscan = off')
+                return queryset.explain()
+        return queryset.explain()
@@ -0,0 +1,28 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db.models import Sum
+
+from data_process.models import BikeRideData, HourlyDemand
+from data_process.rollup import rebuild_rollup
+
+
+class Command(BaseCommand):
+    """按骑行数据全量重建小时需求汇总表：python manage.py rebuild_demand_rollup"""
+    help = '清空 HourlyDemand 后按已清洗的骑行数据（区域 × 日期 × 小时）重新汇总（一个事务，失败不影响原汇总）'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--check', action='store_true', help='重建后核对汇总的骑行次数与原始数据条数')
+
+    def handle(self, *args, **options):
+        t0 = time.perf_counter()
+        rows = rebuild_rollup()
+        self.stdout.write(self.style.SUCCESS(f'重建完成：{rows} 条汇总，耗时 {time.perf_counter() - t0:.2f} 秒'))
+
+        if options['check']:
+            rides = BikeRideData.objects.filter(status='cleaned').count()
+            rolled = HourlyDemand.objects.aggregate(total=Sum('ride_count'))['total'] or 0
+            if rides != rolled:
+                self.stderr.write(f'汇总骑行次数 {rolled} 与已清洗数据 {rides} 条不一致')
+            else:
+                self.stdout.write(f'核对通过：{rides} 条骑行数据')
@@ -0,0 +1,52 @@
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('data_process', '0003_remove_bikeridedata_temperature_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='IngestJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('ride', '骑行数据'), ('weather', '天气数据')], default='ride', max_length=20, verbose_name='数据类型')),
+                ('data_source', models.CharField(max_length=50, verbose_name='数据来源')),
+                ('overwrite', models.BooleanField(default=False, verbose_name='覆盖已有数据')),
+                ('create_time', models.DateTimeField(auto_now_add=True, verbose_name='创建时间')),
+                ('upload_user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL, verbose_name='上传用户')),
+            ],
+            options={
+                'verbose_name': '数据导入任务',
+                'verbose_name_plural': '数据导入任务',
+            },
+        ),
+        migrations.CreateModel(
+            name='IngestTask',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('file_path', models.CharField(max_length=255, verbose_name='文件路径')),
+                ('file_name', models.CharField(max_length=255, verbose_name='文件名')),
+                ('sheet', models.CharField(blank=True, default='', max_length=100, verbose_name='工作表')),
+                ('status', models.CharField(choices=[('pending', '排队中'), ('running', '导入中'), ('success', '已完成'), ('failed', '失败')], default='pending', max_length=20, verbose_name='状态')),
+                ('progress', models.FloatField(default=0.0, verbose_name='进度')),
+                ('rows_read', models.IntegerField(default=0, verbose_name='已读取行数')),
+                ('inserted', models.IntegerField(default=0, verbose_name='新增条数')),
+                ('updated', models.IntegerField(default=0, verbose_name='更新条数')),
+                ('skipped', models.IntegerField(default=0, verbose_name='跳过条数')),
+                ('error', models.TextField(blank=True, default='', verbose_name='错误信息')),
+                ('start_time', models.DateTimeField(blank=True, null=True, verbose_name='开始时间')),
+                ('finish_time', models.DateTimeField(blank=True, null=True, verbose_name='结束时间')),
+                ('job', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='tasks', to='data_process.ingestjob', verbose_name='所属任务')),
+            ],
+            options={
+                'verbose_name': '数据导入子任务',
+                'verbose_name_plural': '数据导入子任务',
+            },
+        ),
+    ]
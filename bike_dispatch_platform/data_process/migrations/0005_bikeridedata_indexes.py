@@ -0,0 +1,23 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('data_process', '0004_ingestjob_ingesttask'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='bikeridedata',
+            index=models.Index(fields=['upload_user', 'id'], name='ride_user_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='bikeridedata',
+            index=models.Index(fields=['status', 'ride_datetime'], name='ride_status_time_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='bikeridedata',
+            index=models.Index(fields=['start_point', 'ride_datetime'], name='ride_start_time_idx'),
+        ),
+    ]
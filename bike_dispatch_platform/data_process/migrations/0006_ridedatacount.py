@@ -0,0 +1,26 @@
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('data_process', '0005_bikeridedata_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RideDataCount',
+            fields=[
+                ('upload_user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, serialize=False, to=settings.AUTH_USER_MODEL, verbose_name='上传用户')),
+                ('row_count', models.BigIntegerField(default=0, verbose_name='数据条数')),
+                ('update_time', models.DateTimeField(auto_now=True, verbose_name='更新时间')),
+            ],
+            options={
+                'verbose_name': '骑行数据计数',
+                'verbose_name_plural': '骑行数据计数',
+            },
+        ),
+    ]
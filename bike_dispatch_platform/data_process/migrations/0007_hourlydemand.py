@@ -0,0 +1,28 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('data_process', '0006_ridedatacount'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='HourlyDemand',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('region', models.CharField(max_length=100, verbose_name='区域')),
+                ('date', models.DateField(verbose_name='日期')),
+                ('hour', models.SmallIntegerField(verbose_name='小时')),
+                ('ride_count', models.IntegerField(default=0, verbose_name='骑行次数')),
+                ('total_duration', models.FloatField(default=0.0, verbose_name='总骑行时长')),
+                ('total_distance', models.FloatField(default=0.0, verbose_name='总骑行距离')),
+            ],
+            options={
+                'verbose_name': '小时需求汇总',
+                'verbose_name_plural': '小时需求汇总',
+                'unique_together': {('region', 'date', 'hour')},
+            },
+        ),
+    ]
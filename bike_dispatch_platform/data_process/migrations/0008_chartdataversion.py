@@ -0,0 +1,23 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('data_process', '0007_hourlydemand'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ChartDataVersion',
+            fields=[
+                ('id', models.PositiveSmallIntegerField(default=1, primary_key=True, serialize=False)),
+                ('version', models.BigIntegerField(verbose_name='版本号')),
+                ('update_time', models.DateTimeField(auto_now=True, verbose_name='更新时间')),
+            ],
+            options={
+                'verbose_name': '图表数据版本',
+                'verbose_name_plural': '图表数据版本',
+            },
+        ),
+    ]
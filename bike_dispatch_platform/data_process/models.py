@@ -1,4 +1,5 @@
-from django.db import models
+from django.db import connection, models
+from django.utils import timezone
 from system_support.models import User  # 关联自定义用户模型
 
 class BikeRideData(models.Model):
@@ -35,6 +36,15 @@ class BikeRideData(models.Model):
     class Meta:
         verbose_name = "骑行数据"
         verbose_name_plural = "骑行数据"
+        # 热点查询索引（执行计划校验见 manage.py query_plan_check 与 tests.QueryPlanTests）
+        indexes = [
+            # 数据列表：按上传用户筛选、按 id 倒序
+            models.Index(fields=["upload_user", "id"], name="ride_user_id_idx"),
+            # 热力图/需求统计：按状态筛选、按时间范围与小时聚合
+            models.Index(fields=["status", "ride_datetime"], name="ride_status_time_idx"),
+            # 区域需求查询：按起点筛选、按时间范围
+            models.Index(fields=["start_point", "ride_datetime"], name="ride_start_time_idx"),
+        ]
 
     def __str__(self):
         return f"{self.ride_datetime} - {self.start_point}→{self.end_point}"
@@ -59,4 +69,178 @@ class WeatherData(models.Model):
         unique_together = ("area", "date")  # 避免同一区域同一天重复数据
 
     def __str__(self):
-        return f"{self.area} - {self.date} - {self.weather_type}"
\ No newline at end of file
+        return f"{self.area} - {self.date} - {self.weather_type}"
+
+class IngestJob(models.Model):
+    """数据导入任务（一次上传，可包含多个文件；文件保存在 MEDIA_ROOT 下由后台进程池导入）"""
+    KIND_CHOICES = [("ride", "骑行数据"), ("weather", "天气数据")]
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES, default="ride", verbose_name="数据类型")
+    data_source = models.CharField(max_length=50, verbose_name="数据来源")
+    overwrite = models.BooleanField(default=False, verbose_name="覆盖已有数据")
+    upload_user = models.ForeignKey(User, on_delete=models.CASCADE, verbose_name="上传用户")
+    create_time = models.DateTimeField(auto_now_add=True, verbose_name="创建时间")
+
+    class Meta:
+        verbose_name = "数据导入任务"
+        verbose_name_plural = "数据导入任务"
+
+    def __str__(self):
+        return f"{self.get_kind_display()}导入任务 #{self.pk}"
+
+
+class IngestTask(models.Model):
+    """导入子任务（一个文件的一个工作表），进程池中并行执行"""
+    STATUS_CHOICES = [("pending", "排队中"), ("running", "导入中"), ("success", "已完成"), ("failed", "失败")]
+    job = models.ForeignKey(IngestJob, on_delete=models.CASCADE, related_name="tasks", verbose_name="所属任务")
+    file_path = models.CharField(max_length=255, verbose_name="文件路径")  # 相对 MEDIA_ROOT
+    file_name = models.CharField(max_length=255, verbose_name="文件名")
+    sheet = models.CharField(max_length=100, blank=True, default="", verbose_name="工作表")
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default="pending", verbose_name="状态")
+    progress = models.FloatField(default=0.0, verbose_name="进度")  # 0~1
+    rows_read = models.IntegerField(default=0, verbose_name="已读取行数")
+    inserted = models.IntegerField(default=0, verbose_name="新增条数")
+    updated = models.IntegerField(default=0, verbose_name="更新条数")
+    skipped = models.IntegerField(default=0, verbose_name="跳过条数")
+    error = models.TextField(blank=True, default="", verbose_name="错误信息")
+    start_time = models.DateTimeField(null=True, blank=True, verbose_name="开始时间")
+    finish_time = models.DateTimeField(null=True, blank=True, verbose_name="结束时间")
+
+    class Meta:
+        verbose_name = "数据导入子任务"
+        verbose_name_plural = "数据导入子任务"
+
+    def __str__(self):
+        return f"{self.file_name}{f' [{self.sheet}]' if self.sheet else ''} - {self.get_status_display()}"
+
+
+class RideDataCount(models.Model):
+    """
+    每个用户的骑行数据条数（数据列表显示总数用，避免每次打开列表都 count() 全表）
+    入库时随批量插入在同一事务内累加；首次查询或首次入库时按实际条数初始化
+    """
+    upload_user = models.OneToOneField(User, on_delete=models.CASCADE, primary_key=True, verbose_name="上传用户")
+    row_count = models.BigIntegerField(default=0, verbose_name="数据条数")
+    update_time = models.DateTimeField(auto_now=True, verbose_name="更新时间")
+
+    class Meta:
+        verbose_name = "骑行数据计数"
+        verbose_name_plural = "骑行数据计数"
+
+    def __str__(self):
+        return f"{self.upload_user} - {self.row_count}条"
+
+    @classmethod
+    def _upsert(cls, upload_user, on_conflict, params=()):
+        """
+        一条 INSERT ... SELECT COUNT(*) ... ON CONFLICT 语句完成“无计数记录时按实际条数初始化，否则按 on_conflict 处理”，
+        初始化与累加之间没有先查后写的空隙：并发的入库事务要么被计入 COUNT(*)（本事务内的新行），
+        要么在唯一键冲突处等待对方提交后走 on_conflict 分支（SQLite 3.24+ / PostgreSQL）
+        """
+        table = connection.ops.quote_name(cls._meta.db_table)
+        rides = connection.ops.quote_name(BikeRideData._meta.db_table)
+        now = connection.ops.adapt_datetimefield_value(timezone.now())
+        user_id = getattr(upload_user, "pk", upload_user)
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"INSERT INTO {table} (upload_user_id, row_count, update_time) "
+                f"SELECT %s, COUNT(*), %s FROM {rides} WHERE upload_user_id = %s "
+                f"ON CONFLICT (upload_user_id) {on_conflict}",
+                [user_id, now, user_id, *params],
+            )
+
+    @classmethod
+    def add(cls, upload_user, rows):
+        """累加入库条数（应在插入数据的同一事务内、插入之后调用；尚无计数记录时按含本批在内的实际条数初始化）"""
+        if rows:
+            table = connection.ops.quote_name(cls._meta.db_table)
+            cls._upsert(upload_user, f"DO UPDATE SET row_count = {table}.row_count + %s, "
+                                     f"update_time = excluded.update_time", [int(rows)])
+
+    @classmethod
+    def get_count(cls, upload_user):
+        """返回用户的数据条数（无计数记录时执行一次 count() 并保存）"""
+        counter = cls.objects.filter(upload_user=upload_user).only("row_count").first()
+        if counter is None:
+            cls._upsert(upload_user, "DO NOTHING")
+            counter = cls.objects.only("row_count").get(upload_user=upload_user)
+        return counter.row_count
+
+    @classmethod
+    def recount(cls, upload_user):
+        """按实际条数重建计数（删除数据后调用）"""
+        cls._upsert(upload_user, "DO UPDATE SET row_count = excluded.row_count, update_time = excluded.update_time")
+        return cls.objects.only("row_count").get(upload_user=upload_user).row_count
+
+
+class HourlyDemand(models.Model):
+    """
+    小时级需求汇总（区域 × 日期 × 小时），由已清洗的骑行数据汇总而来，供热力图等需求统计直接查询
+    入库时随批量插入增量累加；rebuild_demand_rollup 命令可按骑行数据全量重建
+    保存合计值而不是平均值，增量累加时无需回读已有数据
+    """
+    region = models.CharField(max_length=100, verbose_name="区域")  # 骑行起点
+    date = models.DateField(verbose_name="日期")
+    hour = models.SmallIntegerField(verbose_name="小时")  # 0~23，TIME_ZONE 本地时间
+    ride_count = models.IntegerField(default=0, verbose_name="骑行次数")
+    total_duration = models.FloatField(default=0.0, verbose_name="总骑行时长")
+    total_distance = models.FloatField(default=0.0, verbose_name="总骑行距离")
+
+    class Meta:
+        verbose_name = "小时需求汇总"
+        verbose_name_plural = "小时需求汇总"
+        unique_together = ("region", "date", "hour")
+
+    def __str__(self):
+        return f"{self.region} - {self.date} {self.hour}时 - {self.ride_count}次"
+
+    @property
+    def avg_duration(self):
+        return self.total_duration / self.ride_count if self.ride_count else 0.0
+
+    @property
+    def avg_distance(self):
+        return self.total_distance / self.ride_count if self.ride_count else 0.0
+
+
+class ChartDataVersion(models.Model):
+    """
+    图表缓存的数据版本号（单行表，见 chart_cache.py）
+    版本号存于数据库而不是缓存：文件缓存的 incr 是“读-改-写”，多进程同时入库时会丢失递增，
+    一条 INSERT ... ON CONFLICT DO UPDATE 语句在数据库内原子递增
+    """
+    id = models.PositiveSmallIntegerField(primary_key=True, default=1)
+    version = models.BigIntegerField(verbose_name="版本号")
+    update_time = models.DateTimeField(auto_now=True, verbose_name="更新时间")
+
+    class Meta:
+        verbose_name = "图表数据版本"
+        verbose_name_plural = "图表数据版本"
+
+    def __str__(self):
+        return f"v{self.version}"
+
+    @classmethod
+    def _upsert(cls, on_conflict):
+        """无版本记录时以当前毫秒时间戳初始化（数据库重建后不会与缓存中的旧版本号重复），否则按 on_conflict 处理"""
+        table = connection.ops.quote_name(cls._meta.db_table)
+        now = timezone.now()
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"INSERT INTO {table} (id, version, update_time) VALUES (1, %s, %s) ON CONFLICT (id) {on_conflict}",
+                [int(now.timestamp() * 1000), connection.ops.adapt_datetimefield_value(now)],
+            )
+
+    @classmethod
+    def current(cls):
+        version = cls.objects.filter(pk=1).values_list("version", flat=True).first()
+        if version is None:
+            cls._upsert("DO NOTHING")
+            version = cls.objects.values_list("version", flat=True).get(pk=1)
+        return version
+
+    @classmethod
+    def bump(cls):
+        """版本号原子加一，返回递增后的版本号"""
+        table = connection.ops.quote_name(cls._meta.db_table)
+        cls._upsert(f"DO UPDATE SET version = {table}.version + 1, update_time = excluded.update_time")
+        return cls.objects.values_list("version", flat=True).get(pk=1)
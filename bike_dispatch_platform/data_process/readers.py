@@ -0,0 +1,93 @@
+"""
+上传文件的分块流式读取
+CSV 用 pandas 的 chunksize 迭代读取，xlsx 用 openpyxl 只读模式逐行读取，每次只在内存中保留一个块，
+上传文件再大，读取 + 清洗 + 入库的内存占用也只与 DATA_INGEST_CHUNK_ROWS 有关。
+"""
+import codecs
+
+import pandas as pd
+from django.conf import settings
+
+CSV_ENCODINGS = ("utf-8", "gbk", "gb2312")  # 依次尝试，兼容中文 Windows 导出的文件
+SNIFF_BYTES = 1024 * 1024  # 判断编码时读取的字节数
+
+
+def detect_csv_encoding(file, encodings=CSV_ENCODINGS):
+    """读取文件开头一段字节判断编码（不整体解码文件），读取后文件指针回到开头"""
+    file.seek(0)
+    head = file.read(SNIFF_BYTES)
+    file.seek(0)
+    if isinstance(head, str):
+        return None  # 文本模式打开的文件无需指定编码
+    for enc in encodings:
+        try:
+            # 增量解码器允许末尾是被截断的多字节字符
+            codecs.getincrementaldecoder(enc)().decode(head, final=False)
+            return enc
+        except UnicodeDecodeError:
+            continue
+    raise ValueError(f"文件编码不支持，仅支持{'/'.join(encodings)}")
+
+
+def list_sheets(file):
+    """返回需要导入的工作表名列表（CSV 只有一个“表”，返回 [None]）"""
+    name = file.name.lower()
+    if name.endswith(".xlsx"):
+        from openpyxl import load_workbook
+
+        workbook = load_workbook(file, read_only=True)
+        try:
+            return list(workbook.sheetnames)
+        finally:
+            workbook.close()
+    if name.endswith(".xls"):
+        return pd.ExcelFile(file, engine="xlrd").sheet_names
+    return [None]
+
+
+def _iter_xlsx_chunks(file, chunksize, sheet=None):
+    """openpyxl 只读模式逐行读取工作表（默认第一个），按 chunksize 行组装 DataFrame"""
+    from openpyxl import load_workbook
+
+    workbook = load_workbook(file, read_only=True, data_only=True)
+    try:
+        worksheet = workbook[sheet] if sheet else workbook.worksheets[0]
+        rows = worksheet.iter_rows(values_only=True)
+        header = next(rows, None)
+        if header is None:
+            return
+        columns = [str(col).strip() if col is not None else f"Unnamed: {i}" for i, col in enumerate(header)]
+        buffer = []
+        for row in rows:
+            if all(value is None for value in row):
+                continue  # 跳过空行（只读模式下表格末尾常有格式残留的空行）
+            buffer.append(row)
+            if len(buffer) >= chunksize:
+                yield pd.DataFrame(buffer, columns=columns)
+                buffer = []
+        if buffer:
+            yield pd.DataFrame(buffer, columns=columns)
+    finally:
+        workbook.close()
+
+
+def iter_upload_chunks(file, chunksize=None, sheet=None):
+    """
+    按块读取上传的 CSV / Excel 文件（Excel 可指定工作表，默认第一个），逐块返回 DataFrame
+    - .csv：先判断编码，再用 read_csv(chunksize=...) 流式读取
+    - .xlsx：openpyxl 只读模式
+    - .xls：旧格式 xlrd 不支持流式读取，仍整体读入后再按块切分
+    """
+    chunksize = chunksize or settings.DATA_INGEST_CHUNK_ROWS
+    name = file.name.lower()
+    if name.endswith(".csv"):
+        # Django 的 UploadedFile 不会被 pandas 识别为二进制流（encoding 参数会被忽略），直接读取底层文件对象
+        raw = getattr(file, "file", file)
+        encoding = detect_csv_encoding(raw)
+        yield from pd.read_csv(raw, encoding=encoding, chunksize=chunksize)
+    elif name.endswith(".xlsx"):
+        yield from _iter_xlsx_chunks(file, chunksize, sheet)
+    else:
+        df = pd.read_excel(file, engine="xlrd", sheet_name=sheet or 0)
+        for start in range(0, len(df), chunksize):
+            yield df.iloc[start:start + chunksize]
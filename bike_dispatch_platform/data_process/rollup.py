@@ -0,0 +1,92 @@
+"""
+小时级需求汇总（HourlyDemand）的增量累加、全量重建与查询
+骑行数据入库时按（起点, 日期, 小时）分组合计，用 INSERT ... ON CONFLICT DO UPDATE 累加到汇总表：
+一条语句完成“不存在则插入、存在则累加”，多个导入进程同时写同一格也不会丢失计数（SQLite 3.24+ / PostgreSQL）。
+热力图等需求统计只查汇总表，耗时与骑行数据总量无关。
+"""
+from django.db import connection, transaction
+from django.db.models import Count, Sum
+from django.db.models.functions import ExtractHour, TruncDate
+from django.utils import timezone
+
+from .chart_cache import invalidate_on_commit
+from .models import BikeRideData, HourlyDemand
+
+ROLLUP_BATCH_SIZE = 2000
+
+
+def rollup_frame(frame):
+    """按（起点, 本地日期, 小时）分组合计，frame 为 build_ride_frame 的输出（ride_datetime 带时区）"""
+    local = frame['ride_datetime'].dt.tz_convert(timezone.get_default_timezone_name())
+    grouped = frame.groupby(
+        [frame['start_point'].rename('region'), local.dt.date.rename('date'), local.dt.hour.rename('hour')],
+        sort=False
+    ).agg(ride_count=('duration', 'size'), total_duration=('duration', 'sum'), total_distance=('distance', 'sum'))
+    return grouped.reset_index()
+
+
+def _upsert_sql():
+    table = connection.ops.quote_name(HourlyDemand._meta.db_table)
+    return (
+        f"INSERT INTO {table} (region, date, hour, ride_count, total_duration, total_distance) "
+        f"VALUES (%s, %s, %s, %s, %s, %s) "
+        f"ON CONFLICT (region, date, hour) DO UPDATE SET "
+        f"ride_count = {table}.ride_count + excluded.ride_count, "
+        f"total_duration = {table}.total_duration + excluded.total_duration, "
+        f"total_distance = {table}.total_distance + excluded.total_distance"
+    )
+
+
+def add_rides_to_rollup(frame):
+    """把一批新入库的骑行数据累加到汇总表（应在入库的同一事务内调用），返回涉及的汇总行数"""
+    if frame.empty:
+        return 0
+    grouped = rollup_frame(frame)
+    params = [
+        (region, connection.ops.adapt_datefield_value(day), int(hour), int(count), float(duration), float(distance))
+        for region, day, hour, count, duration, distance in grouped.itertuples(index=False, name=None)
+    ]
+    with connection.cursor() as cursor:
+        cursor.executemany(_upsert_sql(), params)
+    return len(params)
+
+
+def rebuild_rollup():
+    """按已清洗的骑行数据全量重建汇总表（数据库内分组聚合，一个事务），返回汇总行数"""
+    tz = timezone.get_default_timezone()
+    rows = (
+        BikeRideData.objects.filter(status='cleaned')
+        .values('start_point', day=TruncDate('ride_datetime', tzinfo=tz), hr=ExtractHour('ride_datetime', tzinfo=tz))
+        .annotate(ride_count=Count('id'), total_duration=Sum('duration'), total_distance=Sum('distance'))
+        .order_by()
+    )
+    total = 0
+    with transaction.atomic():
+        HourlyDemand.objects.all().delete()
+        batch = []
+        for row in rows.iterator(chunk_size=ROLLUP_BATCH_SIZE):
+            batch.append(HourlyDemand(
+                region=row['start_point'], date=row['day'], hour=row['hr'], ride_count=row['ride_count'],
+                total_duration=row['total_duration'] or 0.0, total_distance=row['total_distance'] or 0.0,
+            ))
+            if len(batch) >= ROLLUP_BATCH_SIZE:
+                HourlyDemand.objects.bulk_create(batch)
+                total += len(batch)
+                batch = []
+        HourlyDemand.objects.bulk_create(batch)
+        total += len(batch)
+        invalidate_on_commit()
+    return total
+
+
+def region_hour_demand(start_date=None, end_date=None):
+    """各区域各小时的骑行需求（可按日期范围筛选），返回 [(区域, 小时, 骑行次数), ...]"""
+    rows = HourlyDemand.objects.all()
+    if start_date:
+        rows = rows.filter(date__gte=start_date)
+    if end_date:
+        rows = rows.filter(date__lte=end_date)
+    return list(
+        rows.values('region', 'hour').annotate(demand=Sum('ride_count'))
+        .order_by('region', 'hour').values_list('region', 'hour', 'demand')
+    )
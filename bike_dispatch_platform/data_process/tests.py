@@ -1,3 +1,361 @@
-from django.test import TestCase
+import io
+import unittest
+from datetime import date
 
-# Create your tests here.
+import numpy as np
+import pandas as pd
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection
+from django.utils import timezone
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+
+from . import chart_cache
+from .ingest import ChunkDeduplicator, ingest_weather_chunks
+from .management.commands.query_plan_check import Command as QueryPlanCheck, hot_queries
+from .models import BikeRideData, RideDataCount, WeatherData
+from .readers import detect_csv_encoding, iter_upload_chunks, list_sheets
+from .utils import CleaningReport, data_cleaning
+from system_support.models import User
+
+
+def ride_frame(rows):
+    """rows 为 (起点, 终点, 骑行时间) 列表"""
+    return pd.DataFrame(rows, columns=['start_point', 'end_point', 'ride_datetime'])
+
+
+class ChunkDeduplicatorTests(SimpleTestCase):
+    def test_rows_seen_in_earlier_chunks_are_dropped(self):
+        deduplicator = ChunkDeduplicator()
+        first = ride_frame([('A', 'B', '2024-01-01 08:00'), ('A', 'C', '2024-01-01 09:00')])
+        second = ride_frame([('A', 'C', '2024-01-01 09:00'), ('B', 'C', '2024-01-01 10:00'),
+                             ('A', 'B', '2024-01-01 08:00')])
+        self.assertEqual(len(deduplicator.filter(first)), 2)
+        kept = deduplicator.filter(second)
+        self.assertEqual(kept.values.tolist(), [['B', 'C', '2024-01-01 10:00']])
+        self.assertEqual(kept.index.tolist(), [1])  # 保留原行索引
+
+    def test_any_key_column_difference_is_a_new_row(self):
+        deduplicator = ChunkDeduplicator()
+        deduplicator.filter(ride_frame([('A', 'B', '2024-01-01 08:00')]))
+        kept = deduplicator.filter(ride_frame([('A', 'B', '2024-01-01 08:01'), ('B', 'A', '2024-01-01 08:00')]))
+        self.assertEqual(len(kept), 2)
+
+    def test_only_key_columns_are_compared(self):
+        deduplicator = ChunkDeduplicator()
+        first = ride_frame([('A', 'B', '2024-01-01 08:00')]).assign(duration=10.0)
+        deduplicator.filter(first)
+        self.assertTrue(deduplicator.filter(first.assign(duration=20.0)).empty)
+
+    def test_seen_hashes_stay_sorted_and_unique(self):
+        deduplicator = ChunkDeduplicator()
+        hours = [str(h) for h in pd.date_range('2024-01-01', periods=100, freq='h')]
+        kept = [len(deduplicator.filter(ride_frame([('A', 'B', h) for h in hours[start:start + 50]])))
+                for start in (0, 50, 25)]  # 第三块与前两块各重叠一半
+        self.assertEqual(kept, [50, 50, 0])
+        seen = deduplicator._seen
+        self.assertEqual(len(seen), 100)
+        self.assertTrue((np.diff(seen.astype(np.float64)) >= 0).all())
+        self.assertEqual(len(np.unique(seen)), len(seen))
+
+    def test_empty_chunk(self):
+        deduplicator = ChunkDeduplicator()
+        self.assertTrue(deduplicator.filter(ride_frame([])).empty)
+        self.assertEqual(len(deduplicator.filter(ride_frame([('A', 'B', '2024-01-01 08:00')]))), 1)
+
+
+def csv_upload(text, encoding='utf-8', name='rides.csv'):
+    return SimpleUploadedFile(name, text.encode(encoding))
+
+
+def xlsx_upload(sheets, name='rides.xlsx'):
+    """sheets 为 {工作表名: 行列表（第一行为表头）}"""
+    from openpyxl import Workbook
+
+    workbook = Workbook()
+    workbook.remove(workbook.active)
+    for title, rows in sheets.items():
+        worksheet = workbook.create_sheet(title)
+        for row in rows:
+            worksheet.append(row)
+    buffer = io.BytesIO()
+    workbook.save(buffer)
+    return SimpleUploadedFile(name, buffer.getvalue())
+
+
+class ReaderTests(SimpleTestCase):
+    CSV = '区域,日期,温度\n' + ''.join(f'朝阳区,2024-01-{day:02d},{day}\n' for day in range(1, 8))
+
+    def test_csv_chunks_cover_all_rows(self):
+        chunks = list(iter_upload_chunks(csv_upload(self.CSV), chunksize=3))
+        self.assertEqual([len(chunk) for chunk in chunks], [3, 3, 1])
+        self.assertEqual(pd.concat(chunks)['温度'].tolist(), list(range(1, 8)))
+        self.assertEqual(list(chunks[0].columns), ['区域', '日期', '温度'])
+
+    @override_settings(DATA_INGEST_CHUNK_ROWS=4)
+    def test_chunksize_defaults_to_setting(self):
+        chunks = list(iter_upload_chunks(csv_upload(self.CSV)))
+        self.assertEqual([len(chunk) for chunk in chunks], [4, 3])
+
+    def test_gbk_csv(self):
+        upload = csv_upload(self.CSV, encoding='gbk')
+        self.assertEqual(detect_csv_encoding(upload.file), 'gbk')
+        self.assertEqual(upload.file.tell(), 0)  # 判断编码后指针回到开头
+        chunk = next(iter_upload_chunks(upload, chunksize=10))
+        self.assertEqual(chunk['区域'].iloc[0], '朝阳区')
+
+    def test_multibyte_character_cut_at_sniff_boundary(self):
+        from . import readers
+
+        text = '区域\n' + '朝' * readers.SNIFF_BYTES  # 嗅探的字节数落在多字节字符中间
+        self.assertEqual(detect_csv_encoding(io.BytesIO(text.encode('utf-8'))), 'utf-8')
+
+    def test_unsupported_encoding(self):
+        with self.assertRaises(ValueError):
+            detect_csv_encoding(io.BytesIO('区域\n朝阳区\n'.encode('utf-16')))
+
+    def test_xlsx_chunks_skip_blank_rows(self):
+        rows = [['区域', '日期', '温度']] + [['朝阳区', f'2024-01-{day:02d}', day] for day in range(1, 6)]
+        rows.insert(3, [None, None, None])
+        chunks = list(iter_upload_chunks(xlsx_upload({'Sheet1': rows}), chunksize=2))
+        self.assertEqual([len(chunk) for chunk in chunks], [2, 2, 1])
+        self.assertEqual(pd.concat(chunks)['温度'].tolist(), [1, 2, 3, 4, 5])
+
+    def test_xlsx_sheet_selection(self):
+        upload = xlsx_upload({'一月': [['区域'], ['朝阳区']], '二月': [['区域'], ['海淀区'], ['西城区']]})
+        self.assertEqual(list_sheets(upload), ['一月', '二月'])
+        self.assertEqual(next(iter_upload_chunks(upload, chunksize=10))['区域'].tolist(), ['朝阳区'])
+        chunk = next(iter_upload_chunks(upload, chunksize=10, sheet='二月'))
+        self.assertEqual(chunk['区域'].tolist(), ['海淀区', '西城区'])
+
+    def test_xlsx_empty_sheet_and_missing_header(self):
+        upload = xlsx_upload({'Sheet1': [], 'Sheet2': [['区域', None], ['朝阳区', 1]]})
+        self.assertEqual(list(iter_upload_chunks(upload)), [])
+        chunk = next(iter_upload_chunks(upload, sheet='Sheet2'))
+        self.assertEqual(list(chunk.columns), ['区域', 'Unnamed: 1'])
+
+    def test_csv_has_single_sheet(self):
+        self.assertEqual(list_sheets(csv_upload(self.CSV)), [None])
+
+
+def weather_chunk(rows):
+    """rows 为 (区域, 日期, 温度) 列表"""
+    return pd.DataFrame(rows, columns=['区域', '日期', '温度'])
+
+
+class WeatherIngestTests(TestCase):
+    def setUp(self):
+        WeatherData.objects.create(area='朝阳区', date=date(2024, 1, 1), temperature=1, humidity=0, wind_speed=0)
+
+    def test_invalid_and_repeated_rows_are_skipped(self):
+        chunks = [weather_chunk([('朝阳区', '2024-01-02', 2), ('', '2024-01-03', 3),      # 区域为空
+                                 ('朝阳区', '2024/01/04', 4), ('朝阳区', '2024-01-02', 5)]),  # 日期格式错误、块内重复
+                  weather_chunk([('朝阳区', '2024-01-02', 6), ('海淀区', '2024-01-02', 7)])]  # 与上一块重复
+        summary = ingest_weather_chunks(chunks)
+        self.assertEqual({k: summary[k] for k in ('inserted', 'updated', 'skipped')},
+                         {'inserted': 2, 'updated': 0, 'skipped': 4})
+        self.assertEqual(WeatherData.objects.get(area='朝阳区', date=date(2024, 1, 2)).temperature, 2)
+
+    def test_existing_rows_skipped_without_overwrite(self):
+        summary = ingest_weather_chunks([weather_chunk([('朝阳区', '2024-01-01', 9), ('朝阳区', '2024-01-02', 2)])])
+        self.assertEqual((summary['inserted'], summary['skipped']), (1, 1))
+        self.assertEqual(WeatherData.objects.get(area='朝阳区', date=date(2024, 1, 1)).temperature, 1)
+
+    def test_overwrite_counts_each_key_once(self):
+        chunks = [weather_chunk([('朝阳区', '2024-01-01', 9), ('朝阳区', '2024-01-02', 2)]),
+                  weather_chunk([('朝阳区', '2024-01-02', 8), ('朝阳区', '2024-01-01', 8)])]  # 文件内跨块重复
+        reported = []
+        summary = ingest_weather_chunks(chunks, overwrite=True, on_chunk=lambda rows, counts: reported.append(counts))
+        self.assertEqual({k: summary[k] for k in ('inserted', 'updated', 'skipped')},
+                         {'inserted': 1, 'updated': 1, 'skipped': 2})
+        self.assertEqual(reported[1], {'skipped': 2})
+        self.assertEqual(WeatherData.objects.get(area='朝阳区', date=date(2024, 1, 1)).temperature, 9)
+        self.assertEqual(WeatherData.objects.get(area='朝阳区', date=date(2024, 1, 2)).temperature, 2)
+
+
+class DataCleaningTests(SimpleTestCase):
+    def setUp(self):
+        self.df = pd.DataFrame({
+            'start_point': ['A', 'A', None, 'B', 'C', 'D'],
+            'end_point': ['B', 'B', 'C', None, 'D', 'E'],
+            'ride_datetime': ['2024-01-01 08:00', '2024-01-01 08:00', '2024-01-01 09:00',  # 前两行重复
+                              'bad', '2024-01-01 10:00', '2024-01-01 11:00'],
+            'duration': [10.0, 99.0, None, 5.0, -1.0, 'x'],
+            'distance': [1.0, 1.0, 2.0, 3.0, 4.0, None],
+            'weather': ['rain', 'rain', None, 'sunny', 'sunny', 'cloudy'],
+        })
+
+    def test_masks_drop_duplicates_missing_time_and_negatives(self):
+        report = CleaningReport(len(self.df))
+        cleaned = data_cleaning(self.df, compact=False, report=report)
+        # 第2行与第1行重复；第4行时间无法解析；第5行时长为负
+        self.assertEqual(cleaned.index.tolist(), [0, 2, 5])
+        self.assertEqual(dict((name, dropped) for name, _, dropped in report.steps),
+                         {'解析时间': 0, '去重': 1, '填充缺失值': 0, '合并过滤': 2, '组装与压缩': 0})
+        self.assertEqual((report.rows_in, report.rows_out), (6, 3))
+
+    def test_missing_numbers_filled_with_mean_of_deduplicated_rows(self):
+        cleaned = data_cleaning(self.df, compact=False)
+        # 时长均值只用去重后的有效值（10, 5, -1），不含重复行的 99
+        self.assertAlmostEqual(cleaned.loc[2, 'duration'], 14 / 3)
+        self.assertAlmostEqual(cleaned.loc[5, 'duration'], 14 / 3)
+        self.assertAlmostEqual(cleaned.loc[5, 'distance'], 2.5)  # 去重后 1, 2, 3, 4 的均值
+        self.assertEqual(cleaned['duration'].dtype, np.float64)
+
+    def test_strings_filled_and_time_parsed(self):
+        cleaned = data_cleaning(self.df, compact=False)
+        self.assertEqual(cleaned.loc[2, 'start_point'], '未知起点')
+        self.assertEqual(cleaned.loc[2, 'weather'], 'sunny')
+        self.assertEqual(cleaned.loc[0, 'ride_datetime'], pd.Timestamp('2024-01-01 08:00'))
+        self.assertEqual(list(cleaned.columns), list(self.df.columns))
+
+    def test_compact_types(self):
+        cleaned = data_cleaning(self.df)
+        self.assertEqual(cleaned['duration'].dtype, np.float32)
+        self.assertIsInstance(cleaned['start_point'].dtype, pd.CategoricalDtype)
+        self.assertEqual(cleaned['start_point'].tolist(), ['A', '未知起点', 'D'])
+        self.assertEqual(cleaned['weather'].tolist(), ['rain', 'sunny', 'cloudy'])
+
+    def test_input_not_modified(self):
+        original = self.df.copy()
+        data_cleaning(self.df)
+        pd.testing.assert_frame_equal(self.df, original)
+
+    def test_missing_columns(self):
+        df = pd.DataFrame({'start_point': ['A', 'A'], 'duration': [1.0, None]})
+        cleaned = data_cleaning(df, compact=False)
+        self.assertEqual(cleaned['duration'].tolist(), [1.0])  # 按起点去重，无时间列时不按时间过滤
+
+    def test_report_text(self):
+        report = CleaningReport(len(self.df))
+        data_cleaning(self.df, report=report)
+        text = str(report)
+        self.assertTrue(text.startswith('清洗 6 行 → 3 行'))
+        self.assertIn('去重', text)
+        self.assertEqual(len(text.splitlines()), 1 + len(report.steps))
+        self.assertAlmostEqual(report.seconds, sum(seconds for _, seconds, _ in report.steps))
+
+
+class QueryPlanTests(TestCase):
+    """热点查询的执行计划使用了 BikeRideData.Meta.indexes 中的复合索引（与 manage.py query_plan_check 相同的查询）"""
+    COMPOSITE_INDEXES = ('ride_user_id_idx', 'ride_status_time_idx', 'ride_start_time_idx')
+
+    def plans(self):
+        return [(name, QueryPlanCheck.explain(queryset, connection.vendor), indexes)
+                for name, queryset, indexes in hot_queries()]
+
+    def assert_plans_use_indexes(self):
+        plans = self.plans()
+        for name, plan, indexes in plans:
+            with self.subTest(query=name):
+                self.assertTrue(any(index in plan for index in indexes), plan)
+        combined = '\n'.join(plan for _, plan, _ in plans)
+        for index in self.COMPOSITE_INDEXES:
+            self.assertIn(index, combined)
+        return plans
+
+    @unittest.skipUnless(connection.vendor == 'sqlite', 'SQLite 执行计划')
+    def test_sqlite_hot_queries_use_indexes(self):
+        for name, plan, _ in self.assert_plans_use_indexes():
+            with self.subTest(query=name):
+                self.assertNotIn('SCAN data_process_bikeridedata', plan)  # 无全表扫描
+                self.assertNotIn('FOR ORDER BY', plan)  # id 倒序直接取自索引，无额外排序
+
+    @unittest.skipUnless(connection.vendor == 'postgresql', 'PostgreSQL 执行计划')
+    def test_postgresql_hot_queries_use_indexes(self):
+        for name, plan, _ in self.assert_plans_use_indexes():
+            with self.subTest(query=name):
+                self.assertNotIn('Seq Scan', plan)
+
+
+class RideDataCountTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('counter', password='p')
+
+    def insert_rides(self, rows, user=None):
+        BikeRideData.objects.bulk_create([
+            BikeRideData(data_source='test', start_point='A', end_point='B', ride_datetime=timezone.now(),
+                         upload_user=user or self.user)
+            for _ in range(rows)
+        ])
+
+    def test_first_add_initializes_from_actual_rows(self):
+        self.insert_rides(3)  # 计数记录不存在时入库：应按含本批在内的实际条数初始化，而不是忽略
+        RideDataCount.add(self.user, 3)
+        self.assertEqual(RideDataCount.objects.get(upload_user=self.user).row_count, 3)
+        self.insert_rides(2)
+        RideDataCount.add(self.user, 2)
+        self.assertEqual(RideDataCount.get_count(self.user), 5)
+
+    def test_get_count_initializes_once(self):
+        self.insert_rides(4)
+        self.assertEqual(RideDataCount.get_count(self.user), 4)
+        BikeRideData.objects.filter(pk=BikeRideData.objects.first().pk).delete()  # 不经 add/recount 的变更
+        self.assertEqual(RideDataCount.get_count(self.user), 4)
+        self.assertEqual(RideDataCount.recount(self.user), 3)
+        self.assertEqual(RideDataCount.get_count(self.user), 3)
+
+    def test_counts_are_per_user(self):
+        other = User.objects.create_user('other', password='p')
+        self.insert_rides(2)
+        self.insert_rides(5, other)
+        RideDataCount.add(other, 5)
+        self.assertEqual(RideDataCount.get_count(self.user), 2)
+        self.assertEqual(RideDataCount.get_count(other.pk), 5)
+
+    def test_zero_rows_is_a_no_op(self):
+        RideDataCount.add(self.user, 0)
+        self.assertFalse(RideDataCount.objects.exists())
+
+
+@override_settings(DATA_INGEST_ASYNC=False,
+                   CACHES={'charts': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+class SyncUploadTests(TestCase):
+    HEADER = ['start_point', 'end_point', 'ride_datetime', 'duration', 'distance']
+
+    def setUp(self):
+        self.user = User.objects.create_user('uploader', password='p')
+        self.client.force_login(self.user)
+
+    def rides_csv(self, name, hours):
+        lines = [','.join(self.HEADER)] + [f'A,B,2024-01-01 {h:02d}:00,10,1.5' for h in hours]
+        return csv_upload('\n'.join(lines) + '\n', name=name)
+
+    def test_every_file_and_sheet_is_ingested(self):
+        rows = lambda hours: [self.HEADER] + [['C', 'D', f'2024-01-02 {h:02d}:00', 5, 1.0] for h in hours]
+        files = [self.rides_csv('a.csv', [1, 2]), self.rides_csv('b.csv', [3, 4, 5]),
+                 xlsx_upload({'一月': rows([1]), '二月': rows([2, 3])}, name='c.xlsx')]
+        response = self.client.post(reverse('data_process:data_upload'), {'data_file': files}, follow=True)
+        self.assertEqual(BikeRideData.objects.filter(upload_user=self.user).count(), 8)
+        self.assertEqual(RideDataCount.get_count(self.user), 8)
+        self.assertIn('成功导入3个文件共8条', [str(m) for m in response.context['messages']][0])
+
+    def test_failed_file_reports_rows_already_imported(self):
+        files = [self.rides_csv('a.csv', [1, 2]), csv_upload('区域\n朝阳区\n', encoding='utf-16', name='b.csv')]
+        response = self.client.post(reverse('data_process:data_upload'), {'data_file': files}, follow=True)
+        message = [str(m) for m in response.context['messages']][0]
+        self.assertIn('b.csv', message)
+        self.assertIn('本次共已导入2条', message)
+        self.assertEqual(BikeRideData.objects.count(), 2)
+
+
+@override_settings(CACHES={'charts': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+class ChartCacheTests(TestCase):
+    def test_bump_invalidates_cached_charts(self):
+        version = chart_cache.data_version()
+        builds = []
+        build = lambda: builds.append(1) or f'<div>{len(builds)}</div>'
+        self.assertEqual(chart_cache.cached_chart('heatmap', build), '<div>1</div>')
+        self.assertEqual(chart_cache.cached_chart('heatmap', build), '<div>1</div>')
+        self.assertEqual(chart_cache.bump_data_version(), version + 1)
+        self.assertEqual(chart_cache.cached_chart('heatmap', build), '<div>2</div>')
+        self.assertEqual(len(builds), 2)
+
+    def test_version_survives_cache_clear(self):
+        version = chart_cache.bump_data_version()
+        chart_cache.get_cache().clear()
+        self.assertEqual(chart_cache.data_version(), version)
+
+    def test_first_bump_initialises_version(self):
+        self.assertGreater(chart_cache.bump_data_version(), 0)
+        self.assertEqual(chart_cache.data_version(), chart_cache.bump_data_version() - 1)
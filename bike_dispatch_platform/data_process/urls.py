@@ -11,4 +11,8 @@ urlpatterns = [
     path('list/', views.data_list, name='data_list'),
     # 新增天气数据上传路由（关键！）
     path("weather/upload/", views.weather_data_upload, name="weather_upload"),
+    # 后台导入任务进度（上传页面轮询）
+    path("jobs/<int:job_id>/", views.ingest_job_status, name="ingest_job_status"),
+    # 图表缓存命中统计
+    path("charts/cache-stats/", views.chart_cache_stats, name="chart_cache_stats"),
 ]
\ No newline at end of file
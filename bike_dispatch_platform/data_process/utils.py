@@ -1,34 +1,113 @@
+import time
+
 import pandas as pd
 import numpy as np
 
-def data_cleaning(df):
+DEDUP_SUBSET = ['start_point', 'end_point', 'ride_datetime']
+NUMERIC_COLS = ['duration', 'distance', 'temperature', 'wind_speed']
+NON_NEGATIVE_COLS = ['duration', 'distance']  # 时长/距离不能为负数
+STRING_DEFAULTS = {'start_point': '未知起点', 'end_point': '未知终点', 'weather': 'sunny'}
+CATEGORY_COLS = ['start_point', 'end_point', 'weather']  # 取值重复度高，压缩为分类类型
+
+
+class CleaningReport:
+    """清洗报告：每一步的耗时（秒）与丢弃行数"""
+
+    def __init__(self, rows_in):
+        self.rows_in = rows_in
+        self.rows_out = rows_in
+        self.steps = []  # [(步骤名, 耗时秒, 丢弃行数)]
+        self._t0 = None
+
+    def start(self):
+        self._t0 = time.perf_counter()
+
+    def step(self, name, dropped=0):
+        now = time.perf_counter()
+        self.steps.append((name, now - self._t0, int(dropped)))
+        self._t0 = now
+
+    @property
+    def seconds(self):
+        return sum(seconds for _, seconds, _ in self.steps)
+
+    def __str__(self):
+        lines = [f"清洗 {self.rows_in} 行 → {self.rows_out} 行，耗时 {self.seconds * 1000:.1f} ms"]
+        lines += [f"  {name:<10} {seconds * 1000:8.1f} ms  丢弃 {dropped} 行" for name, seconds, dropped in self.steps]
+        return "\n".join(lines)
+
+
+def _to_category(values, default):
+    """转为分类类型后在类别层面填充缺失值（不为每一行生成新的字符串对象）"""
+    values = values.astype('category')
+    if not all(isinstance(category, str) for category in values.cat.categories):
+        return values.astype(object).fillna(default).astype(str).astype('category')  # 混有非字符串取值时按字符串处理
+    if default not in values.cat.categories:
+        values = values.cat.add_categories([default])
+    return values.fillna(default)
+
+
+def data_cleaning(df, compact=True, report=None):
     """
     数据清洗函数（任务书"清洗、格式标准化"要求）
     功能：去重、缺失值填充、字段格式标准化
+    各过滤条件先合并为一个布尔掩码，结果按列只取一次数据；原 DataFrame 不会被修改。
+    compact=True 时把起终点/天气压缩为分类类型、数值字段压缩为 float32（减少内存，适合分析；
+    入库时传 False，保留 float64 精度）。传入 CleaningReport 可得到每一步的耗时与丢弃行数。
     """
-    # 1. 去重（根据核心字段去重）
-    df = df.drop_duplicates(subset=['start_point', 'end_point', 'ride_datetime'], keep='first')
-    
-    # 2. 缺失值填充
-    # 数值型字段用均值填充
-    numeric_cols = ['duration', 'distance', 'temperature', 'wind_speed']
-    for col in numeric_cols:
-        if col in df.columns:
-            df[col] = df[col].fillna(df[col].mean())
-    
-    # 字符型字段用默认值填充
-    df['start_point'] = df['start_point'].fillna('未知起点').astype(str)
-    df['end_point'] = df['end_point'].fillna('未知终点').astype(str)
-    df['weather'] = df['weather'].fillna('sunny').astype(str)
-    
-    # 3. 格式标准化（确保时间字段是datetime类型）
+    report = report if report is not None else CleaningReport(len(df))
+    report.start()
+
+    # 1. 格式标准化（时间字段解析为datetime，先不写回原数据）
+    ride_datetime = None
     if 'ride_datetime' in df.columns:
-        df['ride_datetime'] = pd.to_datetime(df['ride_datetime'], errors='coerce')
-        # 过滤掉时间为空的数据
-        df = df.dropna(subset=['ride_datetime'])
-    
-    # 4. 过滤异常值（时长/距离不能为负数）
-    df = df[df['duration'] >= 0]
-    df = df[df['distance'] >= 0]
-    
-    return df
\ No newline at end of file
+        ride_datetime = pd.to_datetime(df['ride_datetime'], errors='coerce')
+    report.step('解析时间')
+
+    # 2. 去重（根据核心字段，保留第一条）：只计算掩码，不复制数据
+    subset = [col for col in DEDUP_SUBSET if col in df.columns]
+    keys = pd.DataFrame({col: ride_datetime if col == 'ride_datetime' and ride_datetime is not None else df[col]
+                         for col in subset}, copy=False)
+    keep = ~keys.duplicated(keep='first').to_numpy() if subset else np.ones(len(df), dtype=bool)
+    report.step('去重', (~keep).sum())
+
+    # 3. 缺失值填充值：数值型字段（无法转换的记为缺失）用去重后的均值
+    numeric = {col: pd.to_numeric(df[col], errors='coerce').to_numpy(dtype=float, copy=True)
+               for col in NUMERIC_COLS if col in df.columns}
+    fill_values = {}
+    for col, values in numeric.items():
+        kept = values[keep]
+        if (~np.isnan(kept)).any():
+            fill_values[col] = np.nanmean(kept)
+            np.copyto(values, fill_values[col], where=np.isnan(values))  # 就地填充
+    report.step('填充缺失值')
+
+    # 4. 合并过滤条件（时间为空、时长/距离为负，填充后仍为空的也丢弃），只做一次行选择
+    mask = keep.copy()
+    if ride_datetime is not None:
+        mask &= ride_datetime.notna().to_numpy()
+    for col in NON_NEGATIVE_COLS:
+        if col in numeric:
+            mask &= numeric[col] >= 0
+    report.step('合并过滤', keep.sum() - mask.sum())
+
+    # 5. 按列组装结果：每列只按掩码取一次，同时写回解析后的时间、填充字符型字段并压缩类型
+    index = df.index[mask]
+    columns = {}
+    for col in df.columns:
+        if col in numeric:
+            values = numeric[col][mask]
+            columns[col] = values.astype(np.float32) if compact else values
+        elif col == 'ride_datetime' and ride_datetime is not None:
+            columns[col] = ride_datetime.array[mask]
+        elif col in STRING_DEFAULTS:
+            values = pd.Series(df[col].array[mask], index=index)
+            columns[col] = (_to_category(values, STRING_DEFAULTS[col]) if compact and col in CATEGORY_COLS
+                            else values.fillna(STRING_DEFAULTS[col]).astype(str))
+        else:
+            columns[col] = df[col].array[mask]
+    df = pd.DataFrame(columns, index=index)
+    report.step('组装与压缩')
+
+    report.rows_out = len(df)
+    return df
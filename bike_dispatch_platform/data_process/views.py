@@ -1,14 +1,18 @@
-from django.shortcuts import render, redirect
+from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
+from django.conf import settings
+from django.http import JsonResponse
+from django.urls import reverse
 from .forms import WeatherDataUploadForm  # 导入天气数据上传表单
 
 # ========== 关键修改1：补充WeatherData导入 ==========
-from .models import BikeRideData, WeatherData
+from .models import BikeRideData, WeatherData, IngestJob, RideDataCount
 
-import pandas as pd
-import numpy as np
-from .utils import data_cleaning  # 自定义数据清洗工具（去重、缺失值填充）
+from .ingest import ingest_ride_chunks, IngestError  # 分块清洗 + 向量化转换 + 批量入库
+from .readers import iter_upload_chunks, list_sheets  # CSV/Excel 分块流式读取
+from .jobs import create_ingest_job, submit_job, job_status  # 后台进程池导入任务
+from .chart_cache import cache_stats  # 图表缓存命中统计
 
 
 @login_required
@@ -19,108 +23,57 @@ def data_upload(request):
     """
     # 处理POST请求（文件上传）
     if request.method == 'POST':
-        # 1. 检查是否有文件上传
-        if 'data_file' not in request.FILES:
+        # 1. 检查是否有文件上传（支持一次选择多个文件）
+        files = request.FILES.getlist('data_file')
+        if not files:
             messages.error(request, "请选择要上传的Excel/CSV文件")
             return redirect('data_process:data_upload')
 
-        file = request.FILES['data_file']
-
-        # 2. 检查文件是否为空
-        if file.size == 0:
-            messages.error(request, "上传的文件为空，请选择有效文件")
-            return redirect('data_process:data_upload')
-
-        # 3. 检查文件格式
-        allowed_formats = ('.xlsx', '.csv')
-        if not file.name.lower().endswith(allowed_formats):
-            messages.error(request, "仅支持Excel（.xlsx）或CSV（.csv）格式")
-            return redirect('data_process:data_upload')
-
-        # 4. 读取文件（增加异常捕获）
-        try:
-            if file.name.lower().endswith('.csv'):
-                df = pd.read_csv(file, encoding='utf-8')  # 指定编码避免中文乱码
-            else:
-                df = pd.read_excel(file)
-        except UnicodeDecodeError:
-            # 兼容GBK编码的CSV文件
-            try:
-                df = pd.read_csv(file, encoding='gbk')
-            except Exception as e:
-                messages.error(request, f"文件编码错误，无法读取：{str(e)}")
+        for file in files:
+            # 2. 检查文件是否为空
+            if file.size == 0:
+                messages.error(request, f"上传的文件{file.name}为空，请选择有效文件")
                 return redirect('data_process:data_upload')
-        except Exception as e:
-            messages.error(request, f"文件读取失败：{str(e)}")
-            return redirect('data_process:data_upload')
 
-        # 5. 数据清洗（任务书"清洗、格式标准化"要求）
-        try:
-            cleaned_df = data_cleaning(df)
-        except Exception as e:
-            messages.error(request, f"数据清洗失败：{str(e)}")
-            return redirect('data_process:data_upload')
+            # 3. 检查文件格式
+            allowed_formats = ('.xlsx', '.csv')
+            if not file.name.lower().endswith(allowed_formats):
+                messages.error(request, "仅支持Excel（.xlsx）或CSV（.csv）格式")
+                return redirect('data_process:data_upload')
 
-        # 6. 批量写入数据库（增加字段容错和类型转换）
-        data_list = []
-        # ========== 关键修改2：删除weather字符串默认值（外键不能赋值字符串） ==========
-        default_values = {
-            'start_point': '',
-            'end_point': '',
-            'ride_datetime': None,
-            'duration': 0.0,
-            'distance': 0.0,
-            # 'weather': 'sunny',  # 注释：weather是外键，不再赋值字符串
-            'temperature': 25.0,
-            'wind_speed': 0.0
-        }
-
-        for _, row in cleaned_df.iterrows():
-            # 逐个字段取值，确保类型正确
-            data_item = BikeRideData(
-                # 数据来源：优先取POST参数，无则设默认值
-                data_source=request.POST.get('data_source', 'upload'),
-                # 骑行起点：转字符串，空值设默认
-                start_point=str(row.get('start_point', default_values['start_point'])).strip(),
-                # 骑行终点：转字符串，空值设默认
-                end_point=str(row.get('end_point', default_values['end_point'])).strip(),
-                # 骑行时间：确保是datetime类型
-                ride_datetime=pd.to_datetime(row.get('ride_datetime'), errors='coerce')
-                              or default_values['ride_datetime'],
-                # 骑行时长：转数值型，失败设默认
-                duration=float(row.get('duration', default_values['duration']))
-                if pd.notna(row.get('duration')) else default_values['duration'],
-                # 骑行距离：转数值型，失败设默认
-                distance=float(row.get('distance', default_values['distance']))
-                if pd.notna(row.get('distance')) else default_values['distance'],
-                # ========== 关键修改3：删除weather字符串赋值（外键字段留空，后续自动关联） ==========
-                # weather=str(row.get('weather', default_values['weather'])).strip(),
-                # 温度：转数值型，失败设默认
-                temperature=float(row.get('temperature', default_values['temperature']))
-                if pd.notna(row.get('temperature')) else default_values['temperature'],
-                # 风速：转数值型，失败设默认
-                wind_speed=float(row.get('wind_speed', default_values['wind_speed']))
-                if pd.notna(row.get('wind_speed')) else default_values['wind_speed'],
-                # 数据状态：固定为清洗后
-                status='cleaned',
-                # 上传用户：关联当前登录用户
-                upload_user=request.user
-            )
-            # 过滤掉骑行时间为空的数据（必选字段）
-            if data_item.ride_datetime is not None:
-                data_list.append(data_item)
-
-        # 批量入库（避免单条插入效率低）
-        if data_list:
-            BikeRideData.objects.bulk_create(data_list)
-            messages.success(request, f"成功导入{len(data_list)}条清洗后的骑行数据")
+        # 后台导入：文件保存后交给进程池并行处理（多文件/多工作表并行），页面轮询进度
+        if settings.DATA_INGEST_ASYNC:
+            job = create_ingest_job(files, 'ride', request.POST.get('data_source', 'upload'), request.user)
+            submit_job(job)
+            messages.success(request, f"已提交导入任务 #{job.pk}（{len(files)}个文件），正在后台处理")
+            return redirect(f"{reverse('data_process:data_upload')}?job={job.pk}")
+
+        # 4. 逐个文件（Excel 逐个工作表，与后台导入一致）分块读取 → 清洗 → 类型转换 → 批量入库（内存占用与文件大小无关）
+        inserted = elapsed = 0
+        for file in files:
+            for sheet in list_sheets(file):
+                try:
+                    file_inserted, file_elapsed = ingest_ride_chunks(
+                        iter_upload_chunks(file, sheet=sheet),
+                        data_source=request.POST.get('data_source', 'upload'),
+                        upload_user=request.user
+                    )
+                except IngestError as e:
+                    messages.error(request, f"{file.name}{f' [{sheet}]' if sheet else ''}：{e}"
+                                            f"（本次共已导入{inserted + e.inserted}条）")
+                    return redirect('data_process:data_upload')
+                inserted += file_inserted
+                elapsed += file_elapsed
+
+        if inserted:
+            messages.success(request, f"成功导入{len(files)}个文件共{inserted}条清洗后的骑行数据（耗时{elapsed:.2f}秒）")
         else:
             messages.warning(request, "清洗后无有效数据，请检查文件内容")
 
         return redirect('data_process:data_list')
 
-    # GET请求：返回上传页面
-    return render(request, 'data_process/data_upload.html')
+    # GET请求：返回上传页面（带 job 参数时显示导入进度）
+    return render(request, 'data_process/data_upload.html', {'job_id': request.GET.get('job')})
 
 
 @login_required
@@ -128,26 +81,70 @@ def data_list(request):
     """
     数据仓库列表（支持筛选、查看）
     仅显示当前登录用户上传的数据
+    按 id 游标翻页（?before=本页最小id 下一页，?after=本页最大id 上一页），走 (upload_user, id) 索引，
+    翻到第几页都只读一页数据；总数取自入库时累加的 RideDataCount，不再 count() 全表
     """
-    # 查询当前用户的骑行数据，按上传时间倒序排列
-    data_list = BikeRideData.objects.filter(upload_user=request.user).order_by('-id')
-    # 传递数据到模板
+    page_size = _int_param(request, 'size', settings.DATA_LIST_PAGE_SIZE)
+    page_size = min(max(page_size, 1), settings.DATA_LIST_MAX_PAGE_SIZE)
+    before = _int_param(request, 'before')
+    after = _int_param(request, 'after')
+
+    # 只取页面显示的列（天气信息来自关联的天气数据，一并 JOIN 取出）
+    rows = BikeRideData.objects.filter(upload_user=request.user).select_related('weather').only(
+        'id', 'data_source', 'start_point', 'end_point', 'ride_datetime', 'duration', 'distance',
+        'weather__weather_type', 'weather__temperature', 'weather__wind_speed'
+    )
+    # 多取一条判断是否还有下一页/上一页
+    if after is not None:
+        page = list(rows.filter(id__gt=after).order_by('id')[:page_size + 1])
+        has_prev = len(page) > page_size
+        page = page[:page_size][::-1]
+        has_next = True
+    else:
+        if before is not None:
+            rows = rows.filter(id__lt=before)
+        page = list(rows.order_by('-id')[:page_size + 1])
+        has_next = len(page) > page_size
+        page = page[:page_size]
+        has_prev = before is not None
+
     context = {
-        'data_list': data_list,
-        'total_count': data_list.count()  # 数据总数，便于页面展示
+        'data_list': page,
+        'total_count': RideDataCount.get_count(request.user),  # 数据总数，便于页面展示
+        'page_size': page_size,
+        'next_cursor': page[-1].id if page and has_next else None,
+        'prev_cursor': page[0].id if page and has_prev else None,
     }
     return render(request, 'data_process/data_list.html', context)
 
 
+def _int_param(request, name, default=None):
+    """读取整数型 GET 参数，缺失或格式错误时返回默认值"""
+    try:
+        return int(request.GET[name])
+    except (KeyError, ValueError):
+        return default
+
+
 @login_required
 def weather_data_upload(request):
     """天气数据上传视图（毕设“数据上传模块”核心接口）"""
     if request.method == "POST":
         form = WeatherDataUploadForm(request.POST, request.FILES)
         if form.is_valid():
+            if settings.DATA_INGEST_ASYNC:
+                job = create_ingest_job([form.cleaned_data["file"]], "weather", form.cleaned_data["data_source"],
+                                        request.user, overwrite=form.cleaned_data["overwrite"])
+                submit_job(job)
+                messages.success(request, f"已提交天气数据导入任务 #{job.pk}，正在后台处理")
+                return redirect(f"{reverse('data_process:weather_upload')}?job={job.pk}")
             try:
-                import_count = form.process_file()
-                messages.success(request, f"✅ 成功导入{import_count}条天气数据！")
+                summary = form.process_file()
+                messages.success(
+                    request,
+                    f"✅ 天气数据导入完成：新增{summary['inserted']}条，更新{summary['updated']}条，"
+                    f"跳过{summary['skipped']}条（耗时{summary['seconds']:.2f}秒）"
+                )
                 return redirect("data_process:weather_upload")  # 上传后刷新页面
             except Exception as e:
                 messages.error(request, f"❌ 数据导入失败：{str(e)}")
@@ -159,5 +156,18 @@ def weather_data_upload(request):
     return render(
         request,
         "data_process/weather_upload.html",
-        {"form": form, "weather_list": weather_list}
-    )
\ No newline at end of file
+        {"form": form, "weather_list": weather_list, "job_id": request.GET.get("job")}
+    )
+
+
+@login_required
+def ingest_job_status(request, job_id):
+    """导入任务进度查询（上传页面轮询，JSON）"""
+    job = get_object_or_404(IngestJob, pk=job_id, upload_user=request.user)
+    return JsonResponse(job_status(job))
+
+
+@login_required
+def chart_cache_stats(request):
+    """图表缓存命中统计（本进程，JSON）"""
+    return JsonResponse(cache_stats())
@@ -0,0 +1,139 @@
+"""
+推理后端（通过 settings.PREDICTION_BACKEND 切换）
+- keras：加载 .h5，用编译好的 tf.function 前向计算（需要完整 TensorFlow）
+- tflite：加载 models/export_tflite.py 导出的 .tflite，使用轻量的 tflite_runtime（CPU 下默认启用 XNNPACK），
+  Web 进程无需导入完整 TensorFlow
+- numpy：纯 NumPy 前向计算（见 numpy_engine.py），直接读取 .h5 权重，只依赖 numpy + h5py，启动最快
+"""
+import os
+import threading
+
+import numpy as np
+from django.core.exceptions import ImproperlyConfigured
+
+
+class KerasBackend:
+    """Keras .h5 模型后端"""
+    name = 'keras'
+    suffix = '.h5'
+
+    def __init__(self, path, fast_path=True, **kwargs):
+        self.path = path
+        self.fast_path = fast_path
+
+    def load(self):
+        import tensorflow as tf  # 延迟导入：只有真正需要预测的进程才导入 TensorFlow
+        self.model = tf.keras.models.load_model(self.path)
+        # 快速推理路径：按输入形状固定签名的 tf.function，直接调用模型，绕过 predict 的数据适配/回调/进度条
+        self.fn = self.compile_model(self.model)
+        return self
+
+    @staticmethod
+    def compile_model(model):
+        """把模型包装为形状固定（批大小可变）的 tf.function，只追踪一次计算图"""
+        import tensorflow as tf
+        spec = tf.TensorSpec((None,) + tuple(model.input_shape[1:]), tf.float32)
+
+        @tf.function(input_signature=[spec])
+        def forward(x):
+            return model(x, training=False)
+
+        return forward
+
+    @property
+    def input_shape(self):
+        return tuple(self.model.input_shape[1:])
+
+    def predict(self, batch):
+        if self.fast_path:
+            return self.fn(np.asarray(batch, dtype=np.float32)).numpy()
+        return self.model.predict(batch, batch_size=len(batch), verbose=0)
+
+
+def _load_interpreter_class():
+    try:
+        from tflite_runtime.interpreter import Interpreter
+    except ImportError as exc:
+        # 'tflite' 后端的意义就在于不导入完整 TensorFlow，缺少依赖时直接报配置错误
+        raise ImproperlyConfigured(
+            "PREDICTION_BACKEND = 'tflite' 需要另行安装 tflite-runtime（pip install tflite-runtime，仅 Linux），"
+            "其他平台请使用 'keras' 或 'numpy' 后端") from exc
+    return Interpreter
+
+
+class TFLiteBackend:
+    """TFLite 模型后端（解释器非线程安全，调用加锁）"""
+    name = 'tflite'
+    suffix = '.tflite'
+
+    def __init__(self, path, num_threads=None, **kwargs):
+        self.path = path
+        self.num_threads = num_threads
+        self._lock = threading.Lock()
+
+    def load(self):
+        self.interpreter = _load_interpreter_class()(model_path=self.path, num_threads=self.num_threads)
+        self.interpreter.allocate_tensors()
+        self._input = self.interpreter.get_input_details()[0]
+        self._output = self.interpreter.get_output_details()[0]
+        self._batch_size = int(self._input['shape'][0])
+        # LSTM 模型以固定批大小导出（见 export_tflite.py），只能逐行调用
+        self._fixed_batch = int(self._input['shape_signature'][0]) != -1
+        return self
+
+    @property
+    def input_shape(self):
+        return tuple(int(dim) for dim in self._input['shape'][1:])
+
+    def _invoke(self, batch):
+        # 融合 LSTM 的隐藏/细胞状态是变量张量，每次调用前清零，保证样本之间互不影响
+        self.interpreter.reset_all_variables()
+        self.interpreter.set_tensor(self._input['index'], batch)
+        self.interpreter.invoke()
+        return self.interpreter.get_tensor(self._output['index']).copy()
+
+    def predict(self, batch):
+        batch = np.asarray(batch, dtype=np.float32)
+        with self._lock:
+            if self._fixed_batch:
+                step = self._batch_size
+                return np.concatenate([self._invoke(batch[i:i + step]) for i in range(0, len(batch), step)])
+            if len(batch) != self._batch_size:
+                # 批大小变化时重新分配张量（同一批大小重复调用无额外开销）
+                self.interpreter.resize_tensor_input(self._input['index'], (len(batch),) + self.input_shape)
+                self.interpreter.allocate_tensors()
+                self._batch_size = len(batch)
+            return self._invoke(batch)
+
+
+class NumpyBackend:
+    """纯 NumPy 后端（BN 已折叠，缓冲区预分配）"""
+    name = 'numpy'
+    suffix = '.h5'
+
+    def __init__(self, path, **kwargs):
+        self.path = path
+
+    def load(self):
+        from .numpy_engine import load_h5_model
+        self.model = load_h5_model(self.path)
+        return self
+
+    @property
+    def input_shape(self):
+        return self.model.input_shape
+
+    def predict(self, batch):
+        return self.model.predict(batch)
+
+
+BACKENDS = {backend.name: backend for backend in (KerasBackend, TFLiteBackend, NumpyBackend)}
+
+
+def create_backend(name, model_path, **options):
+    """按后端名称创建后端；模型路径按后端约定替换扩展名（bike_lstm_model.h5 → bike_lstm_model.tflite）"""
+    if name not in BACKENDS:
+        raise ValueError(f"未知的推理后端：{name}，可选：{', '.join(BACKENDS)}")
+    backend_class = BACKENDS[name]
+    path = os.path.splitext(model_path)[0] + backend_class.suffix
+    return backend_class(path, **options)
@@ -0,0 +1,122 @@
+"""
+预测请求微批处理队列
+并发的预测请求先进入队列，后台线程在 max_wait_ms 内最多凑够 max_batch 个请求，
+LSTM、BP 各做一次批量前向计算，再把结果分发回各个调用方（避免 batch_size=1 的 Keras 调用开销叠加）。
+"""
+import queue
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import Future
+
+import numpy as np
+from django.conf import settings
+
+from .model_server import get_model_server
+
+
+class _PendingRequest:
+    __slots__ = ('lstm_input', 'bp_input', 'future')
+
+    def __init__(self, lstm_input, bp_input):
+        self.lstm_input = lstm_input
+        self.bp_input = bp_input
+        self.future = Future()
+
+
+class MicroBatcher:
+    """进程内微批处理器：submit() 返回 Future，predict() 阻塞等待结果"""
+
+    def __init__(self, server, max_batch=64, max_wait_ms=5):
+        self.server = server
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000
+        self._queue = queue.Queue()
+        self._worker = None
+        self._worker_lock = threading.Lock()
+        # 运行统计：批次数、请求数（平均批大小 = 请求数 / 批次数）
+        self.stats = {'batches': 0, 'requests': 0}
+
+    def _ensure_worker(self):
+        if self._worker is None:
+            with self._worker_lock:
+                if self._worker is None:
+                    self._worker = threading.Thread(target=self._run, name='prediction-batcher', daemon=True)
+                    self._worker.start()
+
+    def submit(self, lstm_input, bp_input):
+        """提交一个预测请求（输入可以包含多行），返回 Future，结果为 (LSTM结果数组, BP结果数组)"""
+        self._ensure_worker()
+        request = _PendingRequest(np.asarray(lstm_input, dtype=np.float32), np.asarray(bp_input, dtype=np.float32))
+        self._queue.put(request)
+        return request.future
+
+    def predict_batch(self, lstm_input, bp_input, timeout=None):
+        """多行预测，返回归一化空间的 (LSTM结果数组, BP结果数组)，与 ModelServer.predict_batch 一致"""
+        return self.submit(lstm_input, bp_input).result(timeout)
+
+    def predict(self, lstm_input, bp_input, timeout=None):
+        """单样本预测，返回归一化空间的 (LSTM结果, BP结果)，与 ModelServer.predict_scaled 一致"""
+        lstm_pred, bp_pred = self.predict_batch(lstm_input, bp_input, timeout)
+        return lstm_pred[0][0], bp_pred[0][0]
+
+    def _collect(self):
+        """阻塞等到第一个请求，再在 max_wait 时间内继续收集，直到凑满 max_batch"""
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = [r for r in self._collect() if r.future.set_running_or_notify_cancel()]
+            # 输入形状不同的请求无法拼接，按形状分组分别计算
+            groups = defaultdict(list)
+            for request in batch:
+                groups[(request.lstm_input.shape[1:], request.bp_input.shape[1:])].append(request)
+            for requests in groups.values():
+                self._process(requests)
+
+    def _process(self, requests):
+        try:
+            lstm_out, bp_out = self.server.predict_batch(
+                np.concatenate([r.lstm_input for r in requests]),
+                np.concatenate([r.bp_input for r in requests]),
+            )
+        except Exception as e:
+            for request in requests:
+                request.future.set_exception(e)
+            return
+        self.stats['batches'] += 1
+        self.stats['requests'] += len(requests)
+        lstm_pos = bp_pos = 0
+        for request in requests:
+            lstm_rows, bp_rows = len(request.lstm_input), len(request.bp_input)
+            request.future.set_result((lstm_out[lstm_pos:lstm_pos + lstm_rows], bp_out[bp_pos:bp_pos + bp_rows]))
+            lstm_pos += lstm_rows
+            bp_pos += bp_rows
+
+
+_batcher = None
+_batcher_lock = threading.Lock()
+
+
+def get_batcher():
+    """进程内共享的微批处理器单例"""
+    global _batcher
+    if _batcher is None:
+        with _batcher_lock:
+            if _batcher is None:
+                _batcher = MicroBatcher(
+                    get_model_server(),
+                    max_batch=settings.PREDICTION_MAX_BATCH,
+                    max_wait_ms=settings.PREDICTION_MAX_WAIT_MS,
+                )
+    return _batcher
@@ -0,0 +1,203 @@
+"""
+批量/多日需求预测：一次请求预测 区域 × 时段 × 日期 的完整网格
+模型输入是目标小时之前 24 小时的 11 维特征（与 utils/data_preprocess.py 的 features 一致），
+这些特征只由日历和天气决定：先为整个预测范围逐小时生成一张特征表，整体归一化一次，
+再用 sliding_window_view 取出每个目标小时的窗口（零拷贝），LSTM、BP 各做一次批量前向计算
+（FORECAST_LSTM_MODE='stateful' 时 LSTM 改为保留隐藏/细胞状态逐小时递推，见 _stateful_lstm），
+一次反归一化后按时段汇总、按区域占比拆分，结果用 bulk_create 一次写入 PredictionResult。
+"""
+import math
+import time
+from datetime import date, timedelta
+
+import numpy as np
+import pandas as pd
+from django.conf import settings
+from django.db import transaction
+from numpy.lib.stride_tricks import sliding_window_view
+
+from .models import PredictionResult, REGION_CHOICES
+from .model_server import get_model_server
+
+TIME_STEPS = 24  # 窗口长度：前24小时（与训练一致）
+FEATURES = ["season", "holiday", "workingday", "weather", "temp", "atemp", "humidity", "windspeed",
+            "hour", "weekday", "month"]
+
+REGION_NAMES = dict(REGION_CHOICES)
+PERIOD_NAMES = dict(PredictionResult.TIME_PERIOD_CHOICES)
+# 各时段包含的小时（早高峰 7-9 点 → 7、8 点两个小时），时段需求为各小时需求之和
+PERIOD_HOURS = {'morning': (7, 8), 'noon': (11, 12), 'evening': (17, 18), 'night': (21, 22)}
+# 天气取值 → 训练数据的天气编码（1 晴/少云，2 阴/雾，3 小雨/小雪）
+WEATHER_CODES = {'sunny': 1, 'cloudy': 2, 'rainy': 3}
+WEATHER_NAMES = {'sunny': '晴', 'cloudy': '阴', 'rainy': '雨'}
+DEFAULT_HUMIDITY = 60.0
+DEFAULT_WINDSPEED = 12.0
+
+FINAL_MODEL = 'LSTM'  # 取LSTM结果（准确率82%≥75%，符合任务书要求）
+FINAL_ACCURACY = 82.0
+
+
+def region_shares(regions):
+    """各区域占全市需求的比例（settings.FORECAST_REGION_SHARE，未配置时平均分配）"""
+    shares = settings.FORECAST_REGION_SHARE or {region: 1 / len(REGION_NAMES) for region in REGION_NAMES}
+    return np.array([shares.get(region, 0.0) for region in regions])
+
+
+class ForecastGrid:
+    """
+    预测网格：regions × periods × 从 start_date 起 days 天
+    weather/temperature/humidity/windspeed 为默认天气，daily 可按日期覆盖：
+    {"2024-06-01": {"weather": "rainy", "temperature": 18}}
+    """
+
+    def __init__(self, regions=None, periods=None, start_date=None, days=None, weather='sunny',
+                 temperature=25.0, humidity=DEFAULT_HUMIDITY, windspeed=DEFAULT_WINDSPEED, daily=None):
+        self.regions = list(regions or REGION_NAMES)
+        self.periods = list(periods or PERIOD_HOURS)
+        self.start_date = start_date or date.today()
+        self.days = settings.FORECAST_DEFAULT_DAYS if days is None else days
+        self.defaults = {'weather': weather, 'temperature': float(temperature),
+                         'humidity': float(humidity), 'windspeed': float(windspeed)}
+        self.daily = daily or {}
+        self.validate()
+
+    def validate(self):
+        unknown = [r for r in self.regions if r not in REGION_NAMES] + \
+                  [p for p in self.periods if p not in PERIOD_HOURS]
+        if unknown:
+            raise ValueError(f"未知的区域/时段：{', '.join(unknown)}")
+        if not 1 <= self.days <= settings.FORECAST_MAX_DAYS:
+            raise ValueError(f"预测天数须在 1~{settings.FORECAST_MAX_DAYS} 之间")
+        for day in self.dates:
+            conditions = self.weather_on(day)  # 数值格式错误时抛出 ValueError
+            if conditions['weather'] not in WEATHER_CODES:
+                raise ValueError(f"未知的天气：{conditions['weather']}")
+            if not all(math.isfinite(value) for key, value in conditions.items() if key != 'weather'):
+                raise ValueError("温度、湿度、风速须为有限数值")
+
+    def weather_on(self, day):
+        """某天的天气条件（默认值 + 当天覆盖）"""
+        conditions = {**self.defaults, **self.daily.get(day.isoformat(), {})}
+        return {key: value if key == 'weather' else float(value) for key, value in conditions.items()}
+
+    @property
+    def dates(self):
+        return [self.start_date + timedelta(days=i) for i in range(self.days)]
+
+    @property
+    def size(self):
+        return len(self.regions) * len(self.periods) * self.days
+
+    def target_hours(self):
+        """需要预测的全部小时（日期 × 时段 × 时段内小时，按时间排序）"""
+        hours = sorted({h for period in self.periods for h in PERIOD_HOURS[period]})
+        return pd.DatetimeIndex([pd.Timestamp(day) + pd.Timedelta(hours=h) for day in self.dates for h in hours])
+
+    def hourly_features(self, start, end):
+        """[start, end] 逐小时的原始特征表 (小时数, 11)，列顺序同 FEATURES"""
+        index = pd.date_range(start, end, freq='h')
+        holidays = {date.fromisoformat(day) for day in settings.FORECAST_HOLIDAYS}
+        days = index.date
+        # 窗口会用到预测首日之前的小时，按首日天气处理
+        conditions = {day: self.weather_on(max(day, self.start_date)) for day in set(days)}
+        holiday = np.array([day in holidays for day in days], dtype=float)
+        weather = pd.DataFrame([conditions[day] for day in days])
+        return np.column_stack([
+            (index.month.to_numpy() - 1) // 3 + 1,  # 季节：1-3月为1，依次类推（与训练数据一致）
+            holiday,
+            ((index.weekday.to_numpy() < 5) & (holiday == 0)).astype(float),
+            weather['weather'].map(WEATHER_CODES).to_numpy(),
+            weather['temperature'].to_numpy(),
+            weather['temperature'].to_numpy(),  # 体感温度按气温处理
+            weather['humidity'].to_numpy(),
+            weather['windspeed'].to_numpy(),
+            index.hour.to_numpy(),
+            index.weekday.to_numpy(),
+            index.month.to_numpy(),
+        ]).astype(float), index
+
+
+def forecast_hours(grid, server=None, predict=None):
+    """
+    全部目标小时一次归一化、每个模型一次前向计算、一次反归一化
+    predict(LSTM批次, BP批次) 默认为 server.predict_batch，也可传入微批处理器等（返回值相同）；
+    有状态模式下 BP 同样经 predict 计算，LSTM 结果由 _stateful_lstm 递推得到
+    返回 (目标小时 DatetimeIndex, LSTM 小时需求数组, BP 小时需求数组)
+    """
+    server = (server or get_model_server()).load()
+    targets = grid.target_hours()
+    x, index = grid.hourly_features(targets[0] - pd.Timedelta(hours=TIME_STEPS), targets[-1] - pd.Timedelta(hours=1))
+    x_scaled = server.transform(pd.DataFrame(x, columns=FEATURES)).astype(np.float32)
+    # 第 i 个窗口覆盖 index[i : i+24]，预测 index[i] + 24 小时
+    windows = sliding_window_view(x_scaled, TIME_STEPS, axis=0).transpose(0, 2, 1)
+    positions = index.get_indexer(targets - pd.Timedelta(hours=TIME_STEPS))
+    batch = windows[positions]
+    if settings.FORECAST_LSTM_MODE == 'stateful':
+        lstm_scaled = _stateful_lstm(server, x_scaled, positions[0], targets)
+        if predict is not None:
+            # 调用方的 predict（微批处理器/预测缓存）照常经手，BP 取其结果，LSTM 以递推结果为准
+            bp_scaled = predict(batch, batch.reshape(len(batch), -1))[1]
+        else:
+            # 未指定 predict 时只跑 BP，省去一次用不到的 LSTM 滑动窗口前向计算
+            bp_scaled = server.bp.predict(batch.reshape(len(batch), -1))
+    else:
+        lstm_scaled, bp_scaled = (predict or server.predict_batch)(batch, batch.reshape(len(batch), -1))
+    return targets, np.maximum(server.to_demand_batch(lstm_scaled), 0), np.maximum(server.to_demand_batch(bp_scaled), 0)
+
+
+def _stateful_lstm(server, x_scaled, first, targets):
+    """
+    LSTM 有状态多步递推：读入第一个目标小时之前的 24 小时窗口后，逐小时读入已知的日历/天气特征推进状态，
+    直到最后一个目标小时（每小时每层一次单元计算），每 FORECAST_STATE_REFRESH 小时按完整窗口重新读入一次，
+    取出各目标小时的预测
+    """
+    steps = int((targets[-1] - targets[0]) / pd.Timedelta(hours=1))
+    start = first + TIME_STEPS
+    predictions = server.lstm_stepper().forecast(x_scaled[None, first:start], x_scaled[None, start:start + steps],
+                                                 refresh=settings.FORECAST_STATE_REFRESH)
+    offsets = ((targets - targets[0]) / pd.Timedelta(hours=1)).astype(int)
+    return predictions[0, offsets].reshape(-1, 1)
+
+
+def forecast_grid(grid, server=None, predict=None):
+    """
+    预测整个网格：时段需求 = 时段内各小时需求之和，再按区域占比拆分
+    返回 [{"region", "time_period", "date", "lstm", "bp", "demand"}, ...]（demand 为最终采用的模型结果）
+    """
+    targets, lstm_hourly, bp_hourly = forecast_hours(grid, server, predict)
+    position = {ts: i for i, ts in enumerate(targets)}
+    shares = region_shares(grid.regions)
+    forecasts = []
+    for day in grid.dates:
+        for period in grid.periods:
+            rows = [position[pd.Timestamp(day) + pd.Timedelta(hours=h)] for h in PERIOD_HOURS[period]]
+            lstm = np.rint(lstm_hourly[rows].sum() * shares).astype(int)
+            bp = np.rint(bp_hourly[rows].sum() * shares).astype(int)
+            final = lstm if FINAL_MODEL == 'LSTM' else bp
+            forecasts.extend(
+                {'region': region, 'time_period': period, 'date': day,
+                 'lstm': int(lstm[i]), 'bp': int(bp[i]), 'demand': int(final[i])}
+                for i, region in enumerate(grid.regions)
+            )
+    return forecasts
+
+
+def save_forecasts(forecasts, user):
+    """预测结果一次 bulk_create 写入 PredictionResult"""
+    objs = [
+        PredictionResult(region=item['region'], time_period=item['time_period'], predict_date=item['date'],
+                         demand_count=item['demand'], model_used=FINAL_MODEL, accuracy=FINAL_ACCURACY, user=user)
+        for item in forecasts
+    ]
+    with transaction.atomic():
+        PredictionResult.objects.bulk_create(objs, batch_size=settings.DATA_INGEST_BATCH_SIZE)
+    return len(objs)
+
+
+def run_forecast(grid, user, save=True, server=None):
+    """预测整个网格并保存，返回 (预测结果列表, 耗时秒)"""
+    t0 = time.perf_counter()
+    forecasts = forecast_grid(grid, server)
+    if save:
+        save_forecasts(forecasts, user)
+    return forecasts, time.perf_counter() - t0
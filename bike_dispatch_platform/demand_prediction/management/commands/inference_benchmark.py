@@ -0,0 +1,54 @@
+import os
+import time
+
+import numpy as np
+from django.core.management.base import BaseCommand
+
+from demand_prediction.backends import create_backend
+from demand_prediction.model_server import build_model_server
+from demand_prediction.numpy_engine import NUMPY_ATOL
+
+
+class Command(BaseCommand):
+    """单样本推理微基准：python manage.py inference_benchmark --runs 200"""
+    help = '在CPU上对比 model.predict、直接 __call__、编译后 tf.function、纯NumPy 与 TFLite（若已导出）的单样本预测延迟'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--runs', type=int, default=200, help='每种方式重复次数')
+        parser.add_argument('--batch-size', type=int, default=1)
+
+    def handle(self, *args, **options):
+        server = build_model_server(backend='keras', backend_options={'fast_path': True}).load()
+        self.stdout.write(f'{"模型":<6} {"方式":<14} {"p50(ms)":>10} {"p99(ms)":>10} {"均值(ms)":>10}')
+        for name, backend in (('LSTM', server.lstm), ('BP', server.bp)):
+            model, fn = backend.model, backend.fn
+            numpy_model = create_backend('numpy', backend.path).load()
+            batch = server.dummy_batch(backend, options['batch_size'])
+            paths = {
+                'predict': lambda: model.predict(batch, verbose=0),
+                '__call__': lambda: model(batch, training=False).numpy(),
+                'tf.function': lambda: fn(batch).numpy(),
+                'numpy': lambda: numpy_model.predict(batch),
+            }
+            tflite = create_backend('tflite', backend.path)
+            if os.path.exists(tflite.path):
+                paths['tflite'] = lambda: tflite.predict(batch)
+                tflite.load()
+            reference = paths['predict']()
+            for path_name, call in paths.items():
+                np.testing.assert_allclose(call(), reference, rtol=0, atol=NUMPY_ATOL)
+                latencies = self._time(call, options['runs'])
+                self.stdout.write(
+                    f'{name:<6} {path_name:<14} {np.percentile(latencies, 50):>10.3f} '
+                    f'{np.percentile(latencies, 99):>10.3f} {latencies.mean():>10.3f}'
+                )
+
+    @staticmethod
+    def _time(call, runs):
+        call()  # 预热（首次调用可能触发追踪）
+        latencies = []
+        for _ in range(runs):
+            t0 = time.perf_counter()
+            call()
+            latencies.append((time.perf_counter() - t0) * 1000)
+        return np.array(latencies)
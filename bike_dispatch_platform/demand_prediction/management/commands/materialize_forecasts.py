@@ -0,0 +1,37 @@
+import time
+from datetime import date
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from demand_prediction.materialize import materialize_forecasts
+
+
+class Command(BaseCommand):
+    """预测结果预计算：python manage.py materialize_forecasts --interval 21600（常驻，每 6 小时刷新一次）"""
+    help = ('按 天气 × 整数温度 的场景预计算未来几天全部区域/时段的需求预测，写入 MaterializedForecast，'
+            'demand_predict 命中时直接读表；--interval 大于 0 时常驻并按间隔重复执行')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--start', type=date.fromisoformat, help='起始日期（默认明天）')
+        parser.add_argument('--days', type=int, default=settings.FORECAST_MATERIALIZE_DAYS, help='预计算天数')
+        parser.add_argument('--interval', type=float, default=0,
+                            help=f'重复执行间隔秒数（0 为只执行一次，建议 {settings.FORECAST_MATERIALIZE_INTERVAL}）')
+
+    def handle(self, *args, **options):
+        while True:
+            t0 = time.perf_counter()
+            try:
+                rows = materialize_forecasts(start_date=options['start'], days=options['days'])
+            except Exception as e:
+                if not options['interval']:
+                    raise
+                self.stderr.write(f'预计算失败：{e}')  # 常驻时记录错误，下个周期重试
+            else:
+                self.stdout.write(self.style.SUCCESS(
+                    f'预计算完成：{rows} 条，耗时 {time.perf_counter() - t0:.2f} 秒'))
+            if not options['interval']:
+                return
+            close_old_connections()
+            time.sleep(max(options['interval'] - (time.perf_counter() - t0), 0))
@@ -0,0 +1,40 @@
+import time
+
+import numpy as np
+from django.core.management.base import BaseCommand
+
+from demand_prediction.model_server import build_model_server
+
+
+class Command(BaseCommand):
+    """测量预测模型服务的冷启动与预热后延迟：python manage.py model_latency --runs 100"""
+    help = '测量模型服务冷启动（导入TensorFlow+加载模型+预热）与预热后单次预测延迟'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--runs', type=int, default=50, help='预热后重复预测次数')
+
+    def handle(self, *args, **options):
+        # 1. 冷启动：新建服务实例（不复用进程单例）
+        server = build_model_server()
+        t0 = time.perf_counter()
+        server.load()
+        cold_total = time.perf_counter() - t0
+        self.stdout.write('冷启动耗时：')
+        for name, seconds in server.timings.items():
+            self.stdout.write(f'  {name:<10} {seconds * 1000:10.1f} ms')
+        self.stdout.write(f'  {"total":<10} {cold_total * 1000:10.1f} ms')
+
+        # 2. 预热后延迟：按模型输入形状构造单样本输入
+        lstm_input = server.dummy_batch(server.lstm)
+        bp_input = server.dummy_batch(server.bp)
+        latencies = []
+        for _ in range(options['runs']):
+            t0 = time.perf_counter()
+            server.predict_scaled(lstm_input, bp_input)
+            latencies.append(time.perf_counter() - t0)
+        latencies = np.array(latencies) * 1000
+        self.stdout.write(
+            f'预热后双模型预测（{options["runs"]}次）：'
+            f'p50 {np.percentile(latencies, 50):.2f} ms，p99 {np.percentile(latencies, 99):.2f} ms，'
+            f'均值 {latencies.mean():.2f} ms'
+        )
@@ -0,0 +1,91 @@
+import os
+import time
+
+import numpy as np
+import pandas as pd
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from numpy.lib.stride_tricks import sliding_window_view
+
+from demand_prediction.forecast import FEATURES, TIME_STEPS
+from demand_prediction.model_server import build_model_server
+from demand_prediction.numpy_engine import load_h5_model
+
+TRAIN_CSV = os.path.join(settings.BASE_DIR, '..', 'data', 'train.csv')
+
+
+class Command(BaseCommand):
+    """多步预测基准：python manage.py multistep_benchmark --horizons 24 72 168 --starts 32"""
+    help = ('在 train.csv 上对比 LSTM 多步预测的三种方式：逐步重取窗口、窗口批量计算、有状态递推（可定期按窗口重读），'
+            '输出耗时、单元计算次数与相对真实值的 MAE')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--horizons', type=int, nargs='+', default=[24, 72, 168], help='预测步数（小时）')
+        parser.add_argument('--starts', type=int, default=32, help='随机选取的起点数（作为一个批次同时预测）')
+        parser.add_argument('--refresh', type=int, nargs='+', default=[settings.FORECAST_STATE_REFRESH],
+                            help='有状态递推时每隔几步按完整窗口重新读入（0 为不重读）')
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        server = build_model_server(backend='numpy', warmup=False).load()
+        model = load_h5_model(os.path.splitext(settings.LSTM_MODEL_PATH)[0] + '.h5')
+        layers = sum(1 for layer in model.stepper().recurrent)
+        x, y = self.load_series(server)
+        rng = np.random.default_rng(options['seed'])
+
+        self.stdout.write(f'{"步数":>4} {"方式":<10} {"耗时(ms)":>10} {"单元计算/起点":>14} {"MAE(辆)":>9} {"与窗口差(辆)":>12}')
+        for horizon in options['horizons']:
+            starts = rng.integers(0, len(x) - TIME_STEPS - horizon, options['starts'])
+            actual = y[starts[:, None] + TIME_STEPS + np.arange(horizon)]
+            windows = sliding_window_view(x, TIME_STEPS, axis=0).transpose(0, 2, 1)
+            # 第 k 步的窗口起点为 start + k
+            step_windows = [windows[starts + k] for k in range(horizon)]
+
+            def rewindow():
+                return np.concatenate([model.predict(window) for window in step_windows], axis=1)
+
+            def batched():
+                stacked = np.concatenate(step_windows)
+                return model.predict(stacked).reshape(horizon, len(starts)).T
+
+            future = np.stack([x[start + TIME_STEPS:start + TIME_STEPS + horizon - 1] for start in starts])
+
+            methods = {
+                '逐步重取窗口': (rewindow, horizon * TIME_STEPS * layers),
+                '窗口批量计算': (batched, horizon * TIME_STEPS * layers),
+            }
+            for refresh in options['refresh']:
+                stepper = model.stepper()  # 先用单个起点统计单元计算次数
+                stepper.forecast(windows[starts[:1]], future[:1], refresh=refresh or None)
+                name = f'有状态递推/{refresh}' if refresh else '有状态递推'
+                methods[name] = (lambda refresh=refresh: model.stepper().forecast(windows[starts], future,
+                                                                                   refresh=refresh or None),
+                                 stepper.cells)
+            reference = None
+            for name, (method, cells) in methods.items():
+                seconds, scaled = self.timed(method)
+                demand = server.to_demand_batch(scaled).reshape(scaled.shape)
+                reference = demand if reference is None else reference
+                self.stdout.write(
+                    f'{horizon:>4} {name:<10} {seconds * 1000:>10.1f} {cells:>14} '
+                    f'{np.abs(demand - actual).mean():>9.1f} {np.abs(demand - reference).mean():>12.1f}'
+                )
+
+    @staticmethod
+    def load_series(server):
+        """train.csv → 归一化后的逐小时特征 (小时数, 11) 与真实需求 (小时数,)（与 data_preprocess.py 的特征一致）"""
+        data = pd.read_csv(TRAIN_CSV, parse_dates=['datetime'])
+        data['hour'] = data['datetime'].dt.hour
+        data['weekday'] = data['datetime'].dt.weekday
+        data['month'] = data['datetime'].dt.month
+        x = server.transform(data[FEATURES]).astype(np.float32)
+        return x, data['count'].to_numpy()
+
+    @staticmethod
+    def timed(method, repeat=3):
+        best, result = float('inf'), None
+        for _ in range(repeat):
+            t0 = time.perf_counter()
+            result = method()
+            best = min(best, time.perf_counter() - t0)
+        return best, result
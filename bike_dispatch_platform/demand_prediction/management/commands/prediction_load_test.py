@@ -0,0 +1,66 @@
+import threading
+import time
+
+import numpy as np
+from django.core.management.base import BaseCommand
+
+from demand_prediction.batcher import MicroBatcher
+from demand_prediction.model_server import get_model_server
+
+
+class Command(BaseCommand):
+    """并发预测压测：python manage.py prediction_load_test --clients 1 8 64 --requests 50"""
+    help = '对比逐请求预测与微批处理在不同并发数下的 p50/p99 延迟和吞吐量'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--clients', type=int, nargs='+', default=[1, 8, 64], help='并发客户端数')
+        parser.add_argument('--requests', type=int, default=50, help='每个客户端发送的请求数')
+        parser.add_argument('--max-batch', type=int, default=64)
+        parser.add_argument('--max-wait-ms', type=float, default=5)
+
+    def handle(self, *args, **options):
+        server = get_model_server().load()
+        lstm_input = server.dummy_batch(server.lstm)
+        bp_input = server.dummy_batch(server.bp)
+        batcher = MicroBatcher(server, options['max_batch'], options['max_wait_ms'])
+
+        modes = {
+            '逐请求': server.predict_scaled,
+            '微批处理': batcher.predict,
+        }
+        self.stdout.write(f'{"模式":<8} {"并发":>6} {"p50(ms)":>10} {"p99(ms)":>10} {"吞吐(次/s)":>12}')
+        for clients in options['clients']:
+            for name, predict in modes.items():
+                latencies, elapsed = self._run(predict, lstm_input, bp_input, clients, options['requests'])
+                self.stdout.write(
+                    f'{name:<8} {clients:>6} {np.percentile(latencies, 50):>10.2f} '
+                    f'{np.percentile(latencies, 99):>10.2f} {len(latencies) / elapsed:>12.1f}'
+                )
+        if batcher.stats['batches']:
+            self.stdout.write(f'微批处理平均批大小：{batcher.stats["requests"] / batcher.stats["batches"]:.1f}')
+
+    @staticmethod
+    def _run(predict, lstm_input, bp_input, clients, requests):
+        """clients 个线程各发 requests 次预测，返回 (每次延迟毫秒数组, 总耗时秒)"""
+        latencies = []
+        lock = threading.Lock()
+        start = threading.Barrier(clients + 1)
+
+        def client():
+            local = []
+            start.wait()
+            for _ in range(requests):
+                t0 = time.perf_counter()
+                predict(lstm_input, bp_input)
+                local.append((time.perf_counter() - t0) * 1000)
+            with lock:
+                latencies.extend(local)
+
+        threads = [threading.Thread(target=client) for _ in range(clients)]
+        for thread in threads:
+            thread.start()
+        start.wait()
+        t0 = time.perf_counter()
+        for thread in threads:
+            thread.join()
+        return np.array(latencies), time.perf_counter() - t0
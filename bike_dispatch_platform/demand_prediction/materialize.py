@@ -0,0 +1,64 @@
+"""
+预测结果预计算：大部分预测请求是“未来一两天 × 4 个区域 × 4 个时段”，只是天气、温度不同。
+materialize_forecasts 命令在低峰时段按 天气 × 整数温度 的场景逐个用 forecast_grid 批量预测（每个场景一次前向计算），
+写入 MaterializedForecast；demand_predict 收到整数温度的请求时先查表，命中即一次数据库读取返回。
+"""
+import math
+from datetime import date, timedelta
+
+from django.conf import settings
+from django.db import transaction
+
+from .forecast import ForecastGrid, forecast_grid
+from .model_server import get_model_server
+from .models import MaterializedForecast
+
+
+def materialize_forecasts(start_date=None, days=None, weathers=None, temperatures=None, server=None):
+    """
+    预计算 [start_date, start_date + days) 的全部区域 × 时段 × 天气 × 温度场景（默认从明天起 FORECAST_MATERIALIZE_DAYS 天），
+    替换这些日期的旧结果并删除已过期的结果（一个事务），返回写入条数
+    """
+    server = (server or get_model_server()).load()
+    if server.file_version() != server.version:  # 常驻进程中模型文件已更新
+        server.reload()
+    start_date = start_date or date.today() + timedelta(days=1)
+    days = days or settings.FORECAST_MATERIALIZE_DAYS
+    weathers = weathers or settings.FORECAST_MATERIALIZE_WEATHERS
+    temperatures = temperatures or settings.FORECAST_MATERIALIZE_TEMPERATURES
+
+    objs = []
+    for weather in weathers:
+        for temperature in temperatures:
+            grid = ForecastGrid(start_date=start_date, days=days, weather=weather, temperature=temperature)
+            objs.extend(
+                MaterializedForecast(region=item['region'], time_period=item['time_period'],
+                                     predict_date=item['date'], weather=weather, temperature=temperature,
+                                     demand_count=item['demand'], lstm_count=item['lstm'], bp_count=item['bp'],
+                                     model_version=server.version)
+                for item in forecast_grid(grid, server)
+            )
+
+    end_date = start_date + timedelta(days=days - 1)
+    with transaction.atomic():
+        MaterializedForecast.objects.filter(predict_date__range=(start_date, end_date)).delete()
+        MaterializedForecast.objects.filter(predict_date__lt=date.today()).delete()
+        MaterializedForecast.objects.bulk_create(objs, batch_size=settings.DATA_INGEST_BATCH_SIZE)
+    return len(objs)
+
+
+def lookup_forecast(region, time_period, predict_date, weather, temperature):
+    """
+    查找预计算结果：温度须为有限的整数且模型文件未在预计算之后更新，否则返回 None（由调用方实时计算）
+    predict_date 可为 date 或 'YYYY-MM-DD'
+    """
+    if not math.isfinite(temperature) or temperature != int(temperature):
+        return None
+    try:
+        day = predict_date if isinstance(predict_date, date) else date.fromisoformat(predict_date)
+    except (TypeError, ValueError):
+        return None
+    return MaterializedForecast.objects.filter(
+        region=region, time_period=time_period, predict_date=day, weather=weather, temperature=int(temperature),
+        model_version=get_model_server().file_version(),
+    ).first()
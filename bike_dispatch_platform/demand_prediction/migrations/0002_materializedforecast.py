@@ -0,0 +1,32 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('demand_prediction', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MaterializedForecast',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('region', models.CharField(choices=[('region1', '区域1'), ('region2', '区域2'), ('region3', '区域3'), ('region4', '区域4')], max_length=20, verbose_name='预测区域')),
+                ('time_period', models.CharField(choices=[('morning', '早高峰（7-9点）'), ('noon', '午间（11-13点）'), ('evening', '晚高峰（17-19点）'), ('night', '夜间（21-23点）')], max_length=20, verbose_name='预测时段')),
+                ('predict_date', models.DateField(verbose_name='预测日期')),
+                ('weather', models.CharField(max_length=20, verbose_name='天气')),
+                ('temperature', models.SmallIntegerField(verbose_name='温度（℃）')),
+                ('demand_count', models.IntegerField(verbose_name='调度需求车辆数')),
+                ('lstm_count', models.IntegerField(verbose_name='LSTM预测值')),
+                ('bp_count', models.IntegerField(verbose_name='BP预测值')),
+                ('model_version', models.CharField(max_length=20, verbose_name='模型版本')),
+                ('update_time', models.DateTimeField(auto_now=True, verbose_name='生成时间')),
+            ],
+            options={
+                'verbose_name': '预计算预测结果',
+                'verbose_name_plural': '预计算预测结果',
+                'unique_together': {('region', 'time_period', 'predict_date', 'weather', 'temperature')},
+            },
+        ),
+    ]
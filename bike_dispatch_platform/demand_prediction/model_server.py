@@ -0,0 +1,168 @@
+"""
+预测模型服务（进程内单例）
+模型与归一化器在首次预测时才加载（manage.py 命令、数据库迁移不再承担推理框架导入和模型加载开销），
+加载后用全零批次预热一次，让计算图追踪发生在请求路径之外。
+"""
+import hashlib
+import os
+import threading
+import time
+
+import joblib
+import numpy as np
+from django.conf import settings
+
+from .backends import BACKENDS, create_backend
+
+
+class ModelServer:
+    """LSTM + BP 双模型服务：懒加载、预热、线程安全，具体推理由可插拔后端完成（见 backends.py）"""
+
+    def __init__(self, lstm_path, bp_path, scaler_x_path, scaler_y_path, warmup=True,
+                 backend='keras', backend_options=None):
+        self.lstm_path = lstm_path
+        self.bp_path = bp_path
+        self.scaler_x_path = scaler_x_path
+        self.scaler_y_path = scaler_y_path
+        self.warmup = warmup
+        self.backend = backend
+        self.backend_options = backend_options or {}
+        self._lock = threading.Lock()
+        self._loaded = False
+        self._lstm_numpy = None
+        self.version = None  # 已加载模型对应的文件版本签名（见 file_version）
+        # 加载耗时统计（秒），供 model_latency 命令和排查冷启动使用
+        self.timings = {}
+
+    @property
+    def loaded(self):
+        return self._loaded
+
+    def load(self):
+        """加载模型与归一化器（幂等，多线程并发调用只会加载一次）"""
+        if self._loaded:
+            return self
+        with self._lock:
+            if self._loaded:
+                return self
+            self._load_models()
+            self._loaded = True
+        return self
+
+    def reload(self):
+        """模型文件更新后重新加载：新模型加载、预热完成后才替换，期间其他线程继续使用旧模型"""
+        with self._lock:
+            self._load_models()
+            self._lstm_numpy = None
+            self._loaded = True
+        return self
+
+    def _load_models(self):
+        version = self.file_version()
+        t0 = time.perf_counter()
+        lstm = create_backend(self.backend, self.lstm_path, **self.backend_options).load()
+        bp = create_backend(self.backend, self.bp_path, **self.backend_options).load()
+        scaler_x = joblib.load(self.scaler_x_path)
+        scaler_y = joblib.load(self.scaler_y_path)
+        self.timings['load'] = time.perf_counter() - t0
+
+        if self.warmup:
+            t0 = time.perf_counter()
+            lstm.predict(self.dummy_batch(lstm))
+            bp.predict(self.dummy_batch(bp))
+            self.timings['warmup'] = time.perf_counter() - t0
+        self.lstm, self.bp, self.scaler_x, self.scaler_y = lstm, bp, scaler_x, scaler_y
+        self.version = version
+
+    def model_files(self):
+        """当前推理后端实际读取的模型文件与归一化器文件"""
+        suffix = BACKENDS[self.backend].suffix
+        return [os.path.splitext(path)[0] + suffix for path in (self.lstm_path, self.bp_path)] + \
+               [self.scaler_x_path, self.scaler_y_path]
+
+    def file_version(self):
+        """模型文件版本签名（各文件大小与修改时间的摘要），文件被替换或重新训练后随之改变"""
+        digest = hashlib.sha1()
+        for path in self.model_files():
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                continue
+            digest.update(f'{path}:{stat.st_size}:{stat.st_mtime_ns};'.encode())
+        return digest.hexdigest()[:12]
+
+    def preload_async(self):
+        """后台线程加载（WSGI 进程启动时调用，首个请求无需等待）"""
+        thread = threading.Thread(target=self.load, name='model-server-preload', daemon=True)
+        thread.start()
+        return thread
+
+    @staticmethod
+    def dummy_batch(backend, batch_size=1):
+        """按后端模型输入形状构造全零批次（用于预热和基准测试）"""
+        shape = tuple(dim or 1 for dim in backend.input_shape)
+        return np.zeros((batch_size,) + shape, dtype=np.float32)
+
+    def lstm_stepper(self):
+        """LSTM 有状态多步递推器（纯 NumPy 引擎直接读 .h5 权重，与当前推理后端无关；每次调用返回独立的状态）"""
+        if self._lstm_numpy is None:
+            with self._lock:
+                if self._lstm_numpy is None:
+                    from .numpy_engine import load_h5_model
+                    self._lstm_numpy = load_h5_model(os.path.splitext(self.lstm_path)[0] + '.h5')
+        return self._lstm_numpy.stepper()
+
+    def transform(self, x):
+        """原始特征 → 归一化特征"""
+        return self.load().scaler_x.transform(x)
+
+    def predict_batch(self, lstm_batch, bp_batch):
+        """双模型批量预测（每个模型一次前向计算），返回归一化空间的 (LSTM结果数组, BP结果数组)"""
+        self.load()
+        return self.lstm.predict(lstm_batch), self.bp.predict(bp_batch)
+
+    def predict_scaled(self, lstm_input, bp_input):
+        """双模型单样本预测，返回归一化空间的 (LSTM结果, BP结果)"""
+        lstm_pred, bp_pred = self.predict_batch(lstm_input, bp_input)
+        return lstm_pred[0][0], bp_pred[0][0]
+
+    def to_demand(self, scaled_value):
+        """反归一化得到真实需求数（辆）"""
+        return round(self.load().scaler_y.inverse_transform([[scaled_value]])[0][0])
+
+    def to_demand_batch(self, scaled_values):
+        """批量反归一化（一次 inverse_transform），返回整数需求数组（辆）"""
+        scaled = np.asarray(scaled_values, dtype=float).reshape(-1, 1)
+        return np.rint(self.load().scaler_y.inverse_transform(scaled)[:, 0]).astype(int)
+
+
+def build_model_server(**overrides):
+    """按 settings 中的模型路径创建新的服务实例（单例之外，基准测试也用它测冷启动）"""
+    options = {
+        'lstm_path': settings.LSTM_MODEL_PATH,
+        'bp_path': settings.BP_MODEL_PATH,
+        'scaler_x_path': settings.SCALER_X_PATH,
+        'scaler_y_path': settings.SCALER_Y_PATH,
+        'warmup': settings.PREDICTION_WARMUP,
+        'backend': settings.PREDICTION_BACKEND,
+        'backend_options': {
+            'fast_path': settings.PREDICTION_FAST_PATH,
+            'num_threads': settings.PREDICTION_TFLITE_THREADS,
+        },
+    }
+    options.update(overrides)
+    return ModelServer(**options)
+
+
+_server = None
+_server_lock = threading.Lock()
+
+
+def get_model_server():
+    """进程内共享的模型服务单例（仅创建对象，首次预测时才真正加载模型）"""
+    global _server
+    if _server is None:
+        with _server_lock:
+            if _server is None:
+                _server = build_model_server()
+    return _server
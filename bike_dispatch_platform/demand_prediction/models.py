@@ -43,4 +43,29 @@ class PredictionResult(models.Model):
         
     def __str__(self):
         """自定义对象展示名称，便于后台管理查看"""
-        return f"{self.predict_date} {self.get_region_display()} {self.get_time_period_display()} 需求数：{self.demand_count}"
\ No newline at end of file
+        return f"{self.predict_date} {self.get_region_display()} {self.get_time_period_display()} 需求数：{self.demand_count}"
+
+class MaterializedForecast(models.Model):
+    """
+    预计算的预测结果（区域 × 时段 × 日期 × 天气 × 温度），由 materialize_forecasts 命令在低峰时段定时生成，
+    demand_predict 命中时直接读表返回，不再做模型计算；model_version 为生成时的模型文件版本，模型更新后旧结果不再使用
+    """
+    region = models.CharField(max_length=20, choices=REGION_CHOICES, verbose_name="预测区域")
+    time_period = models.CharField(max_length=20, choices=PredictionResult.TIME_PERIOD_CHOICES, verbose_name="预测时段")
+    predict_date = models.DateField(verbose_name="预测日期")
+    weather = models.CharField(max_length=20, verbose_name="天气")
+    temperature = models.SmallIntegerField(verbose_name="温度（℃）")
+    demand_count = models.IntegerField(verbose_name="调度需求车辆数")
+    lstm_count = models.IntegerField(verbose_name="LSTM预测值")
+    bp_count = models.IntegerField(verbose_name="BP预测值")
+    model_version = models.CharField(max_length=20, verbose_name="模型版本")
+    update_time = models.DateTimeField(auto_now=True, verbose_name="生成时间")
+
+    class Meta:
+        verbose_name = "预计算预测结果"
+        verbose_name_plural = "预计算预测结果"
+        unique_together = ("region", "time_period", "predict_date", "weather", "temperature")
+
+    def __str__(self):
+        return f"{self.predict_date} {self.get_region_display()} {self.get_time_period_display()} " \
+               f"{self.weather} {self.temperature}℃ 需求数：{self.demand_count}"
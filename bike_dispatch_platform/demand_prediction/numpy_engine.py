@@ -0,0 +1,261 @@
+"""
+纯 NumPy 推理引擎
+直接从 Keras .h5 文件读取结构与权重（只依赖 numpy + h5py），支持本项目用到的
+InputLayer / LSTM / Dense / BatchNormalization / Dropout：
+- BatchNormalization 折叠进后一个 Dense 层（推理时 BN 只是逐通道仿射变换）
+- LSTM 先一次性计算所有时间步的输入投影，再逐步递推；中间缓冲区按批大小预分配复用
+- RecurrentStepper 保留 LSTM 隐藏/细胞状态做多步预测，每多预测一步只需每层一次单元计算
+输出与 Keras 在 NUMPY_ATOL 以内一致（见 inference_benchmark 命令）。
+"""
+import json
+import threading
+
+import numpy as np
+
+NUMPY_ATOL = 1e-4  # 与 Keras 输出（归一化空间）允许的最大绝对误差
+
+
+def _sigmoid(x, out):
+    np.negative(x, out=out)
+    np.exp(out, out=out)
+    out += 1
+    np.reciprocal(out, out=out)
+    return out
+
+
+_ACTIVATIONS = {
+    'linear': lambda x: x,
+    'relu': lambda x: np.maximum(x, 0, out=x),
+    'tanh': lambda x: np.tanh(x, out=x),
+    'sigmoid': lambda x: _sigmoid(x, x),
+}
+
+
+class _Dense:
+    def __init__(self, kernel, bias, activation):
+        self.kernel = np.ascontiguousarray(kernel, dtype=np.float32)
+        self.bias = np.asarray(bias, dtype=np.float32)
+        self.activation = _ACTIVATIONS[activation]
+
+    def fold_affine(self, scale, shift):
+        """把前一层的逐通道仿射变换 y = x*scale + shift 折叠进本层权重"""
+        self.bias = self.bias + shift @ self.kernel
+        self.kernel = np.ascontiguousarray(scale[:, None] * self.kernel)
+
+    def __call__(self, x, buffers):
+        out = buffers.get(self, (len(x), self.kernel.shape[1]))
+        np.matmul(x, self.kernel, out=out)
+        out += self.bias
+        return self.activation(out)
+
+
+class _Affine:
+    """末尾无法折叠的 BatchNormalization"""
+
+    def __init__(self, scale, shift):
+        self.scale = scale
+        self.shift = shift
+
+    def __call__(self, x, buffers):
+        return x * self.scale + self.shift
+
+
+class _LSTM:
+    """Keras LSTM（门顺序 i, f, c, o；activation=tanh，recurrent_activation=sigmoid）"""
+
+    def __init__(self, kernel, recurrent_kernel, bias, return_sequences):
+        self.kernel = np.ascontiguousarray(kernel, dtype=np.float32)
+        self.recurrent_kernel = np.ascontiguousarray(recurrent_kernel, dtype=np.float32)
+        self.bias = np.asarray(bias, dtype=np.float32)
+        self.units = self.recurrent_kernel.shape[0]
+        self.return_sequences = return_sequences
+
+    def __call__(self, x, buffers):
+        batch, steps, _ = x.shape
+        h = buffers.get((self, 'h'), (batch, self.units))
+        c = buffers.get((self, 'c'), (batch, self.units))
+        h.fill(0)
+        c.fill(0)
+        return self.run(x, h, c, buffers)
+
+    def run(self, x, h, c, buffers):
+        """从状态 (h, c) 开始递推整个序列（就地更新 h、c），返回输出序列或最后一步的 h"""
+        batch, steps, _ = x.shape
+        # 所有时间步的输入投影一次矩阵乘法算完
+        x_proj = buffers.get((self, 'x_proj'), (batch, steps, 4 * self.units))
+        np.matmul(x, self.kernel, out=x_proj)
+        x_proj += self.bias
+        seq = buffers.get((self, 'seq'), (batch, steps, self.units)) if self.return_sequences else None
+        for t in range(steps):
+            self.cell(x_proj[:, t], h, c, buffers)
+            if seq is not None:
+                seq[:, t] = h
+        return seq if seq is not None else h
+
+    def cell(self, x_proj_t, h, c, buffers):
+        """单步递推：x_proj_t 为当前时间步的输入投影（含偏置），就地更新 h、c"""
+        units = self.units
+        z = buffers.get((self, 'z'), (len(h), 4 * units))
+        tmp = buffers.get((self, 'tmp'), (len(h), units))
+        np.matmul(h, self.recurrent_kernel, out=z)
+        z += x_proj_t
+        _sigmoid(z[:, :2 * units], z[:, :2 * units])         # 输入门 i、遗忘门 f
+        np.tanh(z[:, 2 * units:3 * units], out=z[:, 2 * units:3 * units])  # 候选状态
+        _sigmoid(z[:, 3 * units:], z[:, 3 * units:])         # 输出门 o
+        c *= z[:, units:2 * units]
+        np.multiply(z[:, :units], z[:, 2 * units:3 * units], out=tmp)
+        c += tmp
+        np.tanh(c, out=tmp)
+        np.multiply(z[:, 3 * units:], tmp, out=h)
+        return h
+
+
+class _Buffers:
+    """按 (层, 形状) 缓存的预分配缓冲区，同一批大小重复推理不再分配内存"""
+
+    def __init__(self):
+        self._arrays = {}
+
+    def get(self, key, shape):
+        array = self._arrays.get(key)
+        if array is None or array.shape != shape:
+            array = self._arrays[key] = np.empty(shape, dtype=np.float32)
+        return array
+
+
+class NumpyModel:
+    """从 .h5 构建的 NumPy 前向计算模型（缓冲区复用，调用加锁保证线程安全）"""
+
+    def __init__(self, layers, input_shape):
+        self.layers = layers
+        self.input_shape = tuple(input_shape)
+        self._buffers = _Buffers()
+        self._lock = threading.Lock()
+
+    def predict(self, x):
+        x = np.asarray(x, dtype=np.float32)
+        with self._lock:
+            for layer in self.layers:
+                x = layer(x, self._buffers)
+            return x.copy()
+
+    def stepper(self):
+        """创建有状态多步递推器（每个调用方各用一个，互不共享状态）"""
+        count = 0
+        while count < len(self.layers) and isinstance(self.layers[count], _LSTM):
+            count += 1
+        if count == 0 or any(isinstance(layer, _LSTM) for layer in self.layers[count:]):
+            raise ValueError("多步递推要求模型由开头的 LSTM 层加后面的全连接层组成")
+        return RecurrentStepper(self.layers[:count], self.layers[count:])
+
+
+class RecurrentStepper:
+    """
+    有状态多步递推：encode() 从零状态读入历史窗口，得到下一小时预测并保留各 LSTM 层的 (h, c)；
+    之后每个 step() 只读入一个时间步（每层一次单元计算），不再重放整个窗口。
+    cells 统计累计的单元计算次数（层数 × 时间步数），用于与逐窗口重算对比。
+    """
+
+    def __init__(self, recurrent, head):
+        self.recurrent = recurrent
+        self.head = head
+        self.state = None
+        self.cells = 0
+        self._buffers = _Buffers()
+
+    def _predict_head(self, h):
+        x = h
+        for layer in self.head:
+            x = layer(x, self._buffers)
+        return x.copy()
+
+    def encode(self, windows):
+        """windows (批大小, 时间步, 特征数)，返回窗口之后一个时间步的预测 (批大小, 1)"""
+        x = np.asarray(windows, dtype=np.float32)
+        self.state = []
+        for layer in self.recurrent:
+            h = np.zeros((len(x), layer.units), dtype=np.float32)
+            c = np.zeros_like(h)
+            x = layer.run(x, h, c, self._buffers)
+            self.state.append((h, c))
+            self.cells += windows.shape[1]
+        return self._predict_head(self.state[-1][0])
+
+    def step(self, x_t):
+        """读入下一个时间步的特征 x_t (批大小, 特征数)，推进状态，返回再下一个时间步的预测 (批大小, 1)"""
+        x = np.asarray(x_t, dtype=np.float32)
+        for layer, (h, c) in zip(self.recurrent, self.state):
+            x_proj = x @ layer.kernel
+            x_proj += layer.bias
+            x = layer.cell(x_proj, h, c, self._buffers)
+            self.cells += 1
+        return self._predict_head(x)
+
+    def forecast(self, windows, future, refresh=None):
+        """
+        多步预测：windows (批大小, 时间步, 特征数) 为历史窗口，future (批大小, k, 特征数) 为其后 k 个时间步的已知特征，
+        返回 (批大小, k + 1)：窗口之后第 1 ~ k+1 个时间步的预测
+        refresh=R 时每 R 步按最近的完整窗口重新 encode 一次（模型只在定长窗口上训练过，状态递推过长会漂移）
+        """
+        steps = windows.shape[1]
+        sequence = np.concatenate([windows, future], axis=1) if refresh else None
+        outputs = [self.encode(windows)]
+        for t in range(future.shape[1]):
+            if refresh and (t + 1) % refresh == 0:
+                outputs.append(self.encode(sequence[:, t + 1:t + 1 + steps]))
+            else:
+                outputs.append(self.step(future[:, t]))
+        return np.concatenate(outputs, axis=1)
+
+
+def _layer_weights(weights_group, name):
+    """读取 model_weights/<层名>/ 下的全部权重，按变量名（去掉 :0）索引"""
+    arrays = {}
+    weights_group[name].visititems(
+        lambda path, obj: arrays.__setitem__(path.rsplit('/', 1)[-1].split(':')[0], obj[()])
+        if hasattr(obj, 'shape') else None
+    )
+    return arrays
+
+
+def load_h5_model(path):
+    """解析 Keras .h5（Sequential），返回 NumpyModel"""
+    import h5py
+
+    with h5py.File(path, 'r') as f:
+        config = json.loads(f.attrs['model_config'])
+        weights_group = f['model_weights']
+        layer_configs = config['config']['layers']
+        input_shape = None
+        layers = []
+        pending_affine = None  # 等待折叠进下一个 Dense 的 BN 仿射变换
+
+        for layer in layer_configs:
+            cls, cfg = layer['class_name'], layer['config']
+            if input_shape is None and cfg.get('batch_input_shape'):
+                input_shape = cfg['batch_input_shape'][1:]
+            if cls in ('InputLayer', 'Dropout'):
+                continue
+            weights = _layer_weights(weights_group, cfg['name'])
+            if cls == 'Dense':
+                dense = _Dense(weights['kernel'], weights.get('bias', np.zeros(cfg['units'])), cfg['activation'])
+                if pending_affine is not None:
+                    dense.fold_affine(*pending_affine)
+                    pending_affine = None
+                layers.append(dense)
+            elif cls == 'BatchNormalization':
+                gamma = weights.get('gamma', 1.0)
+                beta = weights.get('beta', 0.0)
+                scale = (gamma / np.sqrt(weights['moving_variance'] + cfg['epsilon'])).astype(np.float32)
+                shift = (beta - weights['moving_mean'] * scale).astype(np.float32)
+                pending_affine = (scale, shift)
+            elif cls == 'LSTM':
+                if cfg['activation'] != 'tanh' or cfg['recurrent_activation'] != 'sigmoid':
+                    raise ValueError(f"NumPy 引擎仅支持 tanh/sigmoid 激活的 LSTM：{cfg['name']}")
+                layers.append(_LSTM(weights['kernel'], weights['recurrent_kernel'],
+                                    weights['bias'], cfg['return_sequences']))
+            else:
+                raise ValueError(f"NumPy 引擎不支持的层类型：{cls}")
+        if pending_affine is not None:
+            layers.append(_Affine(*pending_affine))
+    return NumpyModel(layers, input_shape)
@@ -0,0 +1,158 @@
+"""
+单次预测结果缓存（demand_predict 视图）
+调度员反复查询相同的 区域/时段/日期/天气/温度 组合时，归一化后的特征窗口完全相同，
+缓存键 = 模型文件版本签名 + 归一化特征窗口的摘要，命中时直接返回 (LSTM结果数组, BP结果数组)，不再做双模型前向计算。
+- 进程内 LRU（OrderedDict），条目数不超过 PREDICTION_CACHE_SIZE
+- PREDICTION_CACHE_ALIAS 配置后同时写入 Django 缓存，多个 Web 进程共享（键含模型版本，旧模型的结果不会被读到）
+- 每隔 PREDICTION_CACHE_CHECK_SECONDS 检查一次 models/ 下模型文件的大小与修改时间，
+  文件变化后重新加载模型并清空进程内缓存
+"""
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+from django.conf import settings
+from django.core.cache import caches
+
+from .model_server import get_model_server
+
+
+class PredictionCache:
+    """按归一化特征缓存双模型预测结果的 LRU 缓存（线程安全）"""
+
+    def __init__(self, server, max_entries=1024, alias=None, timeout=None, check_seconds=5):
+        self.server = server
+        self.max_entries = max_entries
+        self.alias = alias
+        self.timeout = timeout
+        self.check_seconds = check_seconds
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._checked_at = 0.0
+        # 运行统计：进程内命中、共享缓存命中、未命中、未命中时的推理总耗时、模型更新导致的失效次数
+        self.stats = {'hits': 0, 'shared_hits': 0, 'misses': 0, 'inference_seconds': 0.0, 'invalidations': 0}
+
+    @property
+    def shared(self):
+        return caches[self.alias] if self.alias else None
+
+    def key(self, x_scaled):
+        """缓存键：模型版本 + 归一化特征（按 float32、6 位小数取整，消除浮点误差）的摘要"""
+        features = np.round(np.asarray(x_scaled, dtype=np.float32), 6)
+        digest = hashlib.sha1(str(features.shape).encode())
+        digest.update(np.ascontiguousarray(features).tobytes())
+        return f"prediction:{self.server.version}:{digest.hexdigest()}"
+
+    def check_model_version(self):
+        """距上次检查超过 check_seconds 时比对模型文件版本，文件已更新则重新加载模型并清空进程内缓存"""
+        now = time.monotonic()
+        if now - self._checked_at < self.check_seconds:
+            return
+        self._checked_at = now
+        if self.server.loaded and self.server.file_version() != self.server.version:
+            self.server.reload()
+            self.clear()
+            with self._lock:
+                self.stats['invalidations'] += 1
+
+    def predict(self, x_scaled, predict, *inputs):
+        """
+        返回 x_scaled 对应的 (LSTM结果数组, BP结果数组)：命中缓存直接返回，否则调用 predict(*inputs) 计算后写入缓存
+        predict 为 ModelServer.predict_batch 或 MicroBatcher.predict_batch；缓存的数组为只读副本，多个请求共用
+        """
+        self.server.load()
+        self.check_model_version()
+        key = self.key(x_scaled)
+        with self._lock:
+            result = self._entries.get(key)
+            if result is not None:
+                self._entries.move_to_end(key)
+                self.stats['hits'] += 1
+                return result
+
+        shared = self.shared
+        result = shared.get(key) if shared is not None else None
+        if result is not None:
+            self._store(key, result)
+            with self._lock:
+                self.stats['shared_hits'] += 1
+            return result
+
+        t0 = time.perf_counter()
+        result = tuple(self._frozen(output) for output in predict(*inputs))
+        elapsed = time.perf_counter() - t0
+        self._store(key, result)
+        if shared is not None:
+            shared.set(key, result, self.timeout)
+        with self._lock:
+            self.stats['misses'] += 1
+            self.stats['inference_seconds'] += elapsed
+        return result
+
+    def cached(self, predict=None):
+        """
+        包装 predict(LSTM批次, BP批次)（默认 server.predict_batch），按 BP 批次（即展平的特征窗口）查缓存，
+        可直接作为 forecast_grid 的 predict 参数
+        """
+        predict = predict or self.server.predict_batch
+        return lambda lstm_batch, bp_batch: self.predict(bp_batch, predict, lstm_batch, bp_batch)
+
+    @staticmethod
+    def _frozen(output):
+        output = np.array(output, copy=True)
+        output.setflags(write=False)
+        return output
+
+    def _store(self, key, result):
+        with self._lock:
+            self._entries[key] = result
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def summary(self):
+        """命中统计：命中率与按未命中平均推理耗时估算的节省时间（毫秒）"""
+        with self._lock:
+            stats = dict(self.stats)
+            entries = len(self._entries)
+        hits = stats['hits'] + stats['shared_hits']
+        lookups = hits + stats['misses']
+        avg_ms = stats['inference_seconds'] / stats['misses'] * 1000 if stats['misses'] else 0.0
+        return {
+            'hits': stats['hits'],
+            'shared_hits': stats['shared_hits'],
+            'misses': stats['misses'],
+            'hit_rate': round(hits / lookups, 4) if lookups else 0.0,
+            'avg_inference_ms': round(avg_ms, 2),
+            'saved_inference_ms': round(hits * avg_ms, 2),
+            'entries': entries,
+            'max_entries': self.max_entries,
+            'invalidations': stats['invalidations'],
+            'model_version': self.server.version,
+        }
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_prediction_cache():
+    """进程内共享的预测缓存单例"""
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = PredictionCache(
+                    get_model_server(),
+                    max_entries=settings.PREDICTION_CACHE_SIZE,
+                    alias=settings.PREDICTION_CACHE_ALIAS,
+                    timeout=settings.PREDICTION_CACHE_TIMEOUT,
+                    check_seconds=settings.PREDICTION_CACHE_CHECK_SECONDS,
+                )
+    return _cache
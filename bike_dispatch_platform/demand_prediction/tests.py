@@ -1,3 +1,354 @@
-from django.test import TestCase
+import os
+import sys
+import threading
+from datetime import date, timedelta
+from unittest import mock
 
-# Create your tests here.
+import numpy as np
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+
+from .backends import create_backend
+from .batcher import MicroBatcher
+from .forecast import ForecastGrid, forecast_grid, forecast_hours
+from .model_server import ModelServer, get_model_server
+from .models import PredictionResult
+from .materialize import lookup_forecast, materialize_forecasts
+from .numpy_engine import NUMPY_ATOL, load_h5_model
+from .prediction_cache import PredictionCache, get_prediction_cache
+from system_support.models import User
+
+
+class _EchoServer:
+    """假模型服务：LSTM 输出每行第一个元素，BP 输出每行之和，并记录每次批量调用的行数"""
+
+    def __init__(self, fail=False):
+        self.calls = []
+        self.fail = fail
+
+    def predict_batch(self, lstm_batch, bp_batch):
+        self.calls.append(len(lstm_batch))
+        if self.fail:
+            raise RuntimeError("推理失败")
+        return lstm_batch.reshape(len(lstm_batch), -1)[:, :1], bp_batch.sum(axis=1, keepdims=True)
+
+
+class MicroBatcherTests(SimpleTestCase):
+    def run_concurrently(self, batcher, inputs):
+        """每个输入一个线程同时调用 batcher.predict，返回按输入顺序排列的结果"""
+        results = [None] * len(inputs)
+        start = threading.Barrier(len(inputs))
+
+        def call(i):
+            start.wait()
+            results[i] = batcher.predict(*inputs[i], timeout=5)
+
+        threads = [threading.Thread(target=call, args=(i,)) for i in range(len(inputs))]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return results
+
+    def test_concurrent_predictions_are_merged(self):
+        server = _EchoServer()
+        batcher = MicroBatcher(server, max_batch=64, max_wait_ms=200)
+        inputs = [(np.full((1, 24, 11), i, dtype=np.float32), np.full((1, 264), i, dtype=np.float32))
+                  for i in range(16)]
+        results = self.run_concurrently(batcher, inputs)
+
+        self.assertEqual(sum(server.calls), 16)
+        self.assertLess(len(server.calls), 16)  # 至少有请求被合并进同一次前向计算
+        self.assertEqual(batcher.stats, {'batches': len(server.calls), 'requests': 16})
+        # 每个调用方拿回自己那一行
+        for i, (lstm, bp) in enumerate(results):
+            self.assertEqual(lstm, i)
+            self.assertEqual(bp, i * 264)
+
+    def test_multi_row_requests_get_their_own_rows(self):
+        server = _EchoServer()
+        batcher = MicroBatcher(server, max_batch=64, max_wait_ms=200)
+        futures = [batcher.submit(np.arange(rows * 3, dtype=np.float32).reshape(rows, 3, 1) + 100 * rows,
+                                  np.ones((rows, 2), dtype=np.float32) * rows)
+                   for rows in (1, 3, 2)]
+        for rows, future in zip((1, 3, 2), futures):
+            lstm, bp = future.result(timeout=5)
+            np.testing.assert_array_equal(lstm[:, 0], np.arange(rows) * 3 + 100 * rows)
+            np.testing.assert_array_equal(bp[:, 0], np.full(rows, 2 * rows))
+        self.assertEqual(sum(server.calls), 6)
+
+    def test_different_shapes_are_computed_separately(self):
+        server = _EchoServer()
+        batcher = MicroBatcher(server, max_batch=64, max_wait_ms=200)
+        small = batcher.submit(np.ones((1, 4, 1), dtype=np.float32), np.ones((1, 4), dtype=np.float32))
+        large = batcher.submit(np.ones((1, 8, 1), dtype=np.float32), np.ones((1, 8), dtype=np.float32))
+        self.assertEqual(small.result(timeout=5)[1][0, 0], 4)
+        self.assertEqual(large.result(timeout=5)[1][0, 0], 8)
+
+    def test_errors_reach_every_caller(self):
+        batcher = MicroBatcher(_EchoServer(fail=True), max_batch=64, max_wait_ms=50)
+        future = batcher.submit(np.ones((1, 4, 1), dtype=np.float32), np.ones((1, 4), dtype=np.float32))
+        with self.assertRaises(RuntimeError):
+            future.result(timeout=5)
+
+
+class NumpyEngineParityTests(SimpleTestCase):
+    """纯 NumPy 引擎与 Keras 对同一 .h5 的输出一致（归一化空间，误差不超过 NUMPY_ATOL）"""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        import tensorflow as tf
+        cls.tf = tf
+        cls.rng = np.random.default_rng(0)
+
+    def assert_parity(self, path, batch_size=32):
+        keras_model = self.tf.keras.models.load_model(path, compile=False)
+        numpy_model = load_h5_model(path)
+        self.assertEqual(numpy_model.input_shape, tuple(keras_model.input_shape[1:]))
+        x = self.rng.random((batch_size,) + numpy_model.input_shape, dtype=np.float32)
+        np.testing.assert_allclose(numpy_model.predict(x), keras_model(x, training=False).numpy(),
+                                   rtol=0, atol=NUMPY_ATOL)
+        return keras_model, numpy_model
+
+    def test_lstm_matches_keras(self):
+        self.assert_parity(settings.LSTM_MODEL_PATH)
+
+    def test_bp_models_match_keras(self):
+        models_dir = os.path.dirname(settings.BP_MODEL_PATH)
+        for name in ('bike_bp_model_radical.h5', 'bike_bp_model_final.h5', 'bike_bp_model.h5'):
+            with self.subTest(model=name):
+                self.assert_parity(os.path.join(models_dir, name))
+
+    def test_single_row_batch(self):
+        self.assert_parity(settings.LSTM_MODEL_PATH, batch_size=1)
+
+    def test_stepper_continues_the_sequence(self):
+        keras_model, numpy_model = self.assert_parity(settings.LSTM_MODEL_PATH, batch_size=1)
+        steps, features = numpy_model.input_shape
+        sequence = self.rng.random((4, steps + 3, features), dtype=np.float32)
+        stepper = numpy_model.stepper()
+        # encode 与 Keras 对整窗的预测一致；之后每一步等价于从零状态重放更长的序列
+        np.testing.assert_allclose(stepper.encode(sequence[:, :steps]),
+                                   keras_model(sequence[:, :steps], training=False).numpy(),
+                                   rtol=0, atol=NUMPY_ATOL)
+        for t in range(steps, steps + 3):
+            np.testing.assert_allclose(stepper.step(sequence[:, t]), numpy_model.predict(sequence[:, :t + 1]),
+                                       rtol=0, atol=NUMPY_ATOL)
+        self.assertEqual(stepper.cells, len(stepper.recurrent) * (steps + 3))
+
+
+class _VersionedServer(_EchoServer):
+    """带文件版本签名的假模型服务（模型文件更新用 file_version 模拟）"""
+
+    def __init__(self):
+        super().__init__()
+        self.loaded = True
+        self.version = self.files = 'v1'
+        self.reloads = 0
+
+    def load(self):
+        return self
+
+    def file_version(self):
+        return self.files
+
+    def reload(self):
+        self.version = self.files
+        self.reloads += 1
+
+
+class PredictionCacheTests(SimpleTestCase):
+    def setUp(self):
+        self.server = _VersionedServer()
+        self.cache = PredictionCache(self.server, max_entries=2, check_seconds=0)
+        self.lstm_batch = np.arange(2 * 24 * 11, dtype=np.float32).reshape(2, 24, 11) / 1000
+        self.bp_batch = self.lstm_batch.reshape(2, -1)
+
+    def test_hit_returns_the_same_batch_result(self):
+        predict = self.cache.cached()
+        first = predict(self.lstm_batch, self.bp_batch)
+        second = predict(self.lstm_batch.copy(), self.bp_batch.copy())
+        self.assertEqual(self.server.calls, [2])  # 第二次命中，不再前向计算
+        for expected, actual in zip(self.server.predict_batch(self.lstm_batch, self.bp_batch), second):
+            np.testing.assert_array_equal(actual, expected)
+        self.assertIs(first[0], second[0])
+        self.assertFalse(second[0].flags.writeable)  # 缓存的数组只读，调用方无法改写
+        self.assertEqual((self.cache.stats['hits'], self.cache.stats['misses']), (1, 1))
+
+    def test_different_windows_and_lru_eviction(self):
+        predict = self.cache.cached()
+        for offset in (0, 1, 2):
+            predict(self.lstm_batch + offset, self.bp_batch + offset)
+        self.assertEqual(self.cache.summary()['entries'], 2)
+        predict(self.lstm_batch, self.bp_batch)  # 最早的条目已被淘汰
+        self.assertEqual(self.cache.stats['misses'], 4)
+
+    def test_model_update_invalidates(self):
+        predict = self.cache.cached()
+        predict(self.lstm_batch, self.bp_batch)
+        self.server.files = 'v2'
+        predict(self.lstm_batch, self.bp_batch)
+        self.assertEqual(self.server.reloads, 1)
+        self.assertEqual(self.cache.stats['misses'], 2)
+        self.assertEqual(self.cache.summary()['invalidations'], 1)
+
+    def test_wraps_given_predict(self):
+        other = _EchoServer()
+        self.cache.cached(other.predict_batch)(self.lstm_batch, self.bp_batch)
+        self.assertEqual((other.calls, self.server.calls), ([2], []))
+
+
+@override_settings(FORECAST_MATERIALIZE=False, PREDICTION_CACHE=True)
+class DemandPredictCacheTests(TestCase):
+    def setUp(self):
+        self.client.force_login(User.objects.create_user('predictor', password='p'))
+
+    def post(self, temperature='21.5'):
+        return self.client.post(reverse('demand_prediction:demand_predict'), {
+            'region': 'region1', 'time_period': 'morning', 'predict_date': '2024-06-03',
+            'weather': 'sunny', 'temperature': temperature,
+        })
+
+    def test_repeated_prediction_hits_cache(self):
+        before = get_prediction_cache().summary()
+        first, second = self.post(), self.post()
+        after = get_prediction_cache().summary()
+        self.assertIsNone(first.context['error'])
+        self.assertEqual(first.context['result']['demand'], second.context['result']['demand'])
+        self.assertEqual(after['misses'] - before['misses'], 1)
+        self.assertEqual(after['hits'] + after['shared_hits'] - before['hits'] - before['shared_hits'], 1)
+
+        stats = self.client.get(reverse('demand_prediction:prediction_cache_stats')).json()
+        self.assertGreaterEqual(stats['hits'], 1)
+        self.assertGreater(stats['hit_rate'], 0)
+
+
+class MaterializedForecastTests(TestCase):
+    def setUp(self):
+        self.client.force_login(User.objects.create_user('planner', password='p'))
+        self.day = date.today() + timedelta(days=1)
+
+    def post(self, temperature):
+        return self.client.post(reverse('demand_prediction:demand_predict'), {
+            'region': 'region2', 'time_period': 'evening', 'predict_date': self.day.isoformat(),
+            'weather': 'rainy', 'temperature': temperature,
+        })
+
+    def test_hit_matches_live_forecast(self):
+        materialize_forecasts(start_date=self.day, days=1, weathers=['rainy'], temperatures=[18])
+        live = forecast_grid(ForecastGrid(regions=['region2'], periods=['evening'], start_date=self.day, days=1,
+                                          weather='rainy', temperature=18))[0]['demand']
+        with override_settings(FORECAST_MATERIALIZE=True):
+            hit = self.post('18').context['result']
+        with override_settings(FORECAST_MATERIALIZE=False):
+            miss = self.post('18').context['result']
+        self.assertTrue(hit['precomputed'])
+        self.assertFalse(miss['precomputed'])
+        self.assertEqual(hit['demand'], live)
+        self.assertEqual(miss['demand'], live)
+
+    @override_settings(FORECAST_MATERIALIZE=True)
+    def test_non_integer_temperature_falls_back_to_live_forecast(self):
+        result = self.post('18.5').context['result']
+        self.assertFalse(result['precomputed'])
+        self.assertEqual(result['demand'], forecast_grid(ForecastGrid(
+            regions=['region2'], periods=['evening'], start_date=self.day, days=1, weather='rainy', temperature=18.5,
+        ))[0]['demand'])
+
+    @override_settings(FORECAST_MATERIALIZE=True)
+    def test_non_finite_temperature_is_an_input_error(self):
+        for temperature in ('nan', 'inf', '-inf'):
+            with self.subTest(temperature=temperature):
+                response = self.post(temperature)
+                self.assertEqual(response.status_code, 200)
+                self.assertIsNone(response.context['result'])
+                self.assertIn('有限数值', response.context['error'])
+
+    def test_lookup_rejects_non_finite_temperature(self):
+        for temperature in (float('nan'), float('inf'), 18.5):
+            with self.subTest(temperature=temperature):
+                self.assertIsNone(lookup_forecast('region2', 'evening', self.day, 'rainy', temperature))
+
+
+class TFLiteBackendTests(SimpleTestCase):
+    def test_missing_runtime_is_a_configuration_error(self):
+        backend = create_backend('tflite', settings.BP_MODEL_PATH)
+        # 模拟未安装 tflite_runtime（不退回完整 TensorFlow）
+        with mock.patch.dict(sys.modules, {'tflite_runtime': None, 'tflite_runtime.interpreter': None}):
+            with self.assertRaises(ImproperlyConfigured):
+                backend.load()
+
+
+class StatefulForecastTests(SimpleTestCase):
+    """有状态递推与滑动窗口两种 LSTM 模式对比（归一化空间：to_demand_batch 替换为原样返回）"""
+
+    def setUp(self):
+        self.server = get_model_server().load()
+        patcher = mock.patch.object(self.server, 'to_demand_batch',
+                                    side_effect=lambda scaled: np.asarray(scaled, dtype=float).reshape(-1))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def hours(self, mode, days=1, predict=None):
+        grid = ForecastGrid(periods=['morning', 'evening'], start_date=date(2024, 6, 3), days=days)
+        with override_settings(FORECAST_LSTM_MODE=mode):
+            return forecast_hours(grid, self.server, predict)
+
+    def test_first_step_matches_window_mode(self):
+        targets, window_lstm, window_bp = self.hours('window')
+        stateful_targets, stateful_lstm, stateful_bp = self.hours('stateful')
+        self.assertTrue(targets.equals(stateful_targets))
+        np.testing.assert_allclose(stateful_lstm[0], window_lstm[0], rtol=0, atol=NUMPY_ATOL)
+        np.testing.assert_allclose(stateful_bp, window_bp, rtol=0, atol=NUMPY_ATOL)
+
+    def test_multi_step_output_shape(self):
+        targets, lstm, bp = self.hours('stateful', days=3)
+        self.assertEqual(len(targets), 3 * 2 * 2)  # 3 天 × 早、晚高峰 × 每时段 2 小时
+        self.assertEqual(lstm.shape, (len(targets),))
+        self.assertEqual(bp.shape, (len(targets),))
+        self.assertTrue(np.isfinite(lstm).all())
+
+    def test_bp_goes_through_callers_predict(self):
+        predict = mock.Mock(side_effect=self.server.predict_batch)
+        targets, _, bp = self.hours('stateful', predict=predict)
+        predict.assert_called_once()
+        lstm_batch, bp_batch = predict.call_args.args
+        self.assertEqual(len(lstm_batch), len(targets))
+        np.testing.assert_allclose(bp, self.hours('stateful')[2], rtol=0, atol=NUMPY_ATOL)
+
+
+class ForecastBatchTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('planner', password='p')
+        self.client.force_login(self.user)
+
+    def post(self, **params):
+        body = {'regions': ['region1', 'region3'], 'periods': ['morning', 'night'],
+                'start_date': '2024-06-01', 'days': 2, 'weather': 'cloudy', 'temperature': 22, **params}
+        return self.client.post(reverse('demand_prediction:forecast_batch'), body, content_type='application/json')
+
+    def test_grid_is_forecast_and_saved(self):
+        with mock.patch.object(ModelServer, 'predict_batch', autospec=True,
+                               side_effect=ModelServer.predict_batch) as predict_batch:
+            response = self.post()
+        predict_batch.assert_called_once()  # 整个网格每个模型一次前向计算
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertEqual(data['count'], 8)
+        self.assertEqual(len(data['grid']), 8)
+        self.assertEqual({(item['region'], item['time_period'], item['date']) for item in data['grid']},
+                         {(region, period, day) for region in ('region1', 'region3') for period in ('morning', 'night')
+                          for day in ('2024-06-01', '2024-06-02')})
+        self.assertEqual(PredictionResult.objects.filter(user=self.user).count(), 8)
+
+    def test_invalid_parameters_are_rejected(self):
+        for params in ({'regions': ['region9']}, {'periods': ['midnight']}, {'days': 0},
+                       {'days': settings.FORECAST_MAX_DAYS + 1}, {'days': 'two'}, {'start_date': '2024/06/01'}):
+            with self.subTest(params=params):
+                response = self.post(**params)
+                self.assertEqual(response.status_code, 400)
+                self.assertIn('error', response.json())
+        self.assertFalse(PredictionResult.objects.exists())
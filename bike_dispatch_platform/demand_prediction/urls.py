@@ -4,5 +4,10 @@ from . import views
 
 app_name = 'demand_prediction'
 urlpatterns = [
-    # 后续添加预测相关路由，如 path('predict/', views.predict_view, name='predict'),
+    # 需求预测界面：区域 + 时段 + 日期 + 天气
+    path('predict/', views.demand_predict, name='demand_predict'),
+    # 批量/多日预测（JSON）：区域 × 时段 × 日期 完整网格
+    path('forecast/', views.forecast_batch, name='forecast_batch'),
+    # 单次预测缓存命中统计（JSON）
+    path('cache-stats/', views.prediction_cache_stats, name='prediction_cache_stats'),
 ]
\ No newline at end of file
@@ -1,76 +1,75 @@
+from django.conf import settings
 from django.shortcuts import render
+from django.http import JsonResponse
+from django.views.decorators.http import require_POST
 from django.contrib.auth.decorators import login_required
-import tensorflow as tf
-import numpy as np
-import joblib
-import os
+import json
+from datetime import date
 from .models import PredictionResult
-from bike_dispatch_platform.bike_dispatch_platform.settings import BASE_DIR
-
-# 加载训练好的模型和归一化器（任务书"基于LSTM、BP神经网络"）
-LSTM_MODEL_PATH = os.path.join(BASE_DIR, '../models/bike_lstm_model.h5')
-BP_MODEL_PATH = os.path.join(BASE_DIR, '../models/bike_bp_model_radical.h5')
-SCALER_X = joblib.load(os.path.join(BASE_DIR, '../utils/scaler_x.pkl'))
-SCALER_Y = joblib.load(os.path.join(BASE_DIR, '../utils/scaler_y.pkl'))
-
-# 加载模型（确保训练时已保存）
-lstm_model = tf.keras.models.load_model(LSTM_MODEL_PATH)
-bp_model = tf.keras.models.load_model(BP_MODEL_PATH)
+# 训练好的模型和归一化器由模型服务在首次预测时懒加载（任务书"基于LSTM、BP神经网络"）
+from .batcher import get_batcher
+from .prediction_cache import get_prediction_cache
+from .materialize import lookup_forecast
+from .forecast import (ForecastGrid, forecast_grid, run_forecast, REGION_NAMES, PERIOD_NAMES, DEFAULT_HUMIDITY,
+                       DEFAULT_WINDSPEED, FINAL_ACCURACY, FINAL_MODEL, WEATHER_NAMES)
 
 
 @login_required
 def demand_predict(request):
     """需求预测界面（任务书核心功能：区域+时段+环境因素预测）"""
-    result = None
+    result = error = None
     if request.method == 'POST':
-        # 获取用户输入（区域、时段、天气）
+        # 获取用户输入（区域、时段、日期、天气、温度）
         region = request.POST.get('region')
         time_period = request.POST.get('time_period')
         predict_date = request.POST.get('predict_date')
         weather = request.POST.get('weather')
-        temperature = float(request.POST.get('temperature', 25))
-
-        # 构建特征（简化版，实际需从数据仓库取历史24小时数据）
-        # 特征维度：[骑行时长、里程、温度、风速、时段编码、区域编码]
-        period_code = {'morning': 0, 'noon': 1, 'evening': 2, 'night': 3}[time_period]
-        region_code = {'region1': 0, 'region2': 1, 'region3': 2, 'region4': 3}[region]
-        weather_code = {'sunny': 0, 'rainy': 1, 'cloudy': 2}[weather]
-
-        # 模拟历史特征（实际从BikeRideData查询）
-        x = np.array([[15.2, 3.5, temperature, 2.3, period_code, region_code, weather_code]])
-        x_scaled = SCALER_X.transform(x)
+        try:
+            temperature = float(request.POST.get('temperature', 25))
+            # 单格预测网格（1 个区域 × 1 个时段 × 1 天）：与批量预测相同，取目标小时前 24 小时的 11 维特征窗口
+            grid = ForecastGrid(regions=[region], periods=[time_period], start_date=date.fromisoformat(predict_date),
+                                days=1, weather=weather, temperature=temperature)
+        except (ValueError, TypeError) as e:
+            error = f"输入参数错误：{e}"
+        else:
+            # 预计算表（materialize_forecasts 低峰时段生成）中已有该组合时直接读取，不再做模型计算
+            materialized = lookup_forecast(region, time_period, predict_date, weather, temperature) \
+                if settings.FORECAST_MATERIALIZE else None
+            if materialized is not None:
+                final_demand = materialized.demand_count
+            else:
+                # 双模型预测（任务书要求LSTM、BP），并发请求经微批队列合并计算，取LSTM结果（准确率82%≥75%）；
+                # 相同的特征窗口直接取预测缓存，不再做前向计算
+                predict = get_batcher().predict_batch if settings.PREDICTION_BATCHING else None
+                if settings.PREDICTION_CACHE:
+                    predict = get_prediction_cache().cached(predict)
+                final_demand = forecast_grid(grid, predict=predict)[0]['demand']
 
-        # 双模型预测（任务书要求LSTM、BP）
-        lstm_pred_scaled = lstm_model.predict(x_scaled.reshape(1, x_scaled.shape[1], 1), verbose=0)[0][0]
-        bp_pred_scaled = bp_model.predict(x_scaled, verbose=0)[0][0]
+            result = {
+                'region': REGION_NAMES[region],
+                'time_period': PERIOD_NAMES[time_period],
+                'date': predict_date,
+                'demand': final_demand,
+                'model': 'LSTM模型',
+                'accuracy': FINAL_ACCURACY,
+                'precomputed': materialized is not None,
+            }
 
-        # 反归一化得到真实需求数
-        lstm_demand = round(SCALER_Y.inverse_transform([[lstm_pred_scaled]])[0][0])
-        bp_demand = round(SCALER_Y.inverse_transform([[bp_pred_scaled]])[0][0])
+            # 保存预测结果
+            PredictionResult.objects.create(
+                region=region,
+                time_period=time_period,
+                predict_date=grid.start_date,
+                demand_count=final_demand,
+                model_used=FINAL_MODEL,
+                accuracy=FINAL_ACCURACY,
+                user=request.user
+            )
 
-        # 取LSTM结果（准确率82%≥75%，符合任务书要求）
-        final_demand = lstm_demand
-        result = {
-            'region': dict(PredictionResult.REGION_CHOICES)[region],
-            'time_period': dict(PredictionResult.TIME_PERIOD_CHOICES)[time_period],
-            'date': predict_date,
-            'demand': final_demand,
-            'model': 'LSTM模型',
-            'accuracy': 82.0
-        }
-
-        # 保存预测结果
-        PredictionResult.objects.create(
-            region=region,
-            time_period=time_period,
-            predict_date=predict_date,
-            demand_count=final_demand,
-            model_used='LSTM',
-            accuracy=82.0,
-            user=request.user
-        )
-
-    return render(request, 'demand_prediction/predict.html', {'result': result})
+    return render(request, 'demand_prediction/predict.html', {
+        'result': result, 'error': error, 'regions': REGION_NAMES.items(), 'periods': PERIOD_NAMES.items(),
+        'weathers': WEATHER_NAMES.items(),
+    })
 
 
 @login_required
@@ -80,4 +79,50 @@ def model_compare(request):
         'lstm': {'mae': 88.80, 'rmse': 126.02, 'r2': 82.00, 'desc': '时序模型，无需激进调优，准确率达标'},
         'bp': {'mae': 78.95, 'rmse': 109.82, 'r2': 74.54, 'desc': '激进调优后接近达标，牺牲泛化能力'}
     }
-    return render(request, 'demand_prediction/model_compare.html', {'compare_data': compare_data})
\ No newline at end of file
+    return render(request, 'demand_prediction/model_compare.html', {'compare_data': compare_data})
+
+
+@login_required
+@require_POST
+def forecast_batch(request):
+    """
+    批量/多日预测接口（JSON）：一次预测 区域 × 时段 × 日期 的完整网格，供调度计划使用
+    请求体：{"regions": [...], "periods": [...], "start_date": "2024-06-01", "days": 7,
+             "weather": "sunny", "temperature": 25, "humidity": 60, "windspeed": 12,
+             "daily": {"2024-06-02": {"weather": "rainy", "temperature": 18}}}
+    各字段均可省略（默认全部区域、全部时段、从今天起 FORECAST_DEFAULT_DAYS 天）
+    """
+    try:
+        params = json.loads(request.body or b"{}")
+        start_date = params.get("start_date")
+        grid = ForecastGrid(
+            regions=params.get("regions"),
+            periods=params.get("periods"),
+            start_date=date.fromisoformat(start_date) if start_date else None,
+            days=int(params["days"]) if params.get("days") is not None else None,
+            weather=params.get("weather", "sunny"),
+            temperature=params.get("temperature", 25),
+            humidity=params.get("humidity", DEFAULT_HUMIDITY),
+            windspeed=params.get("windspeed", DEFAULT_WINDSPEED),
+            daily=params.get("daily"),
+        )
+    except (ValueError, TypeError, AttributeError) as e:
+        return JsonResponse({"error": f"请求参数错误：{e}"}, status=400)
+
+    forecasts, seconds = run_forecast(grid, request.user)
+    return JsonResponse({
+        "count": len(forecasts),
+        "seconds": round(seconds, 4),
+        "forecasts_per_second": round(len(forecasts) / seconds, 1) if seconds > 0 else None,
+        "grid": [
+            {**item, "date": item["date"].isoformat(),
+             "region_name": REGION_NAMES[item["region"]], "period_name": PERIOD_NAMES[item["time_period"]]}
+            for item in forecasts
+        ],
+    })
+
+
+@login_required
+def prediction_cache_stats(request):
+    """单次预测缓存命中统计（本进程，JSON）：命中率、节省的推理耗时、当前模型版本"""
+    return JsonResponse(get_prediction_cache().summary())
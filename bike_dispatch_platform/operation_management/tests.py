@@ -1,3 +1,35 @@
-from django.test import TestCase
+import json
+import re
+from datetime import date
 
-# Create your tests here.
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from data_process.models import HourlyDemand
+from system_support.models import User
+
+
+@override_settings(CACHES={'charts': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}},
+                   CHART_CACHE_ALIAS='charts')
+class SupplyDemandHeatmapTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('operator', password='p')
+        HourlyDemand.objects.create(region='区域A-地铁站', date=date(2024, 1, 1), hour=8, ride_count=12)
+
+    def test_requires_login(self):
+        response = self.client.get(reverse('operation_management:supply_demand_heatmap'))
+        self.assertEqual(response.status_code, 302)
+
+    def test_renders_rollup_demand(self):
+        self.client.force_login(self.user)
+        response = self.client.get(reverse('operation_management:supply_demand_heatmap'))
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, json.dumps('区域A-地铁站')[1:-1])  # 图表数据以 JSON 转义写入页面
+        self.assertContains(response, '<h2 class="mb-4">供需热力图</h2>', html=True)
+
+    def test_demand_values_are_not_perturbed(self):
+        self.client.force_login(self.user)
+        content = self.client.get(reverse('operation_management:supply_demand_heatmap')).content.decode()
+        # 热力图单元格为 [区域, 小时, 骑行次数]，取值与汇总表一致（缓存的 HTML 中不含随机扰动）
+        cell = re.search(re.escape(json.dumps('区域A-地铁站')) + r',\s*8,\s*(\d+)\s*\]', content)
+        self.assertEqual(int(cell.group(1)), 12)
@@ -2,4 +2,7 @@ from django.urls import path
 from . import views
 
 app_name = 'operation_management'
-urlpatterns = []
\ No newline at end of file
+urlpatterns = [
+    # 供需热力图：区域 × 小时需求（取自小时需求汇总表，图表缓存见 data_process/chart_cache.py）
+    path('heatmap/', views.supply_demand_heatmap, name='supply_demand_heatmap'),
+]
@@ -2,4 +2,11 @@ from django.apps import AppConfig
 
 class SystemSupportConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
-    name = 'system_support'  # 必须与应用目录名、INSTALLED_APPS中的名称完全一致
\ No newline at end of file
+    name = 'system_support'  # 必须与应用目录名、INSTALLED_APPS中的名称完全一致
+
+    def ready(self):
+        # 数据库配置档为 sqlite-wal 时，每个新连接启用 WAL 模式与 busy_timeout
+        from django.db.backends.signals import connection_created
+
+        from .db import configure_sqlite
+        connection_created.connect(configure_sqlite, dispatch_uid='system_support.configure_sqlite')
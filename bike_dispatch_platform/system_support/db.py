@@ -0,0 +1,14 @@
+"""
+数据库连接初始化：SQLite 新建连接时执行 settings.SQLITE_PRAGMAS（WAL 模式、busy_timeout 等）
+journal_mode=WAL 会写入数据库文件，之后所有连接都生效；synchronous、busy_timeout 只对当前连接生效，每个连接都要设置
+"""
+from django.conf import settings
+
+
+def configure_sqlite(sender, connection, **kwargs):
+    """connection_created 信号处理：仅对 SQLite 连接执行 PRAGMA"""
+    if connection.vendor != 'sqlite' or not settings.SQLITE_PRAGMAS:
+        return
+    with connection.cursor() as cursor:
+        for name, value in settings.SQLITE_PRAGMAS.items():
+            cursor.execute(f'PRAGMA {name} = {value}')
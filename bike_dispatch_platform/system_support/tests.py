@@ -1,3 +1,63 @@
-from django.test import TestCase
+import importlib.util
+import os
+import unittest
+from unittest import mock
 
-# Create your tests here.
+from django.core.exceptions import ImproperlyConfigured
+from django.db.utils import load_backend
+from django.test import SimpleTestCase
+
+from bike_dispatch_platform import settings as project_settings
+
+
+def load_settings(**env):
+    """按给定环境变量重新执行一份 settings.py（独立模块，不影响当前进程已加载的配置）"""
+    spec = importlib.util.spec_from_file_location('profile_settings', project_settings.__file__)
+    module = importlib.util.module_from_spec(spec)
+    with mock.patch.dict(os.environ, env):
+        spec.loader.exec_module(module)
+    return module
+
+
+class DatabaseProfileTests(SimpleTestCase):
+    ENGINES = {
+        'sqlite': 'django.db.backends.sqlite3',
+        'sqlite-wal': 'django.db.backends.sqlite3',
+        'postgresql': 'django.db.backends.postgresql',
+    }
+
+    def test_each_profile_resolves(self):
+        self.assertEqual(set(project_settings.DATABASE_PROFILES), set(self.ENGINES))
+        for profile, engine in self.ENGINES.items():
+            with self.subTest(profile=profile):
+                module = load_settings(BIKE_DB_PROFILE=profile)
+                default = module.DATABASES['default']
+                self.assertEqual(module.DATABASE_PROFILE, profile)
+                self.assertEqual(default['ENGINE'], engine)
+                self.assertIs(default, module.DATABASE_PROFILES[profile])
+                self.assertEqual(bool(module.SQLITE_PRAGMAS), profile == 'sqlite-wal')
+
+    def test_default_profile_leaves_journal_mode_alone(self):
+        with mock.patch.dict(os.environ):
+            os.environ.pop('BIKE_DB_PROFILE', None)
+            module = load_settings()
+        self.assertEqual(module.DATABASE_PROFILE, 'sqlite')
+        self.assertEqual(module.SQLITE_PRAGMAS, {})  # WAL 需通过 BIKE_DB_PROFILE=sqlite-wal 显式开启
+
+    def test_postgresql_environment(self):
+        module = load_settings(BIKE_DB_PROFILE='postgresql', BIKE_DB_HOST='db.internal', BIKE_DB_PGBOUNCER='1')
+        default = module.DATABASES['default']
+        self.assertEqual(default['HOST'], 'db.internal')
+        self.assertTrue(default['DISABLE_SERVER_SIDE_CURSORS'])
+
+    def test_unknown_profile(self):
+        with self.assertRaises(ImproperlyConfigured):
+            load_settings(BIKE_DB_PROFILE='mysql')
+
+    def test_sqlite_backend_loads(self):
+        self.assertEqual(load_backend(self.ENGINES['sqlite']).DatabaseWrapper.vendor, 'sqlite')
+
+    @unittest.skipUnless(importlib.util.find_spec('psycopg') or importlib.util.find_spec('psycopg2'),
+                         '未安装 PostgreSQL 驱动（pip install -r requirements.txt）')
+    def test_postgresql_backend_loads(self):
+        self.assertEqual(load_backend(self.ENGINES['postgresql']).DatabaseWrapper.vendor, 'postgresql')
@@ -0,0 +1,131 @@
+# ===================== export_tflite.py（导出轻量推理模型） =====================
+# 把 LSTM / BP 的 .h5 模型转换为 TFLite（CPU 推理默认启用 XNNPACK），
+# 并与 .h5 输出做精度一致性校验。导出结果与 .h5 同名、扩展名为 .tflite，
+# Web 端设置 PREDICTION_BACKEND = 'tflite' 后即可不导入完整 TensorFlow 提供预测服务。
+import argparse
+import logging
+import os
+import sys
+import warnings
+
+import numpy as np
+import tensorflow as tf
+from tensorflow.lite.python.convert_phase import ConverterError
+
+# 屏蔽冗余警告（不影响运行）
+os.environ['TF_CPP_MIN_LOG_LEVEL'] = '3'
+warnings.filterwarnings('ignore')
+tf.compat.v1.logging.set_verbosity(tf.compat.v1.logging.ERROR)
+
+# ===================== 1. 动态路径配置 =====================
+CURRENT_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT_DIR = os.path.dirname(CURRENT_DIR)
+DATA_DIR = os.path.join(ROOT_DIR, "data")
+MODELS_DIR = os.path.join(ROOT_DIR, "models")
+
+# 默认导出 LSTM 模型与 Web 端/训练脚本使用的 BP 模型
+DEFAULT_MODELS = ["bike_lstm_model.h5", "bike_bp_model_radical.h5", "bike_bp_model_final.h5"]
+
+logger = logging.getLogger(__name__)
+
+
+def convert_to_tflite(model, optimizations=None, supported_types=None):
+    """
+    Keras 模型 → TFLite 字节串（只用内置算子，tflite_runtime 可直接运行）
+    优先导出可变批大小的模型；LSTM 在可变批大小下无法融合，退回固定批大小 1
+    （融合为 UNIDIRECTIONAL_SEQUENCE_LSTM，推理端按行调用）
+    """
+    def configure(converter):
+        converter.target_spec.supported_ops = [tf.lite.OpsSet.TFLITE_BUILTINS]
+        if optimizations:
+            converter.optimizations = optimizations
+        if supported_types:
+            converter.target_spec.supported_types = supported_types
+        return converter.convert()
+
+    try:
+        return configure(tf.lite.TFLiteConverter.from_keras_model(model))
+    except ConverterError as exc:
+        # LSTM 的 TensorListReserve 需要静态形状，可变批大小转换失败，改为固定批大小 1 重新转换
+        logger.warning("可变批大小转换失败，改用固定批大小 1 导出：%s", str(exc).splitlines()[0])
+        spec = tf.TensorSpec((1,) + tuple(model.input_shape[1:]), tf.float32)
+        concrete_fn = tf.function(lambda x: model(x, training=False)).get_concrete_function(spec)
+        return configure(tf.lite.TFLiteConverter.from_concrete_functions([concrete_fn], model))
+
+
+def tflite_runner(tflite_bytes, batch_size=256):
+    """创建一次 TFLite 解释器，返回可重复调用的分批预测函数"""
+    interpreter = tf.lite.Interpreter(model_content=tflite_bytes)
+    input_detail = interpreter.get_input_details()[0]
+    output_detail = interpreter.get_output_details()[0]
+    if input_detail["shape_signature"][0] != -1:
+        batch_size = int(input_detail["shape"][0])  # 固定批大小的模型（LSTM）
+    allocated = [None]
+
+    def predict(x):
+        outputs = []
+        for i in range(0, len(x), batch_size):
+            batch = x[i:i + batch_size].astype(np.float32)
+            if allocated[0] != batch.shape:
+                interpreter.resize_tensor_input(input_detail["index"], batch.shape)
+                interpreter.allocate_tensors()
+                allocated[0] = batch.shape
+            interpreter.reset_all_variables()  # 融合 LSTM 的隐藏/细胞状态是变量张量，每个样本前清零
+            interpreter.set_tensor(input_detail["index"], batch)
+            interpreter.invoke()
+            outputs.append(interpreter.get_tensor(output_detail["index"]).copy())
+        return np.concatenate(outputs)
+
+    return predict
+
+
+def tflite_predict(tflite_bytes, x, batch_size=256):
+    """用 TFLite 解释器分批预测（用于精度校验）"""
+    return tflite_runner(tflite_bytes, batch_size)(x)
+
+
+def parity_inputs(model, samples=512):
+    """精度校验输入：优先取特征仓库中的验证集窗口，缺失或形状不符时用 [0,1] 随机数"""
+    input_shape = tuple(model.input_shape[1:])
+    try:
+        sys.path.insert(0, ROOT_DIR)
+        from utils.feature_store import load_windows
+        _, val_set = load_windows(DATA_DIR)
+        x, _ = val_set.take(np.arange(min(samples, len(val_set))), flatten=len(input_shape) == 1)
+        if x.shape[1:] == input_shape:
+            return x
+    except (FileNotFoundError, ValueError):
+        pass
+    return np.random.default_rng(0).random((samples,) + input_shape, dtype=np.float32)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="导出 TFLite 模型并校验精度")
+    parser.add_argument("models", nargs="*", default=DEFAULT_MODELS, help="models/ 下的 .h5 文件名")
+    parser.add_argument("--atol", type=float, default=1e-4, help="归一化空间允许的最大绝对误差")
+    args = parser.parse_args()
+
+    # ===================== 2. 转换与校验 =====================
+    print(f"{'模型':<28} {'h5大小(KB)':>12} {'tflite大小(KB)':>15} {'最大误差':>12} {'是否通过'}")
+    failed = False
+    for name in args.models:
+        h5_path = os.path.join(MODELS_DIR, name)
+        tflite_path = os.path.splitext(h5_path)[0] + ".tflite"
+        model = tf.keras.models.load_model(h5_path)
+        tflite_bytes = convert_to_tflite(model)
+
+        x = parity_inputs(model)
+        expected = model.predict(x, verbose=0)
+        actual = tflite_predict(tflite_bytes, x)
+        max_err = float(np.max(np.abs(expected - actual)))
+        passed = max_err <= args.atol
+        failed |= not passed
+
+        # 只有通过校验才写出文件，避免 Web 端加载精度不达标的模型
+        if passed:
+            with open(tflite_path, "wb") as f:
+                f.write(tflite_bytes)
+        print(f"{name:<28} {os.path.getsize(h5_path) / 1024:>12.1f} {len(tflite_bytes) / 1024:>15.1f} "
+              f"{max_err:>12.2e} {'是' if passed else '否'}")
+
+    sys.exit(1 if failed else 0)
@@ -0,0 +1,127 @@
+# ===================== quantize.py（训练后量化对比） =====================
+# 对 LSTM 与 BP 模型做训练后量化（float16、动态范围 int8），在验证集上按 train_bp.py 的方式
+# （scaler_y 反归一化后）计算 MAE/RMSE/R²，并统计单样本延迟与模型大小，输出对比表，
+# 用于挑选精度仍在预算内的量化版本。
+import argparse
+import os
+import sys
+import time
+import warnings
+
+import joblib
+import numpy as np
+import tensorflow as tf
+from sklearn.metrics import mean_absolute_error, mean_squared_error, r2_score
+
+from export_tflite import convert_to_tflite, tflite_runner
+
+# 屏蔽冗余警告（不影响运行）
+os.environ['TF_CPP_MIN_LOG_LEVEL'] = '3'
+warnings.filterwarnings('ignore')
+tf.compat.v1.logging.set_verbosity(tf.compat.v1.logging.ERROR)
+
+# ===================== 1. 动态路径配置 =====================
+CURRENT_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT_DIR = os.path.dirname(CURRENT_DIR)
+DATA_DIR = os.path.join(ROOT_DIR, "data")
+UTILS_DIR = os.path.join(ROOT_DIR, "utils")
+MODELS_DIR = os.path.join(ROOT_DIR, "models")
+RESULTS_DIR = os.path.join(ROOT_DIR, "results")
+
+sys.path.insert(0, ROOT_DIR)
+from utils.feature_store import load_windows
+
+DEFAULT_MODELS = ["bike_lstm_model.h5", "bike_bp_model.h5", "bike_bp_model_final.h5", "bike_bp_model_radical.h5"]
+
+# 量化方案：名称 → (optimizations, supported_types)
+QUANT_SCHEMES = {
+    "float32": (None, None),
+    "float16": ([tf.lite.Optimize.DEFAULT], [tf.float16]),
+    "int8": ([tf.lite.Optimize.DEFAULT], None),  # 动态范围量化：权重 int8，激活保持浮点
+}
+# 含 LSTM 的模型跳过的方案：TF 2.15 转换融合 LSTM 的 float16 权重时内存持续增长直至进程被杀
+RECURRENT_SKIP_SCHEMES = {"float16"}
+
+
+def evaluate(y_pred_scaled, y_val, scaler_y):
+    """与 train_bp.py 一致：反归一化后计算 MAE / RMSE / R²"""
+    y_pred = scaler_y.inverse_transform(np.asarray(y_pred_scaled).reshape(-1, 1))
+    y_true = scaler_y.inverse_transform(y_val.reshape(-1, 1))
+    return (mean_absolute_error(y_true, y_pred),
+            np.sqrt(mean_squared_error(y_true, y_pred)),
+            r2_score(y_true, y_pred))
+
+
+def single_sample_latency_ms(predict, sample, runs=200):
+    predict(sample)  # 预热
+    t0 = time.perf_counter()
+    for _ in range(runs):
+        predict(sample)
+    return (time.perf_counter() - t0) / runs * 1000
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="训练后量化精度/速度对比")
+    parser.add_argument("models", nargs="*", default=DEFAULT_MODELS, help="models/ 下的 .h5 文件名")
+    parser.add_argument("--mae-budget", type=float, default=2.0, help="相对 .h5 允许的 MAE 增量（辆）")
+    parser.add_argument("--save", action="store_true", help="把达标的量化模型保存为 <模型名>_<方案>.tflite")
+    args = parser.parse_args()
+
+    # ===================== 2. 加载验证集与归一化器 =====================
+    _, val_set = load_windows(DATA_DIR)
+    all_indices = np.arange(len(val_set))
+    scaler_y = joblib.load(os.path.join(UTILS_DIR, "scaler_y.pkl"))
+    y_val = val_set.targets
+
+    # ===================== 3. 逐模型、逐方案评估 =====================
+    rows = []
+    for name in args.models:
+        h5_path = os.path.join(MODELS_DIR, name)
+        if not os.path.exists(h5_path):
+            print(f"跳过不存在的模型：{name}")
+            continue
+        model = tf.keras.models.load_model(h5_path)
+        flatten = len(model.input_shape) == 2  # BP 输入为展平后的窗口
+        recurrent = any(isinstance(layer, tf.keras.layers.LSTM) for layer in model.layers)
+        x_val, _ = val_set.take(all_indices, flatten=flatten)
+        sample = x_val[:1]
+
+        base_pred = model.predict(x_val, verbose=0)
+        base_mae, base_rmse, base_r2 = evaluate(base_pred, y_val, scaler_y)
+        keras_fn = tf.function(lambda x: model(x, training=False))
+        base_latency = single_sample_latency_ms(lambda x: keras_fn(x).numpy(), sample)
+        rows.append((name, "keras(.h5)", os.path.getsize(h5_path) / 1024, base_mae, base_rmse, base_r2,
+                     base_latency, True))
+
+        for scheme, (optimizations, supported_types) in QUANT_SCHEMES.items():
+            if recurrent and scheme in RECURRENT_SKIP_SCHEMES:
+                print(f"跳过 {name} 的 {scheme} 方案（LSTM 暂不支持）")
+                continue
+            tflite_bytes = convert_to_tflite(model, optimizations, supported_types)
+            runner = tflite_runner(tflite_bytes)
+            mae, rmse, r2 = evaluate(runner(x_val), y_val, scaler_y)
+            latency = single_sample_latency_ms(tflite_runner(tflite_bytes), sample)
+            within_budget = mae - base_mae <= args.mae_budget
+            rows.append((name, f"tflite-{scheme}", len(tflite_bytes) / 1024, mae, rmse, r2, latency, within_budget))
+            if args.save and within_budget and scheme != "float32":
+                with open(os.path.join(MODELS_DIR, f"{os.path.splitext(name)[0]}_{scheme}.tflite"), "wb") as f:
+                    f.write(tflite_bytes)
+
+    # ===================== 4. 输出对比表 =====================
+    header = f"{'模型':<26} {'方案':<16} {'大小(KB)':>10} {'MAE(辆)':>9} {'RMSE(辆)':>9} {'R²':>8} {'延迟(ms)':>9} {'精度达标'}"
+    print("\n" + "=" * 100)
+    print("训练后量化对比表（延迟为单样本 CPU 推理）")
+    print("=" * 100)
+    print(header)
+    print("-" * 100)
+    for name, scheme, size_kb, mae, rmse, r2, latency, ok in rows:
+        print(f"{name:<26} {scheme:<16} {size_kb:>10.1f} {mae:>9.2f} {rmse:>9.2f} {r2:>8.2%} {latency:>9.3f} {'是' if ok else '否'}")
+    print("=" * 100)
+
+    os.makedirs(RESULTS_DIR, exist_ok=True)
+    report_path = os.path.join(RESULTS_DIR, "quantization_report.csv")
+    with open(report_path, "w", encoding="utf-8-sig") as f:
+        f.write("model,scheme,size_kb,mae,rmse,r2,latency_ms,within_budget\n")
+        for row in rows:
+            f.write(",".join(str(v) for v in row) + "\n")
+    print(f"对比表已保存：{report_path}")
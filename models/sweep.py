@@ -0,0 +1,305 @@
+# ===================== sweep.py（BP / LSTM 超参数并行搜索） =====================
+# 取代手动修改 train_bp.py 中“最终微调”常量、逐个脚本运行的方式：
+# 按搜索空间采样若干组超参数，在进程池中并行训练（每个进程限制 TF 线程数，进程数 × 线程数 = CPU 核数），
+# 各进程以内存映射方式读取同一份特征仓库（操作系统页缓存共享，不复制训练数据），
+# 每轮结束后与其他试验同一轮的验证损失中位数比较，明显更差的试验提前停止（中位数剪枝），
+# 最后按 train_bp.py 的方式（scaler_y 反归一化后）计算 MAE/RMSE/R²，输出排行榜。
+# 用法：python models/sweep.py bp --trials 24 --workers 8 --threads 2 [--space space.json] [--save-best]
+import argparse
+import json
+import multiprocessing
+import os
+import shutil
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+
+# ===================== 1. 动态路径配置 =====================
+CURRENT_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT_DIR = os.path.dirname(CURRENT_DIR)
+DATA_DIR = os.path.join(ROOT_DIR, "data")
+UTILS_DIR = os.path.join(ROOT_DIR, "utils")
+MODELS_DIR = os.path.join(ROOT_DIR, "models")
+RESULTS_DIR = os.path.join(ROOT_DIR, "results")
+
+# ===================== 2. 默认搜索空间 =====================
+# 列表：从中随机选一个；{"low", "high", "log"}：区间内（对数）均匀采样；其他值：固定
+# BP 以 train_bp.py 最终微调值（L2 0.00005、Dropout 0.05、学习率 0.0003、早停耐心 10）为中心
+SEARCH_SPACES = {
+    "bp": {
+        "units": [256, 512, 1024],
+        "l2": [0.0, 0.00001, 0.00005, 0.0001],
+        "dropout": [0.0, 0.05, 0.1, 0.2],
+        "lr": {"low": 0.0001, "high": 0.001, "log": True},
+        "batch_size": [32, 64],
+        "patience": 10,
+    },
+    "lstm": {
+        "units": [32, 64, 96],
+        "dropout": [0.1, 0.2, 0.3],
+        "lr": {"low": 0.0003, "high": 0.003, "log": True},
+        "batch_size": [32, 64],
+        "patience": 3,
+    },
+}
+
+
+def sample_params(space, rng):
+    """按搜索空间采样一组超参数"""
+    params = {}
+    for name, spec in space.items():
+        if isinstance(spec, list):
+            params[name] = spec[rng.integers(len(spec))]
+        elif isinstance(spec, dict):
+            low, high = spec["low"], spec["high"]
+            if spec.get("log"):
+                params[name] = float(np.exp(rng.uniform(np.log(low), np.log(high))))
+            else:
+                params[name] = float(rng.uniform(low, high))
+        else:
+            params[name] = spec
+    return params
+
+
+# ===================== 3. 模型结构（与 train_bp.py / train_lstm.py 一致，超参数可调） =====================
+def build_bp(tf, input_dim, params):
+    from keras.regularizers import l2
+
+    units, reg, dropout = params["units"], params["l2"], params["dropout"]
+    return tf.keras.Sequential([
+        tf.keras.layers.Dense(units, activation="relu", input_shape=(input_dim,), kernel_regularizer=l2(reg)),
+        tf.keras.layers.BatchNormalization(),
+        tf.keras.layers.Dropout(dropout),
+        tf.keras.layers.Dense(units // 2, activation="relu", kernel_regularizer=l2(reg)),
+        tf.keras.layers.BatchNormalization(),
+        tf.keras.layers.Dropout(dropout),
+        tf.keras.layers.Dense(128, activation="relu"),
+        tf.keras.layers.BatchNormalization(),
+        tf.keras.layers.Dense(64, activation="relu"),
+        tf.keras.layers.Dense(32, activation="relu"),
+        tf.keras.layers.Dense(1)
+    ])
+
+
+def build_lstm(tf, input_shape, params):
+    units, dropout = params["units"], params["dropout"]
+    return tf.keras.Sequential([
+        tf.keras.layers.LSTM(units, return_sequences=True, input_shape=input_shape),
+        tf.keras.layers.Dropout(dropout),
+        tf.keras.layers.LSTM(units // 2, return_sequences=False),
+        tf.keras.layers.Dropout(dropout),
+        tf.keras.layers.Dense(16, activation="relu"),
+        tf.keras.layers.Dense(1)
+    ])
+
+
+# ===================== 4. 工作进程 =====================
+# 每个工作进程初始化一次：限制 TF 线程数、内存映射打开特征仓库、加载归一化器
+_worker = {}
+
+
+def init_worker(kind, data_dir, threads, history, lock, prune_after, min_peers):
+    os.environ["TF_CPP_MIN_LOG_LEVEL"] = "3"
+    os.environ["OMP_NUM_THREADS"] = str(threads)
+    import warnings
+    warnings.filterwarnings("ignore")
+    # TensorFlow 在工作进程中才导入：线程数必须在 TF 运行时初始化之前设置
+    import tensorflow as tf
+    import joblib
+
+    tf.config.threading.set_intra_op_parallelism_threads(threads)
+    tf.config.threading.set_inter_op_parallelism_threads(threads)
+    tf.get_logger().setLevel("ERROR")
+
+    sys.path.insert(0, ROOT_DIR)
+    from utils.feature_store import load_windows
+
+    train_set, val_set = load_windows(data_dir)
+    _worker.update(
+        tf=tf, kind=kind, threads=threads, train_set=train_set, val_set=val_set,
+        scaler_y=joblib.load(os.path.join(UTILS_DIR, "scaler_y.pkl")),
+        history=history, lock=lock, prune_after=prune_after, min_peers=min_peers,
+    )
+
+
+def _datasets(batch_size, flatten):
+    """按试验的批大小构造 tf.data 管道（窗口仍是内存映射视图），tf.data 线程池同样限制为 threads"""
+    tf = _worker["tf"]
+    from utils.input_pipeline import make_dataset
+
+    options = tf.data.Options()
+    options.threading.private_threadpool_size = _worker["threads"]
+    options.threading.max_intra_op_parallelism = 1
+    train_ds = make_dataset(_worker["train_set"], batch_size, shuffle=True, flatten=flatten)
+    val_ds = make_dataset(_worker["val_set"], batch_size, flatten=flatten)
+    return train_ds.with_options(options), val_ds.with_options(options)
+
+
+def _median_pruner(tf):
+    """
+    中位数剪枝：每轮结束后把验证损失记入共享的 {轮次: [验证损失, ...]}，
+    从第 prune_after 轮起，若已有至少 min_peers 个其他试验到达同一轮、且本试验差于它们的中位数，则停止训练
+    """
+    history, lock = _worker["history"], _worker["lock"]
+    prune_after, min_peers = _worker["prune_after"], _worker["min_peers"]
+
+    class MedianPruner(tf.keras.callbacks.Callback):
+        pruned_at = None
+
+        def on_epoch_end(self, epoch, logs=None):
+            val_loss = float(logs["val_loss"])
+            with lock:
+                peers = history.get(epoch, [])
+                history[epoch] = peers + [val_loss]
+            if epoch + 1 >= prune_after and len(peers) >= min_peers and val_loss > float(np.median(peers)):
+                self.pruned_at = epoch + 1
+                self.model.stop_training = True
+
+    return MedianPruner()
+
+
+def run_trial(trial_id, params, epochs, save_dir=None):
+    """训练并评估一组超参数，返回排行榜的一行"""
+    tf = _worker["tf"]
+    from quantize import evaluate  # 与 train_bp.py 一致：反归一化后计算 MAE / RMSE / R²
+
+    tf.keras.utils.set_random_seed(trial_id)
+    train_set, val_set = _worker["train_set"], _worker["val_set"]
+    flatten = _worker["kind"] == "bp"
+    train_ds, val_ds = _datasets(params["batch_size"], flatten)
+    if flatten:
+        model = build_bp(tf, train_set.input_shape[0] * train_set.input_shape[1], params)
+    else:
+        model = build_lstm(tf, train_set.input_shape, params)
+    model.compile(optimizer=tf.keras.optimizers.Adam(learning_rate=params["lr"]), loss="mean_squared_error")
+
+    pruner = _median_pruner(tf)
+    callbacks = [
+        tf.keras.callbacks.EarlyStopping(monitor="val_loss", patience=params["patience"],
+                                         restore_best_weights=True, min_delta=0.00001),
+        tf.keras.callbacks.ReduceLROnPlateau(monitor="val_loss", factor=0.7, patience=3, min_lr=1e-5, verbose=0),
+        pruner,
+    ]
+    t0 = time.perf_counter()
+    history = model.fit(train_ds, epochs=epochs, validation_data=val_ds, callbacks=callbacks, verbose=0)
+    train_seconds = time.perf_counter() - t0
+
+    mae, rmse, r2 = evaluate(model.predict(val_ds, verbose=0), val_set.targets, _worker["scaler_y"])
+    model_path = None
+    if save_dir and pruner.pruned_at is None:
+        model_path = os.path.join(save_dir, f"trial_{trial_id}.h5")
+        model.save(model_path)
+    return {
+        "trial": trial_id, "mae": mae, "rmse": rmse, "r2": r2, "train_seconds": train_seconds,
+        "epochs": len(history.history["loss"]), "pruned_at": pruner.pruned_at, "params": params,
+        "pid": os.getpid(), "model_path": model_path,
+    }
+
+
+# ===================== 5. 调度与排行榜 =====================
+def failed_trial(trial_id, params, error):
+    """试验异常（如内存不足、工作进程崩溃）时的排行榜记录：指标记为 inf/nan，排在最后"""
+    return {
+        "trial": trial_id, "mae": float("inf"), "rmse": float("inf"), "r2": float("nan"), "train_seconds": 0.0,
+        "epochs": 0, "pruned_at": None, "params": params, "pid": None, "model_path": None,
+        "error": f"{type(error).__name__}: {error}",
+    }
+
+
+def write_leaderboard(rows, path):
+    with open(path, "w", encoding="utf-8-sig") as f:
+        f.write("rank,trial,mae,rmse,r2,train_seconds,epochs,pruned_at,params,error\n")
+        for rank, row in enumerate(rows, 1):
+            params = json.dumps(row["params"], ensure_ascii=False).replace('"', '""')
+            error = (row.get("error") or "").replace('"', '""')
+            f.write(f"{rank},{row['trial']},{row['mae']:.4f},{row['rmse']:.4f},{row['r2']:.6f},"
+                    f"{row['train_seconds']:.2f},{row['epochs']},{row['pruned_at'] or ''},\"{params}\",\"{error}\"\n")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="BP / LSTM 超参数并行搜索")
+    parser.add_argument("model", choices=sorted(SEARCH_SPACES), help="搜索的模型类型")
+    parser.add_argument("--space", help="搜索空间 JSON 文件（格式同 SEARCH_SPACES，缺省的参数取默认空间）")
+    parser.add_argument("--trials", type=int, default=16, help="试验组数")
+    parser.add_argument("--threads", type=int, default=1, help="每个工作进程的 TF 线程数")
+    parser.add_argument("--workers", type=int, help="工作进程数（默认 CPU 核数 // threads）")
+    parser.add_argument("--epochs", type=int, default=50, help="每组最多训练轮数")
+    parser.add_argument("--prune-after", type=int, default=5, help="从第几轮开始中位数剪枝（0 为不剪枝）")
+    parser.add_argument("--min-peers", type=int, default=3, help="剪枝前同一轮至少已有的其他试验数")
+    parser.add_argument("--data-dir", default=DATA_DIR, help="包含 feature_store 的数据目录")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--save-best", action="store_true",
+                        help="把 MAE 最低的未剪枝模型保存为 models/bike_<model>_model_sweep.h5")
+    args = parser.parse_args()
+
+    space = dict(SEARCH_SPACES[args.model])
+    if args.space:
+        with open(args.space, encoding="utf-8") as f:
+            space.update(json.load(f))
+    rng = np.random.default_rng(args.seed)
+    trials = [sample_params(space, rng) for _ in range(args.trials)]
+    workers = args.workers or max((os.cpu_count() or 1) // args.threads, 1)
+    prune_after = args.prune_after or args.epochs + 1
+    save_dir = tempfile.mkdtemp(prefix="sweep_") if args.save_best else None
+
+    print(f"{args.model} 超参数搜索：{args.trials} 组，{workers} 个进程 × {args.threads} 线程，"
+          f"最多 {args.epochs} 轮，第 {args.prune_after} 轮起中位数剪枝")
+    # spawn：TensorFlow 不支持 fork 后继续使用；Manager 保存各轮验证损失，供所有工作进程剪枝时比较
+    context = multiprocessing.get_context("spawn")
+    t0 = time.perf_counter()
+    rows = []
+    with context.Manager() as manager:
+        history, lock = manager.dict(), manager.Lock()
+        with ProcessPoolExecutor(workers, mp_context=context, initializer=init_worker,
+                                 initargs=(args.model, args.data_dir, args.threads, history, lock,
+                                           prune_after, args.min_peers)) as pool:
+            futures = {pool.submit(run_trial, i, params, args.epochs, save_dir): (i, params)
+                       for i, params in enumerate(trials)}
+            for future in as_completed(futures):
+                try:
+                    row = future.result()
+                except Exception as e:  # 单组试验失败不影响其余试验，记为失败行，排行榜照常输出
+                    row = failed_trial(*futures[future], e)
+                    rows.append(row)
+                    print(f"[{len(rows)}/{len(trials)}] 试验 {row['trial']:>3}：失败（{row['error']}）")
+                    continue
+                rows.append(row)
+                status = f"第 {row['pruned_at']} 轮剪枝" if row["pruned_at"] else f"{row['epochs']} 轮"
+                print(f"[{len(rows)}/{len(trials)}] 试验 {row['trial']:>3}（进程 {row['pid']}）：MAE {row['mae']:.2f}，"
+                      f"{status}，{row['train_seconds']:.1f} 秒")
+    elapsed = time.perf_counter() - t0
+
+    # ===================== 6. 输出排行榜 =====================
+    rows.sort(key=lambda row: ("error" in row, row["pruned_at"] is not None, row["mae"]))
+    serial = sum(row["train_seconds"] for row in rows)
+    print("\n" + "=" * 110)
+    print(f"{args.model} 超参数搜索排行榜（总耗时 {elapsed:.1f} 秒，各试验训练时间合计 {serial:.1f} 秒）")
+    print("=" * 110)
+    print(f"{'排名':<4} {'试验':>4} {'MAE(辆)':>9} {'RMSE(辆)':>9} {'R²':>8} {'训练时间(s)':>11} {'轮数':>4} {'剪枝':>4}  超参数")
+    print("-" * 110)
+    for rank, row in enumerate(rows, 1):
+        print(f"{rank:<4} {row['trial']:>4} {row['mae']:>9.2f} {row['rmse']:>9.2f} {row['r2']:>8.2%} "
+              f"{row['train_seconds']:>11.1f} {row['epochs']:>4} {'是' if row['pruned_at'] else '否':>4}  "
+              f"{json.dumps(row['params'], ensure_ascii=False)}{'  失败：' + row['error'] if 'error' in row else ''}")
+    print("=" * 110)
+
+    os.makedirs(RESULTS_DIR, exist_ok=True)
+    report_path = os.path.join(RESULTS_DIR, f"sweep_{args.model}_leaderboard.csv")
+    write_leaderboard(rows, report_path)
+    print(f"排行榜已保存：{report_path}")
+
+    if save_dir:
+        best = next((row for row in rows if row["model_path"]), None)
+        if best:
+            best_path = os.path.join(MODELS_DIR, f"bike_{args.model}_model_sweep.h5")
+            shutil.copy(best["model_path"], best_path)
+            print(f"最佳模型（试验 {best['trial']}）已保存：{best_path}")
+        shutil.rmtree(save_dir, ignore_errors=True)
+
+    failed = sum("error" in row for row in rows)
+    if failed:
+        print(f"{failed} 组试验失败，详见排行榜 error 列")
+    sys.exit(1 if failed else 0)
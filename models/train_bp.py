@@ -4,6 +4,7 @@ import tensorflow as tf
 import matplotlib.pyplot as plt
 import joblib
 import os
+import sys
 from sklearn.metrics import mean_absolute_error, mean_squared_error, r2_score
 import warnings
 from keras.regularizers import l2  # L2正则化
@@ -31,21 +32,24 @@ print(f"utils目录：{UTILS_DIR}")
 print("=" * 50)
 
 # ===================== 2. 加载数据 =====================
+# 通过 tf.data 管道从特征仓库（data/feature_store 下按月分片的 x.npy/y.npy，内存映射打开）流式构造窗口，
+# 不再一次性加载完整的 x_train/x_val
+sys.path.insert(0, ROOT_DIR)
+from utils.input_pipeline import make_train_val_datasets
+
 try:
-    x_train = np.load(os.path.join(DATA_DIR, "x_train.npy"))
-    y_train = np.load(os.path.join(DATA_DIR, "y_train.npy"))
-    x_val = np.load(os.path.join(DATA_DIR, "x_val.npy"))
-    y_val = np.load(os.path.join(DATA_DIR, "y_val.npy"))
+    # BP特有：展平时序数据（在管道内按批次展平，不复制完整数据集）
+    train_ds_bp, val_ds_bp, train_set, val_set = make_train_val_datasets(DATA_DIR, batch_size=32, flatten=True)
     print("数据加载成功！")
-    print(f"LSTM输入形状：训练集{x_train.shape}，验证集{x_val.shape}")
+    print(f"LSTM输入形状：训练集{(len(train_set),) + train_set.input_shape}，"
+          f"验证集{(len(val_set),) + val_set.input_shape}")
 except FileNotFoundError as e:
     print(f"数据文件未找到：{e}")
     exit(1)
 
-# BP特有：展平时序数据
-x_train_bp = x_train.reshape(x_train.shape[0], -1)
-x_val_bp = x_val.reshape(x_val.shape[0], -1)
-print(f"BP输入形状：训练集{x_train_bp.shape}，验证集{x_val_bp.shape}")
+bp_input_dim = train_set.input_shape[0] * train_set.input_shape[1]
+y_val = val_set.targets
+print(f"BP输入形状：训练集{(len(train_set), bp_input_dim)}，验证集{(len(val_set), bp_input_dim)}")
 
 # ===================== 3. 加载归一化器 =====================
 try:
@@ -74,7 +78,7 @@ lr_scheduler = tf.keras.callbacks.ReduceLROnPlateau(
 # ===================== 5. 最终微调：BP模型结构 =====================
 bp_model = tf.keras.Sequential([
     # 最后微调：L2正则化从0.0001→0.00005
-    tf.keras.layers.Dense(512, activation="relu", input_shape=(x_train_bp.shape[1],),
+    tf.keras.layers.Dense(512, activation="relu", input_shape=(bp_input_dim,),
                           kernel_regularizer=l2(0.00005)),
     tf.keras.layers.BatchNormalization(),
     tf.keras.layers.Dropout(0.05),
@@ -102,10 +106,9 @@ bp_model.compile(optimizer=optimizer, loss="mean_squared_error")
 
 print("\n开始训练最终微调后的BP神经网络...")
 bp_history = bp_model.fit(
-    x_train_bp, y_train,
-    batch_size=32,
+    train_ds_bp,
     epochs=50,
-    validation_data=(x_val_bp, y_val),
+    validation_data=val_ds_bp,
     callbacks=[early_stop, lr_scheduler],
     verbose=1
 )
@@ -118,7 +121,7 @@ except Exception as e:
     print(f"模型保存失败：{e}")
 
 # ===================== 8. 模型评估 =====================
-y_pred_bp_scaled = bp_model.predict(x_val_bp, verbose=0)
+y_pred_bp_scaled = bp_model.predict(val_ds_bp, verbose=0)
 y_pred_bp = scaler_y.inverse_transform(y_pred_bp_scaled)
 y_true = scaler_y.inverse_transform(y_val.reshape(-1, 1))
 
@@ -6,6 +6,7 @@ from sklearn.metrics import mean_absolute_error, mean_squared_error
 
 # ===================== 屏蔽冗余警告 =====================
 import os
+import sys
 import warnings
 os.environ['TF_CPP_MIN_LOG_LEVEL'] = '3'
 warnings.filterwarnings('ignore')
@@ -13,14 +14,17 @@ tf.compat.v1.logging.set_verbosity(tf.compat.v1.logging.ERROR)
 
 # ===================== 1. 加载预处理后的时序数据（修复路径！） =====================
 # 路径改为 ./data/（BSDP根目录下的data文件夹）
-x_train = np.load("./data/x_train.npy")
-y_train = np.load("./data/y_train.npy")
-x_val = np.load("./data/x_val.npy")
-y_val = np.load("./data/y_val.npy")
+# 通过 tf.data 管道从特征仓库（data/feature_store 下按月分片的 x.npy/y.npy，内存映射打开）流式构造窗口，
+# 不再加载完整的 x_train/x_val
+sys.path.insert(0, ".")
+from utils.input_pipeline import make_train_val_datasets
+
+train_ds, val_ds, train_set, val_set = make_train_val_datasets("./data", batch_size=32)
+y_val = val_set.targets
 
 # ===================== 2. 搭建LSTM模型 =====================
 model = tf.keras.Sequential([
-    tf.keras.layers.LSTM(64, return_sequences=True, input_shape=(24, 11)),
+    tf.keras.layers.LSTM(64, return_sequences=True, input_shape=train_set.input_shape),
     tf.keras.layers.Dropout(0.2),
     tf.keras.layers.LSTM(32, return_sequences=False),
     tf.keras.layers.Dropout(0.2),
@@ -57,10 +61,9 @@ early_stop = tf.keras.callbacks.EarlyStopping(
     restore_best_weights=True
 )
 history = model.fit(
-    x_train, y_train,
-    batch_size=32,
+    train_ds,
     epochs=20,
-    validation_data=(x_val, y_val),
+    validation_data=val_ds,
     callbacks=[early_stop]
 )
 
@@ -85,7 +88,7 @@ print("训练损失曲线已保存到 results/lstm_training_loss.png")
 
 # ===================== 8. 模型评估与可视化（修复utils路径！） =====================
 scaler_y = joblib.load("./utils/scaler_y.pkl")
-y_pred_scaled = model.predict(x_val)
+y_pred_scaled = model.predict(val_ds)
 y_pred = scaler_y.inverse_transform(y_pred_scaled)
 y_true = scaler_y.inverse_transform(y_val.reshape(-1, 1))
 
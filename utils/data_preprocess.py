@@ -2,49 +2,123 @@ import pandas as pd
 import numpy as np
 from sklearn.preprocessing import MinMaxScaler
 import joblib
+import argparse
+import os
+import sys
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from utils.window_builder import TIME_STEPS, peak_rss_mb
+from utils.feature_store import FeatureStore, write_feature_store, append_feature_store, scaler_version
 
-# 1. 加载数据集
-data = pd.read_csv("../data/train.csv")
-# 2. 处理时间特征（拆分datetime为小时/星期/月份）
-data["datetime"] = pd.to_datetime(data["datetime"])
-data["hour"] = data["datetime"].dt.hour
-data["weekday"] = data["datetime"].dt.weekday
-data["month"] = data["datetime"].dt.month
+TRAIN_CSV = "../data/train.csv"
+STORE_DIR = "../data/feature_store"
+SCALER_X_PATH = "../utils/scaler_x.pkl"
+SCALER_Y_PATH = "../utils/scaler_y.pkl"
 
-# 3. 选择模型输入特征（排除无关字段）
+# 模型输入特征（排除无关字段）
 features = ["season", "holiday", "workingday", "weather",
             "temp", "atemp", "humidity", "windspeed",
             "hour", "weekday", "month"]
 target = "count"
 
-# 4. 归一化（LSTM必需）
-scaler_x = MinMaxScaler(feature_range=(0, 1))
-scaler_y = MinMaxScaler(feature_range=(0, 1))
-x_scaled = scaler_x.fit_transform(data[features])
-y_scaled = scaler_y.fit_transform(data[target].values.reshape(-1, 1))
-
-# 5. 构造时序序列（前24小时预测下1小时）
-TIME_STEPS = 24
-x_seq, y_seq = [], []
-for i in range(len(x_scaled) - TIME_STEPS):
-    x_seq.append(x_scaled[i:i+TIME_STEPS])
-    y_seq.append(y_scaled[i+TIME_STEPS])
-x_seq = np.array(x_seq)
-y_seq = np.array(y_seq)
-
-# 6. 划分训练集/验证集（按时间顺序，避免数据泄露）
-train_size = int(len(x_seq) * 0.8)
-x_train, x_val = x_seq[:train_size], x_seq[train_size:]
-y_train, y_val = y_seq[:train_size], y_seq[train_size:]
-
-# 7. 保存结果（供模型训练使用）
-np.save("../data/x_train.npy", x_train)
-np.save("../data/x_val.npy", x_val)
-np.save("../data/y_train.npy", y_train)
-np.save("../data/y_val.npy", y_val)
-joblib.dump(scaler_x, "../utils/scaler_x.pkl")
-joblib.dump(scaler_y, "../utils/scaler_y.pkl")
-
-print("数据预处理+序列构造完成！")
-print(f"训练集形状：{x_train.shape}（样本数, 时间步, 特征数）")
-print(f"验证集形状：{x_val.shape}")
\ No newline at end of file
+
+def add_time_features(data):
+    """处理时间特征（拆分datetime为小时/星期/月份）"""
+    data["datetime"] = pd.to_datetime(data["datetime"])
+    data["hour"] = data["datetime"].dt.hour
+    data["weekday"] = data["datetime"].dt.weekday
+    data["month"] = data["datetime"].dt.month
+    return data
+
+
+def full_preprocess():
+    """全量预处理：重新拟合归一化器并重写整个特征仓库"""
+    # 1. 加载数据集
+    data = pd.read_csv(TRAIN_CSV)
+    # 2. 处理时间特征
+    data = add_time_features(data)
+
+    # 3. 归一化（LSTM必需）
+    scaler_x = MinMaxScaler(feature_range=(0, 1))
+    scaler_y = MinMaxScaler(feature_range=(0, 1))
+    x_scaled = scaler_x.fit_transform(data[features])
+    y_scaled = scaler_y.fit_transform(data[target].values.reshape(-1, 1))
+
+    # 4. 保存归一化器（供模型训练/预测使用）
+    joblib.dump(scaler_x, SCALER_X_PATH)
+    joblib.dump(scaler_y, SCALER_Y_PATH)
+
+    # 5. 写入按月分片的特征仓库（前24小时预测下1小时）
+    # 不再用循环复制出完整的 x_seq，只保存二维归一化数组，训练时由 window_builder 按批次构造窗口视图
+    # source 记录已读取到的文件字节位置，增量模式从这里继续读
+    source = {"file": os.path.basename(TRAIN_CSV), "columns": list(pd.read_csv(TRAIN_CSV, nrows=0).columns),
+              "offset": os.path.getsize(TRAIN_CSV)}
+    return write_feature_store(
+        data["datetime"].values, x_scaled, y_scaled, features, target,
+        scaler_version(SCALER_X_PATH, SCALER_Y_PATH),
+        store_dir=STORE_DIR, source=source
+    )
+
+
+def incremental_preprocess():
+    """
+    增量预处理：从上次读取的字节位置继续读 train.csv，只处理新追加的行
+    归一化器保持冻结（与已训练模型一致），新数据超出拟合范围时记录漂移，提示择机全量重建
+    """
+    store = FeatureStore(STORE_DIR)
+    manifest = store.manifest
+    source = manifest.get("source")
+    if not source or os.path.getsize(TRAIN_CSV) < source["offset"]:
+        print("特征仓库缺少读取进度或源文件已被重写，改为全量预处理")
+        return full_preprocess()
+    if scaler_version(SCALER_X_PATH, SCALER_Y_PATH) != store.scaler_version:
+        print("归一化器版本与特征仓库不一致，改为全量预处理")
+        return full_preprocess()
+
+    if os.path.getsize(TRAIN_CSV) == source["offset"]:
+        print(f"无新增数据，最后处理时间：{manifest['end']}")
+        return manifest
+
+    # 1. 只读取新追加的部分
+    with open(TRAIN_CSV, "rb") as f:
+        f.seek(source["offset"])
+        new_data = pd.read_csv(f, header=None, names=source["columns"])
+    source = dict(source, offset=os.path.getsize(TRAIN_CSV))
+
+    # 2. 处理时间特征
+    new_data = add_time_features(new_data)
+
+    # 3. 用冻结的归一化器转换，并检查漂移（超出 [0, 1] 的幅度）
+    scaler_x = joblib.load(SCALER_X_PATH)
+    scaler_y = joblib.load(SCALER_Y_PATH)
+    x_scaled = scaler_x.transform(new_data[features])
+    y_scaled = scaler_y.transform(new_data[target].values.reshape(-1, 1))
+    overshoot = np.maximum(np.maximum(-x_scaled, x_scaled - 1).max(axis=0), 0)
+    drift = {name: float(v) for name, v in zip(features, overshoot) if v > 0}
+    y_overshoot = float(max(np.maximum(-y_scaled, y_scaled - 1).max(), 0))
+    if y_overshoot > 0:
+        drift[target] = y_overshoot
+
+    # 4. 只追加新窗口（重写最后一个月分片 + 新月份分片）
+    manifest = append_feature_store(new_data["datetime"].values, x_scaled, y_scaled, STORE_DIR, source, drift)
+    print(f"增量处理新增{len(new_data)}行")
+    if drift:
+        print(f"警告：以下字段超出归一化器拟合范围（超出幅度）：{drift}，建议择机执行全量预处理并重新训练")
+    return manifest
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="共享单车数据预处理")
+    parser.add_argument("--incremental", action="store_true", help="只处理 train.csv 中新追加的行")
+    args = parser.parse_args()
+
+    if args.incremental and os.path.exists(os.path.join(STORE_DIR, "manifest.json")):
+        manifest = incremental_preprocess()
+    else:
+        manifest = full_preprocess()
+    train_set, val_set = FeatureStore(STORE_DIR).windows(window=TIME_STEPS).split(0.8)
+
+    print("数据预处理+序列构造完成！")
+    print(f"特征仓库：{len(manifest['shards'])}个月度分片，{manifest['start']} ~ {manifest['end']}")
+    print(f"训练集形状：{(len(train_set),) + train_set.input_shape}（样本数, 时间步, 特征数）")
+    print(f"验证集形状：{(len(val_set),) + val_set.input_shape}")
+    print(f"峰值RSS：{peak_rss_mb():.1f} MB")
@@ -0,0 +1,212 @@
+# ===================== feature_store.py（按月分片的特征仓库） =====================
+# 取代 data/ 下零散的 .npy 文件：每个月一个分片目录（x.npy / y.npy / ts.npy），
+# manifest.json 记录形状、数据类型、归一化器版本和时间范围。
+# 读取时只对需要的分片做 np.load(mmap_mode="r")，按时间范围训练/回测无需读取全部历史。
+import hashlib
+import json
+import os
+import shutil
+
+import numpy as np
+
+from utils.window_builder import (DATA_DIR, TIME_STEPS, HORIZON, STRIDE, TRAIN_RATIO,
+                                  SlidingWindows, ShardedWindows)
+
+STORE_DIR = os.path.join(DATA_DIR, "feature_store")
+MANIFEST_NAME = "manifest.json"
+STORE_VERSION = 1
+
+
+def scaler_version(*paths):
+    """归一化器版本号：对 pkl 文件内容取 sha1 前12位，归一化器重训后版本号随之变化"""
+    digest = hashlib.sha1()
+    for path in paths:
+        with open(path, "rb") as f:
+            digest.update(f.read())
+    return digest.hexdigest()[:12]
+
+
+def _month_key(ts):
+    return str(np.datetime64(ts, "M"))
+
+
+def _save_shard(store_dir, name, timestamps, x, y, halo):
+    """写入单个分片，返回 manifest 中的分片描述"""
+    shard_dir = os.path.join(store_dir, name)
+    os.makedirs(shard_dir, exist_ok=True)
+    np.save(os.path.join(shard_dir, "x.npy"), x)
+    np.save(os.path.join(shard_dir, "y.npy"), y)
+    np.save(os.path.join(shard_dir, "ts.npy"), timestamps)
+    return {
+        "name": name,
+        "rows": int(len(x)),
+        "halo": int(halo),  # 分片开头借用的上个月行数（保证跨月窗口完整）
+        "x_shape": list(x.shape),
+        "x_dtype": str(x.dtype),
+        "y_shape": list(y.shape),
+        "y_dtype": str(y.dtype),
+        "start": str(timestamps[halo]),
+        "end": str(timestamps[-1]),
+    }
+
+
+def write_feature_store(timestamps, x_scaled, y_scaled, features, target, scaler_ver,
+                        store_dir=STORE_DIR, halo=TIME_STEPS + HORIZON - 1, source=None):
+    """
+    全量写入特征仓库（覆盖旧分片）
+    timestamps：每行对应的时间（datetime64），需按时间升序
+    halo：每个分片额外保存的上月末尾行数，需 ≥ window + horizon - 1
+    source：原始数据文件的读取进度（文件名、列名、已处理字节数），供增量预处理使用
+    """
+    timestamps = np.asarray(timestamps, dtype="datetime64[s]")
+    x_scaled = np.asarray(x_scaled, dtype=np.float32)
+    y_scaled = np.asarray(y_scaled, dtype=np.float32).reshape(len(x_scaled), -1)
+
+    if os.path.isdir(store_dir):
+        shutil.rmtree(store_dir)
+    os.makedirs(store_dir)
+
+    months = timestamps.astype("datetime64[M]")
+    bounds = np.flatnonzero(months[1:] != months[:-1]) + 1
+    starts = np.concatenate([[0], bounds])
+    ends = np.concatenate([bounds, [len(timestamps)]])
+
+    shards = []
+    for s, e in zip(starts, ends):
+        lo = max(s - halo, 0)
+        shards.append(_save_shard(store_dir, _month_key(timestamps[s]), timestamps[lo:e],
+                                  x_scaled[lo:e], y_scaled[lo:e], s - lo))
+
+    manifest = {
+        "version": STORE_VERSION,
+        "features": list(features),
+        "target": target,
+        "halo": int(halo),
+        "scaler_version": scaler_ver,
+        "rows": int(len(x_scaled)),
+        "start": str(timestamps[0]),
+        "end": str(timestamps[-1]),
+        "shards": shards,
+        "source": source,
+        "drift": {},
+    }
+    _write_manifest(store_dir, manifest)
+    return manifest
+
+
+def append_feature_store(timestamps, x_scaled, y_scaled, store_dir=STORE_DIR, source=None, drift=None):
+    """
+    增量追加新行：只重写最后一个分片（新行与其同月时）并为新的月份创建分片，
+    开销只与新增行数（及最后一个月的行数）有关，与历史总量无关
+    返回更新后的 manifest；早于已处理时间的行会被忽略
+    """
+    manifest = FeatureStore(store_dir).manifest
+    halo = manifest["halo"]
+    timestamps = np.asarray(timestamps, dtype="datetime64[s]")
+    keep = timestamps > np.datetime64(manifest["end"])
+    timestamps = timestamps[keep]
+    x_scaled = np.asarray(x_scaled, dtype=np.float32)[keep]
+    y_scaled = np.asarray(y_scaled, dtype=np.float32)
+    y_scaled = (y_scaled[:, None] if y_scaled.ndim == 1 else y_scaled)[keep]
+
+    if len(timestamps):
+        # 最后一个分片（含 halo）与新行拼接后，按月重新切分：同月部分覆盖原分片，其余生成新分片
+        last = manifest["shards"].pop()
+        last_dir = os.path.join(store_dir, last["name"])
+        old_ts, old_x, old_y = (np.load(os.path.join(last_dir, f"{name}.npy")) for name in ("ts", "x", "y"))
+        all_ts = np.concatenate([old_ts, timestamps])
+        all_x = np.concatenate([old_x, x_scaled])
+        all_y = np.concatenate([old_y, y_scaled])
+
+        months = all_ts.astype("datetime64[M]")
+        first = last["halo"]
+        bounds = np.flatnonzero(months[first + 1:] != months[first:-1]) + first + 1
+        starts = np.concatenate([[first], bounds])
+        ends = np.concatenate([bounds, [len(all_ts)]])
+        for s, e in zip(starts, ends):
+            lo = 0 if s == first else max(s - halo, 0)
+            manifest["shards"].append(_save_shard(store_dir, _month_key(all_ts[s]), all_ts[lo:e],
+                                                  all_x[lo:e], all_y[lo:e], s - lo))
+
+        manifest["rows"] += int(len(timestamps))
+        manifest["end"] = str(timestamps[-1])
+
+    if source is not None:
+        manifest["source"] = source
+    drift_log = manifest.setdefault("drift", {})
+    for name, overshoot in (drift or {}).items():
+        drift_log[name] = max(drift_log.get(name, 0.0), overshoot)
+    _write_manifest(store_dir, manifest)
+    return manifest
+
+
+def _write_manifest(store_dir, manifest):
+    # 先写临时文件再替换，读取方不会看到写了一半的 manifest
+    tmp_path = os.path.join(store_dir, MANIFEST_NAME + ".tmp")
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2)
+    os.replace(tmp_path, os.path.join(store_dir, MANIFEST_NAME))
+
+
+class FeatureStore:
+    """特征仓库读取器：只读 manifest，分片在用到时才以内存映射方式打开"""
+
+    def __init__(self, store_dir=STORE_DIR):
+        self.store_dir = store_dir
+        with open(os.path.join(store_dir, MANIFEST_NAME), encoding="utf-8") as f:
+            self.manifest = json.load(f)
+
+    @property
+    def scaler_version(self):
+        return self.manifest["scaler_version"]
+
+    def select_shards(self, start=None, end=None):
+        """返回与 [start, end] 时间范围有交集的分片描述（start/end 可为字符串或 datetime）"""
+        start = np.datetime64(start, "s") if start is not None else None
+        end = np.datetime64(end, "s") if end is not None else None
+        selected = []
+        for shard in self.manifest["shards"]:
+            if start is not None and np.datetime64(shard["end"]) < start:
+                continue
+            if end is not None and np.datetime64(shard["start"]) > end:
+                continue
+            selected.append(shard)
+        return selected
+
+    def load_shard(self, shard):
+        """内存映射打开单个分片，返回 (timestamps, x, y)"""
+        shard_dir = os.path.join(self.store_dir, shard["name"])
+        return tuple(np.load(os.path.join(shard_dir, f"{name}.npy"), mmap_mode="r")
+                     for name in ("ts", "x", "y"))
+
+    def windows(self, start=None, end=None, window=TIME_STEPS, horizon=HORIZON, stride=STRIDE):
+        """
+        构造 [start, end] 范围内的窗口集合（按目标时间筛选）
+        窗口可以使用分片内的 halo 行作为历史输入，因此跨月窗口不会丢失
+        """
+        lookback = window + horizon - 1
+        if lookback > self.manifest["halo"]:
+            raise ValueError(f"窗口长度+预测步长-1({lookback})超过特征仓库的 halo({self.manifest['halo']})，需重新生成")
+        parts = []
+        for shard in self.select_shards(start, end):
+            ts, x, y = self.load_shard(shard)
+            if len(x) < window + horizon:
+                continue
+            sw = SlidingWindows(x, y, window, horizon, stride)
+            # 第 i 个窗口的目标行为 i*stride + lookback；只保留目标行落在本月（及时间范围）内的窗口
+            target_ts = ts[lookback::stride][:sw.stop]
+            lo_ts = np.datetime64(shard["start"])
+            if start is not None:
+                lo_ts = max(lo_ts, np.datetime64(start, "s"))
+            lo = int(np.searchsorted(target_ts, lo_ts, side="left"))
+            hi = sw.stop if end is None else int(np.searchsorted(target_ts, np.datetime64(end, "s"), side="right"))
+            if hi > lo:
+                parts.append(SlidingWindows(x, y, window, horizon, stride, lo, hi))
+        return ShardedWindows(parts)
+
+
+def load_windows(data_dir=DATA_DIR, window=TIME_STEPS, horizon=HORIZON, stride=STRIDE,
+                 train_ratio=TRAIN_RATIO, start=None, end=None):
+    """训练脚本入口：从特征仓库读取 [start, end] 范围，返回 (训练集窗口, 验证集窗口)"""
+    store = FeatureStore(os.path.join(data_dir, "feature_store"))
+    return store.windows(start, end, window, horizon, stride).split(train_ratio)
@@ -0,0 +1,56 @@
+# ===================== input_pipeline.py（tf.data 流式输入管道） =====================
+# 训练数据从特征仓库的内存映射分片按批次读取并现场构造窗口，
+# 配合并行 map + prefetch，训练数据规模不再受内存大小限制。
+import os
+
+import tensorflow as tf
+
+from utils.window_builder import DATA_DIR, TIME_STEPS, HORIZON, STRIDE, TRAIN_RATIO
+from utils.feature_store import load_windows
+
+AUTOTUNE = tf.data.AUTOTUNE
+
+
+def make_dataset(windows, batch_size=32, shuffle=False, flatten=False, cache=None, seed=None):
+    """
+    把 SlidingWindows 转成 tf.data.Dataset，输出 (x批次, y批次)
+    - shuffle：按批次打乱顺序（与 keras Sequence 的打乱粒度一致）
+    - flatten：展平窗口，供BP网络使用
+    - cache：None 不缓存；"" 缓存到内存；文件路径则缓存到磁盘（数据大于内存时使用）
+    """
+    if flatten:
+        x_shape = (None, windows.input_shape[0] * windows.input_shape[1])
+    else:
+        x_shape = (None,) + windows.input_shape
+    y_shape = (None, windows.target_dim)
+
+    def _gather(indices):
+        return windows.take(indices, flatten)
+
+    def _load_batch(indices):
+        x_batch, y_batch = tf.numpy_function(_gather, [indices], (tf.float32, tf.float32))
+        x_batch.set_shape(x_shape)
+        y_batch.set_shape(y_shape)
+        return x_batch, y_batch
+
+    ds = tf.data.Dataset.range(len(windows)).batch(batch_size)
+    ds = ds.map(_load_batch, num_parallel_calls=AUTOTUNE, deterministic=True)
+    if cache is not None:
+        ds = ds.cache(cache)
+    if shuffle:
+        ds = ds.shuffle(windows.num_batches(batch_size), seed=seed, reshuffle_each_iteration=True)
+    return ds.prefetch(AUTOTUNE)
+
+
+def make_train_val_datasets(data_dir=DATA_DIR, batch_size=32, flatten=False, cache=None,
+                            window=TIME_STEPS, horizon=HORIZON, stride=STRIDE, train_ratio=TRAIN_RATIO,
+                            start=None, end=None):
+    """训练脚本入口：返回 (训练集Dataset, 验证集Dataset, 训练集窗口, 验证集窗口)；start/end 限定训练数据时间范围"""
+    train_set, val_set = load_windows(data_dir, window, horizon, stride, train_ratio, start, end)
+    if cache:
+        os.makedirs(cache, exist_ok=True)
+    train_cache = cache if not cache else os.path.join(cache, "train")
+    val_cache = cache if not cache else os.path.join(cache, "val")
+    train_ds = make_dataset(train_set, batch_size, shuffle=True, flatten=flatten, cache=train_cache)
+    val_ds = make_dataset(val_set, batch_size, flatten=flatten, cache=val_cache)
+    return train_ds, val_ds, train_set, val_set
@@ -0,0 +1,121 @@
+# ===================== test_feature_store.py（按月分片特征仓库测试） =====================
+# 运行：python -m pytest utils（项目根目录）
+import os
+import sys
+import tempfile
+import unittest
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from utils.feature_store import FeatureStore, append_feature_store, write_feature_store
+from utils.window_builder import SlidingWindows
+
+WINDOW = 24
+
+
+def hourly_data(start="2024-01-30T00", hours=24 * 35, features=3):
+    """逐小时的测试数据：第 i 行的特征全为 i，便于核对窗口取到的是哪几行"""
+    timestamps = np.datetime64(start, "h") + np.arange(hours)
+    x = np.repeat(np.arange(hours, dtype=np.float32)[:, None], features, axis=1)
+    y = np.arange(hours, dtype=np.float32)[:, None] * 10
+    return timestamps.astype("datetime64[s]"), x, y
+
+
+class FeatureStoreTestCase(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.store_dir = os.path.join(self.tmp.name, "feature_store")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def write(self, timestamps, x, y):
+        return write_feature_store(timestamps, x, y, ["a", "b", "c"], "count", "test", store_dir=self.store_dir)
+
+
+class ShardBoundaryTest(FeatureStoreTestCase):
+    def setUp(self):
+        super().setUp()
+        self.ts, self.x, self.y = hourly_data()  # 1月30日 ~ 3月4日，跨三个月
+        self.manifest = self.write(self.ts, self.x, self.y)
+
+    def test_one_shard_per_month_with_halo(self):
+        shards = self.manifest["shards"]
+        self.assertEqual([s["name"] for s in shards], ["2024-01", "2024-02", "2024-03"])
+        self.assertEqual(shards[0]["halo"], 0)
+        self.assertEqual(shards[1]["halo"], self.manifest["halo"])
+        self.assertEqual(sum(s["rows"] - s["halo"] for s in shards), len(self.x))
+        self.assertEqual(shards[1]["start"], "2024-02-01T00:00:00")
+
+    def test_windows_across_months_match_unsharded(self):
+        whole = SlidingWindows(self.x, self.y, WINDOW)
+        windows = FeatureStore(self.store_dir).windows(window=WINDOW)
+        self.assertEqual(len(windows), len(whole))
+        x_all, y_all = windows.take(np.arange(len(windows)))
+        np.testing.assert_array_equal(x_all, whole.x_windows)
+        np.testing.assert_array_equal(y_all, whole.targets)
+
+    def test_shards_are_memory_mapped(self):
+        store = FeatureStore(self.store_dir)
+        _, x, _ = store.load_shard(store.manifest["shards"][0])
+        self.assertIsInstance(x, np.memmap)
+
+    def test_time_range_selects_targets(self):
+        store = FeatureStore(self.store_dir)
+        start, end = "2024-02-10T00:00:00", "2024-02-12T23:00:00"
+        self.assertEqual([s["name"] for s in store.select_shards(start, end)], ["2024-02"])
+        _, y = store.windows(start, end, window=WINDOW).take(np.arange(72))
+        expected = np.flatnonzero((self.ts >= np.datetime64(start)) & (self.ts <= np.datetime64(end)))
+        np.testing.assert_array_equal(y[:, 0], self.y[expected, 0])
+
+    def test_window_longer_than_halo_rejected(self):
+        with self.assertRaises(ValueError):
+            FeatureStore(self.store_dir).windows(window=self.manifest["halo"] + 1)
+
+
+class AppendTest(FeatureStoreTestCase):
+    def setUp(self):
+        super().setUp()
+        self.ts, self.x, self.y = hourly_data()
+        self.cut = 24 * 20  # 2月19日：追加部分先补完2月，再新建3月分片
+        self.write(self.ts[:self.cut], self.x[:self.cut], self.y[:self.cut])
+
+    def test_append_equals_full_write(self):
+        manifest = append_feature_store(self.ts[self.cut:], self.x[self.cut:], self.y[self.cut:],
+                                        store_dir=self.store_dir)
+        self.assertEqual(manifest["rows"], len(self.x))
+        self.assertEqual(manifest["end"], str(self.ts[-1]))
+        self.assertEqual([s["name"] for s in manifest["shards"]], ["2024-01", "2024-02", "2024-03"])
+
+        appended = FeatureStore(self.store_dir).windows(window=WINDOW)
+        whole = SlidingWindows(self.x, self.y, WINDOW)
+        x_all, y_all = appended.take(np.arange(len(appended)))
+        np.testing.assert_array_equal(x_all, whole.x_windows)
+        np.testing.assert_array_equal(y_all, whole.targets)
+
+    def test_append_leaves_earlier_shards_untouched(self):
+        first = os.path.join(self.store_dir, "2024-01", "x.npy")
+        mtime = os.stat(first).st_mtime_ns
+        append_feature_store(self.ts[self.cut:], self.x[self.cut:], self.y[self.cut:], store_dir=self.store_dir)
+        self.assertEqual(os.stat(first).st_mtime_ns, mtime)
+
+    def test_rows_not_after_end_are_ignored(self):
+        overlap = slice(self.cut - 5, self.cut + 5)
+        manifest = append_feature_store(self.ts[overlap], self.x[overlap], self.y[overlap], store_dir=self.store_dir)
+        self.assertEqual(manifest["rows"], self.cut + 5)
+        _, y = FeatureStore(self.store_dir).windows(window=WINDOW).take([self.cut + 5 - WINDOW - 1])
+        self.assertEqual(y[0, 0], self.y[self.cut + 4, 0])
+
+    def test_drift_keeps_maximum_and_source_updates(self):
+        append_feature_store(self.ts[:0], self.x[:0], self.y[:0], store_dir=self.store_dir,
+                             source={"offset": 1}, drift={"temp": 0.2})
+        manifest = append_feature_store(self.ts[:0], self.x[:0], self.y[:0], store_dir=self.store_dir,
+                                        source={"offset": 2}, drift={"temp": 0.1, "humidity": 0.3})
+        self.assertEqual(manifest["drift"], {"temp": 0.2, "humidity": 0.3})
+        self.assertEqual(manifest["source"], {"offset": 2})
+        self.assertEqual(manifest["rows"], self.cut)
+
+
+if __name__ == "__main__":
+    unittest.main()
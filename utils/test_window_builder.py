@@ -0,0 +1,101 @@
+# ===================== test_window_builder.py（时序窗口构造器测试） =====================
+# 运行：python -m pytest utils（项目根目录）
+import os
+import sys
+import unittest
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from utils.window_builder import SlidingWindows, ShardedWindows, TIME_STEPS
+
+
+def loop_windows(x, y, window=TIME_STEPS):
+    """原 data_preprocess.py 的循环构造方式（对照实现）"""
+    x_seq, y_seq = [], []
+    for i in range(len(x) - window):
+        x_seq.append(x[i:i + window])
+        y_seq.append(y[i + window])
+    return np.array(x_seq), np.array(y_seq)
+
+
+class SlidingWindowsTest(unittest.TestCase):
+    def setUp(self):
+        rng = np.random.default_rng(0)
+        self.x = rng.random((200, 11)).astype(np.float32)
+        self.y = rng.random((200, 1)).astype(np.float32)
+
+    def test_matches_original_loop(self):
+        x_seq, y_seq = loop_windows(self.x, self.y)
+        windows = SlidingWindows(self.x, self.y)
+        np.testing.assert_array_equal(windows.x_windows, x_seq)
+        np.testing.assert_array_equal(windows.targets, y_seq)
+
+    def test_split_matches_original_80_percent(self):
+        x_seq, y_seq = loop_windows(self.x, self.y)
+        train_size = int(len(x_seq) * 0.8)
+        train_set, val_set = SlidingWindows(self.x, self.y).split(0.8)
+        np.testing.assert_array_equal(train_set.x_windows, x_seq[:train_size])
+        np.testing.assert_array_equal(val_set.x_windows, x_seq[train_size:])
+        np.testing.assert_array_equal(val_set.targets, y_seq[train_size:])
+
+    def test_windows_are_views(self):
+        windows = SlidingWindows(self.x, self.y)
+        self.assertTrue(np.shares_memory(windows.x_windows, self.x))
+
+    def test_horizon_and_stride(self):
+        window, horizon, stride = 6, 3, 4
+        windows = SlidingWindows(self.x, self.y, window, horizon, stride)
+        for i in range(len(windows)):
+            np.testing.assert_array_equal(windows.x_windows[i], self.x[i * stride:i * stride + window])
+            np.testing.assert_array_equal(windows.targets[i], self.y[i * stride + window + horizon - 1])
+        # 最后一个窗口的目标行不能越界
+        self.assertLessEqual((len(windows) - 1) * stride + window + horizon - 1, len(self.x) - 1)
+
+    def test_batch_take_and_flatten(self):
+        windows = SlidingWindows(self.x, self.y)
+        x_batch, y_batch = windows.batch(2, 16, flatten=True)
+        self.assertEqual(x_batch.shape, (16, TIME_STEPS * 11))
+        np.testing.assert_array_equal(x_batch[0], self.x[32:32 + TIME_STEPS].reshape(-1))
+        np.testing.assert_array_equal(y_batch[0], self.y[32 + TIME_STEPS])
+        x_take, y_take = windows.take([5, 0])
+        np.testing.assert_array_equal(x_take[0], windows.x_windows[5])
+        np.testing.assert_array_equal(y_take[1], windows.targets[0])
+        # 最后一批不足 batch_size
+        last = windows.num_batches(64) - 1
+        self.assertEqual(len(windows.batch(last, 64)[0]), len(windows) - last * 64)
+
+    def test_too_short_raises(self):
+        with self.assertRaises(ValueError):
+            SlidingWindows(self.x[:TIME_STEPS], self.y[:TIME_STEPS])
+
+
+class ShardedWindowsTest(unittest.TestCase):
+    def setUp(self):
+        rng = np.random.default_rng(1)
+        x = rng.random((120, 4)).astype(np.float32)
+        y = rng.random((120, 1)).astype(np.float32)
+        self.whole = SlidingWindows(x, y, window=8)
+        # 按窗口下标切成三段（同一底层数组）
+        self.sharded = ShardedWindows([SlidingWindows(x, y, 8, start=a, stop=b) for a, b in ((0, 30), (30, 31), (31, None))])
+
+    def test_take_across_parts(self):
+        indices = np.arange(len(self.whole))
+        x_sharded, y_sharded = self.sharded.take(indices)
+        np.testing.assert_array_equal(x_sharded, self.whole.x_windows)
+        np.testing.assert_array_equal(y_sharded, self.whole.targets)
+
+    def test_split_cuts_boundary_part(self):
+        train_set, val_set = self.sharded.split(0.5)
+        self.assertEqual(len(train_set) + len(val_set), len(self.whole))
+        np.testing.assert_array_equal(np.concatenate([train_set.targets, val_set.targets]), self.whole.targets)
+        np.testing.assert_array_equal(train_set.batch(0, len(train_set))[0],
+                                      self.whole.x_windows[:len(train_set)])
+
+    def test_empty_parts_rejected(self):
+        with self.assertRaises(ValueError):
+            ShardedWindows([])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,223 @@
+# ===================== window_builder.py（时序窗口构造器） =====================
+# 用 numpy 的 sliding_window_view 构造零拷贝的滑动窗口视图，
+# 训练时按批次现取现拼，不再一次性生成 (样本数, 24, 11) 的完整 x_seq 张量。
+import os
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+# ===================== 默认参数（与原 data_preprocess.py 保持一致） =====================
+TIME_STEPS = 24   # 窗口长度：前24小时
+HORIZON = 1       # 预测步长：预测第1个未来小时
+STRIDE = 1        # 窗口滑动步长
+TRAIN_RATIO = 0.8
+
+CURRENT_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT_DIR = os.path.dirname(CURRENT_DIR)
+DATA_DIR = os.path.join(ROOT_DIR, "data")
+
+
+def peak_rss_mb():
+    """当前进程峰值常驻内存（MB），Linux/macOS 用 resource，Windows 退化到 psutil，均不可用时返回 None"""
+    try:
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # macOS 单位为字节，Linux 单位为 KB
+        return peak / 1024 / 1024 if sys.platform == "darwin" else peak / 1024
+    except ImportError:
+        pass
+    try:
+        import psutil
+        info = psutil.Process().memory_info()
+        return getattr(info, "peak_wset", info.rss) / 1024 / 1024
+    except ImportError:
+        return None
+
+
+class SlidingWindows:
+    """
+    滑动窗口数据集：x[i*stride : i*stride+window] → y[i*stride+window+horizon-1]
+    x_windows 是原始二维数组上的只读视图（零拷贝），只有调用 batch() 时才复制当前批次
+    """
+
+    def __init__(self, x, y, window=TIME_STEPS, horizon=HORIZON, stride=STRIDE, start=0, stop=None):
+        x = np.asarray(x)
+        y = np.asarray(y).reshape(len(x), -1)
+        if len(x) < window + horizon:
+            raise ValueError(f"数据行数({len(x)})不足以构造窗口（需要≥{window + horizon}行）")
+        self.x = x
+        self.y = y
+        self.window = window
+        self.horizon = horizon
+        self.stride = stride
+
+        # sliding_window_view 输出 (N, 特征数, window)，转置为 (N, window, 特征数)，仍是视图
+        all_windows = sliding_window_view(x[:len(x) - horizon], window, axis=0).transpose(0, 2, 1)
+        self._windows = all_windows[::stride]
+        self._targets = y[window + horizon - 1::stride][:len(self._windows)]
+
+        total = len(self._windows)
+        self.start = start
+        self.stop = total if stop is None else min(stop, total)
+
+    def __len__(self):
+        return self.stop - self.start
+
+    @property
+    def x_windows(self):
+        """全部窗口的零拷贝视图 (样本数, window, 特征数)"""
+        return self._windows[self.start:self.stop]
+
+    @property
+    def targets(self):
+        return self._targets[self.start:self.stop]
+
+    @property
+    def input_shape(self):
+        return self.window, self.x.shape[1]
+
+    @property
+    def target_dim(self):
+        return self.y.shape[1]
+
+    def split(self, train_ratio=TRAIN_RATIO):
+        """按时间顺序划分训练集/验证集（与原脚本一致：按窗口数的前80%划分）"""
+        train_size = int(len(self) * train_ratio)
+        make = lambda a, b: SlidingWindows(self.x, self.y, self.window, self.horizon, self.stride, a, b)
+        return make(self.start, self.start + train_size), make(self.start + train_size, self.stop)
+
+    def batch(self, index, batch_size, flatten=False):
+        """取第 index 个批次，返回连续内存的 (x, y) 副本；flatten=True 时展平供BP网络使用"""
+        lo = self.start + index * batch_size
+        hi = min(lo + batch_size, self.stop)
+        x_batch = np.ascontiguousarray(self._windows[lo:hi])
+        if flatten:
+            x_batch = x_batch.reshape(len(x_batch), -1)
+        return x_batch, np.ascontiguousarray(self._targets[lo:hi])
+
+    def take(self, indices, flatten=False):
+        """按窗口下标（相对本数据集）批量取样，只读取涉及的行（适用于内存映射数组）"""
+        indices = np.asarray(indices) + self.start
+        x_batch = np.take(self._windows, indices, axis=0).astype(np.float32, copy=False)
+        if flatten:
+            x_batch = x_batch.reshape(len(x_batch), -1)
+        return x_batch, np.take(self._targets, indices, axis=0).astype(np.float32, copy=False)
+
+    def num_batches(self, batch_size):
+        return (len(self) + batch_size - 1) // batch_size
+
+    def iter_batches(self, batch_size, flatten=False):
+        for i in range(self.num_batches(batch_size)):
+            yield self.batch(i, batch_size, flatten)
+
+
+class ShardedWindows:
+    """多个 SlidingWindows（如按月分片）首尾相接组成的窗口集合，接口与 SlidingWindows 一致"""
+
+    def __init__(self, parts):
+        self.parts = [p for p in parts if len(p)]
+        if not self.parts:
+            raise ValueError("没有可用的窗口分片")
+        self._offsets = np.cumsum([0] + [len(p) for p in self.parts])
+
+    def __len__(self):
+        return int(self._offsets[-1])
+
+    @property
+    def targets(self):
+        return np.concatenate([p.targets for p in self.parts])
+
+    @property
+    def input_shape(self):
+        return self.parts[0].input_shape
+
+    @property
+    def target_dim(self):
+        return self.parts[0].target_dim
+
+    def split(self, train_ratio=TRAIN_RATIO):
+        """按时间顺序划分，跨越边界的分片被切成两段"""
+        train_size = int(len(self) * train_ratio)
+        train_parts, val_parts = [], []
+        for p, offset in zip(self.parts, self._offsets):
+            cut = min(max(train_size - offset, 0), len(p))
+            if cut:
+                train_parts.append(SlidingWindows(p.x, p.y, p.window, p.horizon, p.stride, p.start, p.start + cut))
+            if cut < len(p):
+                val_parts.append(SlidingWindows(p.x, p.y, p.window, p.horizon, p.stride, p.start + cut, p.stop))
+        return ShardedWindows(train_parts), ShardedWindows(val_parts)
+
+    def take(self, indices, flatten=False):
+        indices = np.asarray(indices)
+        part_ids = np.searchsorted(self._offsets, indices, side="right") - 1
+        x_batch = y_batch = None
+        for pid in np.unique(part_ids):
+            mask = part_ids == pid
+            x_part, y_part = self.parts[pid].take(indices[mask] - self._offsets[pid], flatten)
+            if x_batch is None:
+                x_batch = np.empty((len(indices),) + x_part.shape[1:], dtype=np.float32)
+                y_batch = np.empty((len(indices),) + y_part.shape[1:], dtype=np.float32)
+            x_batch[mask], y_batch[mask] = x_part, y_part
+        return x_batch, y_batch
+
+    def batch(self, index, batch_size, flatten=False):
+        lo = index * batch_size
+        return self.take(np.arange(lo, min(lo + batch_size, len(self))), flatten)
+
+    def num_batches(self, batch_size):
+        return (len(self) + batch_size - 1) // batch_size
+
+    def iter_batches(self, batch_size, flatten=False):
+        for i in range(self.num_batches(batch_size)):
+            yield self.batch(i, batch_size, flatten)
+
+
+# ===================== 基准测试：原循环构造 vs 零拷贝视图 =====================
+if __name__ == "__main__":
+    import pandas as pd
+    from sklearn.preprocessing import MinMaxScaler
+
+    features = ["season", "holiday", "workingday", "weather",
+                "temp", "atemp", "humidity", "windspeed",
+                "hour", "weekday", "month"]
+    data = pd.read_csv(os.path.join(DATA_DIR, "train.csv"), parse_dates=["datetime"])
+    data["hour"] = data["datetime"].dt.hour
+    data["weekday"] = data["datetime"].dt.weekday
+    data["month"] = data["datetime"].dt.month
+    x_scaled = MinMaxScaler().fit_transform(data[features])
+    y_scaled = MinMaxScaler().fit_transform(data[["count"]])
+    print(f"峰值RSS（构造窗口前）：{peak_rss_mb():.1f} MB")
+
+    # 1. 零拷贝视图（先测，避免被原方案抬高的RSS掩盖）
+    tracemalloc.start()
+    t0 = time.perf_counter()
+    train_set, val_set = SlidingWindows(x_scaled, y_scaled).split()
+    checksum = sum(float(xb.sum()) for xb, _ in train_set.iter_batches(256))
+    view_time = time.perf_counter() - t0
+    view_peak = tracemalloc.get_traced_memory()[1] / 1024 / 1024
+    tracemalloc.stop()
+    print(f"零拷贝视图：训练集{(len(train_set),) + train_set.input_shape}，"
+          f"耗时{view_time:.3f}s，numpy峰值分配{view_peak:.2f} MB，峰值RSS {peak_rss_mb():.1f} MB")
+
+    # 2. 原 data_preprocess.py 的循环构造
+    tracemalloc.start()
+    t0 = time.perf_counter()
+    x_seq, y_seq = [], []
+    for i in range(len(x_scaled) - TIME_STEPS):
+        x_seq.append(x_scaled[i:i + TIME_STEPS])
+        y_seq.append(y_scaled[i + TIME_STEPS])
+    x_seq = np.array(x_seq)
+    y_seq = np.array(y_seq)
+    loop_time = time.perf_counter() - t0
+    loop_peak = tracemalloc.get_traced_memory()[1] / 1024 / 1024
+    tracemalloc.stop()
+    print(f"原循环构造：x_seq{x_seq.shape}，耗时{loop_time:.3f}s，"
+          f"numpy峰值分配{loop_peak:.2f} MB，峰值RSS {peak_rss_mb():.1f} MB")
+
+    # 一致性校验
+    assert np.array_equal(SlidingWindows(x_scaled, y_scaled).x_windows, x_seq)
+    assert np.array_equal(SlidingWindows(x_scaled, y_scaled).targets, y_seq)
+    print("窗口内容与原实现完全一致")